@@ -86,6 +86,7 @@ def create_app(config_name=None):
     app.config["SSE_HEARTBEAT_INTERVAL_SECONDS"] = int(
         os.getenv("PRISM_SSE_HEARTBEAT_INTERVAL_SECONDS", 15)
     )
+    app.config["SSE_COALESCE_WINDOW_MS"] = int(os.getenv("PRISM_SSE_COALESCE_WINDOW_MS", 0))
     app.config["CAMERA_UPLOAD_MAX_BYTES"] = int(
         os.getenv("PRISM_CAMERA_UPLOAD_MAX_BYTES", 2 * 1024 * 1024)
     )
@@ -189,9 +190,22 @@ def create_app(config_name=None):
     app.register_blueprint(lots_bp, url_prefix="/api/v1")
     app.register_blueprint(insights_bp)
 
+    from app.services.partitions import register_partition_command
+    from app.services.notifications import init_notification_transport
+    from app.services.prediction import init_prediction_engine, register_forecast_command
+    from app.services.retention import register_retention_command
+    from app.services.rollups import init_rollup_scheduler, register_rollup_command
     from seed import register_seed_command
 
     register_seed_command(app)
+    register_rollup_command(app)
+    register_retention_command(app)
+    register_partition_command(app)
+    register_forecast_command(app)
+
+    init_prediction_engine(app)
+    init_notification_transport(app)
+    init_rollup_scheduler(app)
 
     # Optional bootstrap mode for quick local smoke tests without migrations.
     if os.getenv("PRISM_AUTO_CREATE_TABLES", "false").lower() == "true":
@@ -0,0 +1,81 @@
+"""Conditional GET helpers for slot and lot reads.
+
+Validators are derived from the slot state versions kept by ``SlotCounterDeltas``, so a
+matching ``If-None-Match`` is answered with 304 after a single primary-key lookup instead of
+loading and serializing the listing. Telemetry that changes without a state change (distances,
+reading times) only moves the ETag once per ``PRISM_TELEMETRY_ETAG_BUCKET_SECONDS`` bucket.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+from collections.abc import Callable
+from datetime import datetime
+
+from flask import current_app, request
+from sqlalchemy import select
+
+from app.models.parking import ParkingLot, StateCounter
+from app.services.slot_counters import SLOT_STATE_COUNTER
+
+DEFAULT_TELEMETRY_ETAG_BUCKET_SECONDS = 30
+
+
+def telemetry_etag_bucket_seconds() -> int:
+    """Staleness bound for telemetry fields behind a 304; 0 keys the ETag on state only."""
+    return max(0, int(os.getenv("PRISM_TELEMETRY_ETAG_BUCKET_SECONDS", DEFAULT_TELEMETRY_ETAG_BUCKET_SECONDS)))
+
+
+def state_validators(
+    session,
+    *,
+    lot_id: str | None = None,
+    include_telemetry: bool = False,
+    variant: tuple = (),
+) -> tuple[str, datetime | None]:
+    """Return (etag, last_modified) for the global or one lot's slot state.
+
+    ``include_telemetry`` folds in the current telemetry time bucket for responses that expose
+    per-slot readings, instead of querying every slot's newest reading on each revalidation.
+    ``variant`` distinguishes responses that filter the same state, such as query string
+    arguments.
+    """
+    if lot_id is None:
+        version_query = select(StateCounter.value, StateCounter.updated_at).where(
+            StateCounter.name == SLOT_STATE_COUNTER
+        )
+    else:
+        version_query = select(ParkingLot.state_version, ParkingLot.state_changed_at).where(
+            ParkingLot.id == lot_id
+        )
+
+    row = session.execute(version_query).first()
+    version, changed_at = (row[0], row[1]) if row is not None else (None, None)
+
+    telemetry_bucket = None
+    bucket_seconds = telemetry_etag_bucket_seconds()
+    if include_telemetry and bucket_seconds:
+        telemetry_bucket = int(time.time() // bucket_seconds)
+
+    parts = [lot_id or "*", version, telemetry_bucket, *variant]
+    etag = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()[:24]
+    return etag, changed_at
+
+
+def conditional_response(etag: str, last_modified: datetime | None, build: Callable):
+    """Answer 304 when ``If-None-Match`` matches, otherwise the response from ``build()``.
+
+    Only ``If-None-Match`` is honored; Last-Modified has one-second resolution and state can
+    change several times within a second.
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.make_response(build())
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
@@ -3,10 +3,16 @@
 from app.models.user import User
 from app.models.parking import (
     OccupancyLog,
+    OccupancyRollup,
     ParkingEvent,
     ParkingLot,
     ParkingSlot,
+    RollupSlotState,
+    RollupWatermark,
     SensorReading,
+    SlotLatestReading,
+    StateCounter,
+    TelemetryMinuteAggregate,
     Zone,
 )
 
@@ -18,4 +24,10 @@ __all__ = [
     "ParkingEvent",
     "SensorReading",
     "OccupancyLog",
+    "SlotLatestReading",
+    "OccupancyRollup",
+    "RollupWatermark",
+    "RollupSlotState",
+    "TelemetryMinuteAggregate",
+    "StateCounter",
 ]
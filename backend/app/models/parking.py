@@ -3,6 +3,8 @@ Database models for PRISM parking system.
 """
 from datetime import datetime
 
+from sqlalchemy import select
+
 from app import db
 
 
@@ -16,6 +18,13 @@ class ParkingLot(db.Model):
     total_slots = db.Column(db.Integer, default=0)
     latitude = db.Column(db.Float)
     longitude = db.Column(db.Float)
+    # Denormalized slot counters, maintained by app.services.slot_counters
+    occupied_slots = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    available_slots = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    reserved_slots = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Global state version of the last slot change in this lot, for ETags and deltas
+    state_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    state_changed_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -29,7 +38,7 @@ class ParkingLot(db.Model):
             'name': self.name,
             'location': self.location,
             'total_slots': self.total_slots,
-            'available_slots': self.slots.filter_by(is_occupied=False).count(),
+            'available_slots': self.available_slots or 0,
             'latitude': self.latitude,
             'longitude': self.longitude
         }
@@ -48,14 +57,21 @@ class ParkingSlot(db.Model):
     slot_type = db.Column(db.String(20), default='standard')  # standard, handicapped, ev
     sensor_id = db.Column(db.String(50))
     last_status_change = db.Column(db.DateTime, default=datetime.utcnow)
+    state_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
     events = db.relationship('ParkingEvent', backref='slot', lazy='dynamic')
     occupancy_logs = db.relationship('OccupancyLog', backref='slot', lazy='dynamic')
+    latest_reading = db.relationship('SlotLatestReading', uselist=False, viewonly=True)
+
+    __table_args__ = (
+        db.Index('idx_parking_slots_state_version', 'state_version'),
+        db.Index('idx_parking_slots_lot_state_version', 'lot_id', 'state_version'),
+    )
     
     def to_dict(self):
-        latest_log = self.occupancy_logs.order_by(OccupancyLog.timestamp.desc()).first()
+        latest = self.latest_reading
         return {
             'id': self.id,
             'lot_id': self.lot_id,
@@ -66,9 +82,10 @@ class ParkingSlot(db.Model):
             'is_reserved': self.is_reserved,
             'slot_type': self.slot_type,
             'sensor_id': self.sensor_id,
-            'latest_distance_cm': latest_log.distance_cm if latest_log else None,
-            'last_reading_at': latest_log.timestamp.isoformat() if latest_log else None,
-            'last_status_change': self.last_status_change.isoformat() if self.last_status_change else None
+            'latest_distance_cm': latest.distance_cm if latest else None,
+            'last_reading_at': latest.timestamp.isoformat() if latest else None,
+            'last_status_change': self.last_status_change.isoformat() if self.last_status_change else None,
+            'state_version': self.state_version or 0,
         }
 
 
@@ -80,6 +97,10 @@ class Zone(db.Model):
     lot_id = db.Column(db.String(50), db.ForeignKey('parking_lots.id'), nullable=False)
     name = db.Column(db.String(100), nullable=False)
     walk_times = db.Column(db.JSON, nullable=False, default=dict)
+    # Denormalized slot counters, maintained by app.services.slot_counters
+    occupied_slots = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    available_slots = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    reserved_slots = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
     slots = db.relationship('ParkingSlot', backref='zone', lazy='dynamic')
@@ -97,20 +118,43 @@ class Zone(db.Model):
         }
 
 
+def _event_lot_id_default(context):
+    """Fill lot_id from the slot for inserts that do not supply it."""
+    slot_id = context.get_current_parameters().get('slot_id')
+    if slot_id is None:
+        return None
+    return context.connection.scalar(select(ParkingSlot.lot_id).where(ParkingSlot.id == slot_id))
+
+
 class ParkingEvent(db.Model):
     """Records parking events (entry/exit)."""
     __tablename__ = 'parking_events'
     
     id = db.Column(db.Integer, primary_key=True)
     slot_id = db.Column(db.String(50), db.ForeignKey('parking_slots.id'), nullable=False)
+    # Denormalized from parking_slots so lot-filtered feeds need no join.
+    lot_id = db.Column(
+        db.String(50),
+        db.ForeignKey('parking_lots.id'),
+        nullable=False,
+        default=_event_lot_id_default,
+    )
     event_type = db.Column(db.String(10), nullable=False)  # 'entry' or 'exit'
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     sensor_distance_cm = db.Column(db.Float)
+
+    # Keyset pagination walks (timestamp, id) newest first, globally, per slot or per lot.
+    __table_args__ = (
+        db.Index('idx_parking_events_time_id', 'timestamp', 'id'),
+        db.Index('idx_parking_events_slot_time_id', 'slot_id', 'timestamp', 'id'),
+        db.Index('idx_parking_events_lot_time_id', 'lot_id', 'timestamp', 'id'),
+    )
     
     def to_dict(self):
         return {
             'id': self.id,
             'slot_id': self.slot_id,
+            'lot_id': self.lot_id,
             'event_type': self.event_type,
             'timestamp': self.timestamp.isoformat()
         }
@@ -119,6 +163,7 @@ class ParkingEvent(db.Model):
 class SensorReading(db.Model):
     """Raw sensor readings for ML training."""
     __tablename__ = 'sensor_readings'
+    # Range-partitioned by timestamp on PostgreSQL (see app.services.partitions).
     
     id = db.Column(db.Integer, primary_key=True)
     slot_id = db.Column(db.String(50), db.ForeignKey('parking_slots.id'), nullable=False)
@@ -134,6 +179,7 @@ class SensorReading(db.Model):
 class OccupancyLog(db.Model):
     """Time-series state changes used for analytics and ML features."""
     __tablename__ = 'occupancy_logs'
+    # Range-partitioned by timestamp on PostgreSQL (see app.services.partitions).
 
     id = db.Column(db.Integer, primary_key=True)
     slot_id = db.Column(db.String(50), db.ForeignKey('parking_slots.id'), nullable=False)
@@ -144,3 +190,102 @@ class OccupancyLog(db.Model):
     __table_args__ = (
         db.Index('idx_occupancy_logs_slot_time', 'slot_id', 'timestamp'),
     )
+
+
+class SlotLatestReading(db.Model):
+    """Newest telemetry per slot, upserted on ingest so reads are primary-key lookups."""
+    __tablename__ = 'slot_latest_readings'
+
+    slot_id = db.Column(db.String(50), db.ForeignKey('parking_slots.id'), primary_key=True)
+    distance_cm = db.Column(db.Float)
+    status = db.Column(db.String(20), nullable=False)  # occupied or vacant
+    timestamp = db.Column(db.DateTime, nullable=False)
+
+
+class OccupancyRollup(db.Model):
+    """Pre-aggregated occupancy for one slot, zone or lot over an hourly or daily bucket."""
+    __tablename__ = 'occupancy_rollups'
+
+    id = db.Column(db.Integer, primary_key=True)
+    granularity = db.Column(db.String(10), nullable=False)  # hour or day
+    scope = db.Column(db.String(10), nullable=False)  # slot, zone or lot
+    scope_id = db.Column(db.String(50), nullable=False)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    samples = db.Column(db.Integer, nullable=False, default=0)
+    occupied_samples = db.Column(db.Integer, nullable=False, default=0)
+    occupied_seconds = db.Column(db.Float, nullable=False, default=0.0)
+    transitions = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            'granularity', 'scope', 'scope_id', 'bucket_start',
+            name='uq_occupancy_rollups_bucket',
+        ),
+        db.Index('idx_occupancy_rollups_scope_time', 'granularity', 'scope', 'bucket_start'),
+    )
+
+
+class RollupWatermark(db.Model):
+    """High-water mark of source rows already folded into rollups."""
+    __tablename__ = 'rollup_watermarks'
+
+    name = db.Column(db.String(50), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class RollupSlotState(db.Model):
+    """Each slot's newest log already folded into rollups, so a refresh never rescans history."""
+    __tablename__ = 'rollup_slot_states'
+
+    slot_id = db.Column(db.String(50), db.ForeignKey('parking_slots.id'), primary_key=True)
+    log_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False)
+    # Occupied time is credited up to here; later than ``timestamp`` once an open interval is closed.
+    credited_until = db.Column(db.DateTime, nullable=False)
+
+
+class StateCounter(db.Model):
+    """Named monotonically increasing counters, e.g. the global slot state version."""
+    __tablename__ = 'state_counters'
+
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class TelemetryMinuteAggregate(db.Model):
+    """Per-minute summary of raw telemetry rows removed by the retention job."""
+    __tablename__ = 'telemetry_minute_aggregates'
+
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(20), nullable=False)  # sensor_readings or occupancy_logs
+    slot_id = db.Column(db.String(50), db.ForeignKey('parking_slots.id'), nullable=False)
+    minute_start = db.Column(db.DateTime, nullable=False)
+    samples = db.Column(db.Integer, nullable=False, default=0)
+    occupied_samples = db.Column(db.Integer, nullable=False, default=0)
+    distance_samples = db.Column(db.Integer, nullable=False, default=0)
+    distance_sum = db.Column(db.Float, nullable=False, default=0.0)
+    distance_min = db.Column(db.Float)
+    distance_max = db.Column(db.Float)
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            'source', 'slot_id', 'minute_start',
+            name='uq_telemetry_minute_aggregates_bucket',
+        ),
+    )
+
+
+def slot_state_query():
+    """Dynamic slot columns plus the latest reading; static metadata comes from the metadata cache."""
+    return db.session.query(
+        ParkingSlot.id,
+        ParkingSlot.is_occupied,
+        ParkingSlot.is_reserved,
+        ParkingSlot.last_status_change,
+        ParkingSlot.state_version,
+        SlotLatestReading.distance_cm.label('latest_distance_cm'),
+        SlotLatestReading.timestamp.label('last_reading_at'),
+    ).outerjoin(SlotLatestReading, SlotLatestReading.slot_id == ParkingSlot.id)
@@ -3,53 +3,45 @@
 from __future__ import annotations
 
 import json
-from collections import Counter
+import time
 from datetime import datetime, timedelta
 from queue import Empty
 from typing import Any
 
 from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
 from flask_jwt_extended import jwt_required
-from sqlalchemy import case, func
+from marshmallow import ValidationError
+from sqlalchemy import Integer, cast, extract, func
 
 from app import db, limiter
 from app.authz import get_current_user_from_jwt, require_roles
-from app.models.parking import OccupancyLog, ParkingEvent, ParkingLot, ParkingSlot, Zone
+from app.models.parking import (
+    OccupancyRollup,
+    ParkingEvent,
+    ParkingLot,
+    ParkingSlot,
+    SlotLatestReading,
+    Zone,
+)
 from app.responses import error_response
-from app.services.notifications import broadcaster
+from app.schemas import bulk_recommendation_schema
+from app.services.metadata_cache import LotMetadata, get_metadata_cache
+from app.services.notifications import (
+    ALL_TOPIC,
+    BroadcastEvent,
+    batch_data,
+    broadcaster,
+    coalesce_events,
+    lot_topic,
+    zone_topic,
+)
+from app.services.prediction import WEEKDAYS, PredictionEngine, get_prediction_engine
+from app.services.recommendation import normalize_destination, rank_zones
+from app.services.response_cache import get_insights_cache
 
 insights_bp = Blueprint("insights", __name__)
 
-VALID_DAYS = {
-    "monday",
-    "tuesday",
-    "wednesday",
-    "thursday",
-    "friday",
-    "saturday",
-    "sunday",
-}
-DAY_FACTOR = {
-    "monday": 3.0,
-    "tuesday": 2.0,
-    "wednesday": 1.0,
-    "thursday": 2.5,
-    "friday": 4.0,
-    "saturday": -3.0,
-    "sunday": -4.0,
-}
-
-
-def _time_factor(hour: int) -> float:
-    if 8 <= hour <= 10:
-        return 12.0
-    if 11 <= hour <= 14:
-        return 4.0
-    if 15 <= hour <= 17:
-        return 10.0
-    if 18 <= hour <= 20:
-        return -2.0
-    return -8.0
+VALID_DAYS = set(WEEKDAYS)
 
 
 def _parse_day_and_time() -> tuple[str, str, int] | tuple[None, object, None]:
@@ -63,11 +55,8 @@ def _parse_day_and_time() -> tuple[str, str, int] | tuple[None, object, None]:
             code="validation_error",
         ), None
 
-    try:
-        hour = int(time_label.split(":")[0])
-        if hour < 0 or hour > 23:
-            raise ValueError("hour out of range")
-    except Exception:
+    hour = _hour_from_time_label(time_label)
+    if hour is None:
         return None, error_response(
             "Invalid time. Use HH:MM in 24-hour format.",
             400,
@@ -77,62 +66,170 @@ def _parse_day_and_time() -> tuple[str, str, int] | tuple[None, object, None]:
     return day, time_label, hour
 
 
-def _lot_zone_snapshot(lot_id: str) -> tuple[ParkingLot | None, list[dict[str, Any]]]:
-    lot = db.session.get(ParkingLot, lot_id)
-    if lot is None:
-        return None, []
+def _hour_from_time_label(time_label: str) -> int | None:
+    try:
+        hour = int(time_label.split(":")[0])
+    except ValueError:
+        return None
+    return hour if 0 <= hour <= 23 else None
+
+
+def _zone_utilization(lot_id: str | None = None) -> list[dict[str, Any]]:
+    """Per-zone totals from the denormalized counters; names and walk times come from the metadata cache."""
+    query = db.session.query(Zone.id, Zone.occupied_slots, Zone.available_slots)
+    if lot_id:
+        query = query.filter(Zone.lot_id == lot_id)
+    rows = query.all()
+    metadata = get_metadata_cache(current_app).snapshot(zone_ids=[row.id for row in rows])
 
     zone_rows: list[dict[str, Any]] = []
-    for zone in lot.zones.order_by(Zone.name.asc()).all():
-        total_slots = zone.slots.count()
-        occupied_slots = zone.slots.filter_by(is_occupied=True).count()
-        current_pct = round((occupied_slots / total_slots) * 100, 1) if total_slots else 0.0
+    for row in rows:
+        zone = metadata.zones[row.id]
+        lot = metadata.lots.get(zone.lot_id)
+        occupied_slots = row.occupied_slots or 0
+        total_slots = occupied_slots + (row.available_slots or 0)
         zone_rows.append(
             {
-                "zone_id": zone.id,
+                "zone_id": row.id,
                 "name": zone.name,
+                "lot_id": zone.lot_id,
+                "lot_name": lot.name if lot else None,
                 "total_slots": total_slots,
                 "occupied_slots": occupied_slots,
-                "current_occupancy_pct": current_pct,
-                "walk_times": zone.walk_times or {},
+                "current_occupancy_pct": round((occupied_slots / total_slots) * 100, 1) if total_slots else 0.0,
+                "walk_times": zone.walk_times,
             }
         )
+    zone_rows.sort(key=lambda zone: zone["name"])
+    return zone_rows
 
-    return lot, zone_rows
 
+def _lot_zone_snapshot(lot_id: str) -> tuple[LotMetadata | None, list[dict[str, Any]]]:
+    # Existence is checked against the database so unknown ids never force a cache reload.
+    found = db.session.query(ParkingLot.id).filter(ParkingLot.id == lot_id).scalar()
+    if found is None:
+        return None, []
+    zone_rows = _zone_utilization(found)
+    return get_metadata_cache(current_app).snapshot(lot_ids=[found]).lots[found], zone_rows
+
+
+def _ranked_zones(
+    engine: PredictionEngine,
+    zone_rows: list[dict[str, Any]],
+    destinations: list[str],
+    times: list[tuple[str, int]],
+    top_k: int,
+) -> list[list[list[dict[str, Any]]]]:
+    metadata = get_metadata_cache(current_app).snapshot(zone_ids=[zone["zone_id"] for zone in zone_rows])
+    return rank_zones(engine, zone_rows, metadata.destination_index, destinations, times, top_k=top_k)
+
+
+def _recommendation_engine_summary(engine: PredictionEngine) -> dict[str, Any]:
+    return {
+        "status": engine.status,
+        "model_version": engine.version,
+        "note": (
+            "Rule-based recommendation for Day 8. ML ranking is planned for Phase 3."
+            if engine.status == "mock"
+            else "Ranked by forecast occupancy plus walk time."
+        ),
+    }
 
-def _prediction_rows(zone_rows: list[dict[str, Any]], day: str, hour: int) -> list[dict[str, Any]]:
-    predictions: list[dict[str, Any]] = []
-    day_adjustment = DAY_FACTOR[day]
-    hour_adjustment = _time_factor(hour)
 
-    for zone in zone_rows:
-        current = zone["current_occupancy_pct"]
-        # Skeleton heuristic for Phase 2; real model integration is planned in Phase 3.
-        predicted = max(0.0, min(100.0, round(current + day_adjustment + hour_adjustment, 1)))
-        if predicted >= current + 5:
-            trend = "filling"
-        elif predicted <= current - 5:
-            trend = "clearing"
-        else:
-            trend = "stable"
+def _cached_lot_insight(kind: str, lot_id: str, key_args: tuple, compute) -> tuple[Any, str] | None:
+    """Serve a per-lot insight from the response cache, keyed by inputs and the lot's state version.
+
+    Returns ``((lot_name, result), cache_status)``, or None when the lot does not exist.
+    ``Cache-Control: no-cache`` from the client recomputes; ``no-store`` also skips storing.
+    """
+    version = db.session.query(ParkingLot.state_version).filter(ParkingLot.id == lot_id).scalar()
+    if version is None:
+        return None
+
+    def compute_entry():
+        lot, zone_rows = _lot_zone_snapshot(lot_id)
+        if lot is None:
+            return None
+        return lot.name, compute(zone_rows)
+
+    cache = get_insights_cache(current_app)
+    client_cache_control = request.cache_control
+    bypass = bool(client_cache_control.no_cache or client_cache_control.no_store)
+    entry, hit = cache.get_or_compute(
+        (kind, lot_id, version, *key_args),
+        compute_entry,
+        bypass=bypass,
+        store=not client_cache_control.no_store,
+    )
+    if entry is None:
+        return None
+    if hit:
+        return entry, "HIT"
+    return entry, "BYPASS" if bypass or not cache.enabled else "MISS"
+
+
+def _hour_of(column):
+    """Dialect-aware SQL expression for the UTC hour (0-23) of a timestamp column."""
+    if db.session.get_bind().dialect.name == "sqlite":
+        return cast(func.strftime("%H", column), Integer)
+    return cast(extract("hour", column), Integer)
+
+
+def _stream_topics() -> list[str]:
+    """Broadcaster topics from comma-separated ``lot_id``/``zone_id`` args; none means every event."""
+    topics = [
+        lot_topic(lot_id.strip()) for lot_id in request.args.get("lot_id", "").split(",") if lot_id.strip()
+    ]
+    topics += [
+        zone_topic(zone_id.strip()) for zone_id in request.args.get("zone_id", "").split(",") if zone_id.strip()
+    ]
+    return topics or [ALL_TOPIC]
+
+
+MAX_SSE_COALESCE_WINDOW_MS = 5000
+
+
+def _sse_frame(event_name: str, data: str, event_id: str | None = None) -> str:
+    id_line = f"id: {event_id}\n" if event_id else ""
+    return f"{id_line}event: {event_name}\ndata: {data}\n\n"
 
-        predictions.append(
-            {
-                "zone_id": zone["zone_id"],
-                "name": zone["name"],
-                "predicted_occupancy_pct": predicted,
-                "trend": trend,
-                "current_occupancy_pct": current,
-                "total_slots": zone["total_slots"],
-            }
-        )
 
-    return predictions
+def _format_sse(event_name: str, payload: dict[str, Any], event_id: str | None = None) -> str:
+    return _sse_frame(event_name, json.dumps(payload, default=str), event_id)
 
 
-def _format_sse(event_name: str, payload: dict[str, Any]) -> str:
-    return f"event: {event_name}\ndata: {json.dumps(payload, default=str)}\n\n"
+def _event_frames(events: list[BroadcastEvent], coalesce: bool) -> list[str]:
+    """One frame per event, or one ``slot_batch`` frame per window when coalescing.
+
+    A batch carries the id of its last event, so a reconnect resumes after the whole window.
+    """
+    if not events:
+        return []
+    if coalesce:
+        latest = coalesce_events(events)
+        if len(latest) > 1:
+            return [_sse_frame("slot_batch", batch_data(latest, received=len(events)), latest[-1].id)]
+        events = latest
+    return [_sse_frame(event.type, event.data, event.id) for event in events]
+
+
+def _coalesce_window_ms() -> tuple[int, object | None]:
+    raw_value = request.args.get("coalesce_ms", "").strip()
+    if not raw_value:
+        return current_app.config.get("SSE_COALESCE_WINDOW_MS", 0), None
+    if not raw_value.isdigit() or int(raw_value) > MAX_SSE_COALESCE_WINDOW_MS:
+        return 0, error_response(
+            f"Invalid coalesce_ms. Use an integer between 0 and {MAX_SSE_COALESCE_WINDOW_MS}.",
+            400,
+            code="validation_error",
+        )
+    return int(raw_value), None
+
+
+def _last_event_id() -> str | None:
+    """Resume point from the ``Last-Event-ID`` header (set by EventSource on reconnect) or query arg."""
+    value = request.headers.get("Last-Event-ID") or request.args.get("last_event_id") or ""
+    return value.strip() or None
 
 
 @insights_bp.route("/api/v1/lots/<lot_id>/predict", methods=["GET"])
@@ -149,24 +246,28 @@ def get_prediction(lot_id: str):
         return parsed[1]
     day, time_label, hour = parsed
 
-    lot, zone_rows = _lot_zone_snapshot(lot_id)
-    if lot is None:
+    engine = get_prediction_engine(current_app)
+    cached = _cached_lot_insight(
+        "predict",
+        lot_id,
+        (engine.version, day, hour),
+        lambda zone_rows: engine.predict(zone_rows, day=day, hour=hour),
+    )
+    if cached is None:
         return error_response("Lot not found", 404)
+    (lot_name, predictions), cache_status = cached
 
-    predictions = _prediction_rows(zone_rows, day=day, hour=hour)
-    return jsonify(
+    response = jsonify(
         {
-            "lot_id": lot.id,
-            "lot_name": lot.name,
+            "lot_id": lot_id,
+            "lot_name": lot_name,
             "predicted_for": {"day": day, "time": time_label},
             "zones": predictions,
-            "model": {
-                "status": "mock",
-                "version": "day8-skeleton-v1",
-                "note": "ML model integration planned in Phase 3.",
-            },
+            "model": engine.describe(),
         }
     )
+    response.headers["X-Cache"] = cache_status
+    return response
 
 
 @insights_bp.route("/api/v1/lots/<lot_id>/recommend", methods=["GET"])
@@ -191,53 +292,86 @@ def get_recommendation(lot_id: str):
         return parsed[1]
     day, time_label, hour = parsed
 
-    lot, zone_rows = _lot_zone_snapshot(lot_id)
-    if lot is None:
+    engine = get_prediction_engine(current_app)
+    cached = _cached_lot_insight(
+        "recommend",
+        lot_id,
+        (engine.version, day, hour, normalize_destination(destination)),
+        lambda zone_rows: _ranked_zones(engine, zone_rows, [destination], [(day, hour)], top_k=3)[0][0],
+    )
+    if cached is None:
         return error_response("Lot not found", 404)
-
-    predictions = _prediction_rows(zone_rows, day=day, hour=hour)
-
-    ranked = []
-    destination_key = destination.lower()
-    for zone, prediction in zip(zone_rows, predictions):
-        walk_times = zone.get("walk_times", {})
-        walk_min = None
-        for key, value in walk_times.items():
-            if key.lower() == destination_key:
-                walk_min = value
-                break
-        if walk_min is None:
-            walk_min = 8
-
-        score = round(prediction["predicted_occupancy_pct"] + (walk_min * 3), 2)
-        ranked.append(
-            {
-                "zone_id": prediction["zone_id"],
-                "name": prediction["name"],
-                "predicted_occupancy_pct": prediction["predicted_occupancy_pct"],
-                "trend": prediction["trend"],
-                "estimated_walk_minutes": walk_min,
-                "score": score,
-            }
-        )
-
-    ranked.sort(key=lambda item: (item["score"], item["predicted_occupancy_pct"]))
+    (lot_name, ranked), cache_status = cached
     recommendation = ranked[0] if ranked else None
 
-    return jsonify(
+    response = jsonify(
         {
-            "lot_id": lot.id,
-            "lot_name": lot.name,
+            "lot_id": lot_id,
+            "lot_name": lot_name,
             "destination": destination,
             "recommended_zone": recommendation,
             "alternatives": ranked[1:3],
             "predicted_for": {"day": day, "time": time_label},
-            "engine": {
-                "status": "mock",
-                "note": "Rule-based recommendation for Day 8. ML ranking is planned for Phase 3.",
-            },
+            "engine": _recommendation_engine_summary(engine),
         }
     )
+    response.headers["X-Cache"] = cache_status
+    return response
+
+
+@insights_bp.route("/api/v1/lots/<lot_id>/recommend/bulk", methods=["POST"])
+@jwt_required()
+@limiter.limit(lambda: current_app.config.get("RATE_LIMIT_READ_HEAVY", "120 per minute"))
+def get_bulk_recommendations(lot_id: str):
+    """Rank zones for many destinations and/or time slots in one call (kiosk displays)."""
+    _, auth_error = get_current_user_from_jwt()
+    if auth_error:
+        return auth_error
+
+    try:
+        data = bulk_recommendation_schema.load(request.get_json(silent=True) or {})
+    except ValidationError as err:
+        return error_response("Validation failed", 400, code="validation_error", details=err.messages)
+
+    destinations = [destination.strip() for destination in data["destinations"]]
+    time_labels = [(slot["day"], slot["time"]) for slot in data["times"]]
+    times = [(day, _hour_from_time_label(time_label)) for day, time_label in time_labels]
+    top_k = data["top_k"]
+
+    engine = get_prediction_engine(current_app)
+    cached = _cached_lot_insight(
+        "recommend-bulk",
+        lot_id,
+        (engine.version, tuple(times), tuple(normalize_destination(d) for d in destinations), top_k),
+        lambda zone_rows: _ranked_zones(engine, zone_rows, destinations, times, top_k=top_k),
+    )
+    if cached is None:
+        return error_response("Lot not found", 404)
+    (lot_name, ranked_by_time), cache_status = cached
+
+    results = []
+    for (day, time_label), ranked_by_destination in zip(time_labels, ranked_by_time):
+        for destination, ranked in zip(destinations, ranked_by_destination):
+            results.append(
+                {
+                    "destination": destination,
+                    "predicted_for": {"day": day, "time": time_label},
+                    "recommended_zone": ranked[0] if ranked else None,
+                    "alternatives": ranked[1:],
+                }
+            )
+
+    response = jsonify(
+        {
+            "lot_id": lot_id,
+            "lot_name": lot_name,
+            "results": results,
+            "total": len(results),
+            "engine": _recommendation_engine_summary(engine),
+        }
+    )
+    response.headers["X-Cache"] = cache_status
+    return response
 
 
 @insights_bp.route("/api/admin/sensors", methods=["GET"])
@@ -251,38 +385,11 @@ def get_admin_sensors():
     stale_cutoff = datetime.utcnow() - timedelta(seconds=offline_after_seconds)
     uptime_window_start = datetime.utcnow() - timedelta(hours=24)
 
-    latest_ts_subq = (
-        db.session.query(
-            OccupancyLog.slot_id.label("slot_id"),
-            func.max(OccupancyLog.timestamp).label("latest_ts"),
-        )
-        .group_by(OccupancyLog.slot_id)
-        .subquery()
-    )
-
-    latest_rows = (
-        db.session.query(
-            OccupancyLog.slot_id,
-            OccupancyLog.timestamp,
-            OccupancyLog.distance_cm,
-            OccupancyLog.status,
-        )
-        .join(
-            latest_ts_subq,
-            (OccupancyLog.slot_id == latest_ts_subq.c.slot_id)
-            & (OccupancyLog.timestamp == latest_ts_subq.c.latest_ts),
-        )
-        .all()
-    )
-    latest_map = {row.slot_id: row for row in latest_rows}
+    # slot_latest_readings holds the newest reading per slot; any reading within the
+    # uptime window means the slot's latest timestamp falls inside it.
+    latest_map = {row.slot_id: row for row in SlotLatestReading.query.all()}
     slots_seen_24h = {
-        slot_id
-        for (slot_id,) in (
-            db.session.query(OccupancyLog.slot_id)
-            .filter(OccupancyLog.timestamp >= uptime_window_start)
-            .distinct()
-            .all()
-        )
+        slot_id for slot_id, row in latest_map.items() if row.timestamp >= uptime_window_start
     }
 
     sensors: dict[str, dict[str, Any]] = {}
@@ -379,71 +486,87 @@ def get_admin_analytics():
     days = request.args.get("days", 7, type=int)
     days = max(1, min(days, 30))
     window_start = datetime.utcnow() - timedelta(days=days)
-
-    daily_rows = (
-        db.session.query(
-            func.date(OccupancyLog.timestamp).label("day"),
-            func.avg(
-                case(
-                    (OccupancyLog.status == "occupied", 1.0),
-                    else_=0.0,
-                )
-            ).label("occupied_ratio"),
-            func.count(OccupancyLog.id).label("samples"),
-        )
-        .filter(OccupancyLog.timestamp >= window_start)
-        .group_by(func.date(OccupancyLog.timestamp))
-        .order_by(func.date(OccupancyLog.timestamp))
-        .all()
+    lot_id = request.args.get("lot_id", "").strip() or None
+
+    # Read-only: rollups are refreshed by the scheduler in run.py or `flask prism-rollups`.
+    window_start_day = window_start.replace(hour=0, minute=0, second=0, microsecond=0)
+    daily_query = db.session.query(
+        OccupancyRollup.bucket_start.label("day"),
+        func.sum(OccupancyRollup.occupied_seconds).label("occupied_seconds"),
+        func.sum(OccupancyRollup.samples).label("samples"),
+    ).filter(
+        OccupancyRollup.granularity == "day",
+        OccupancyRollup.scope == "lot",
+        OccupancyRollup.bucket_start >= window_start_day,
     )
+    if lot_id:
+        daily_query = daily_query.filter(OccupancyRollup.scope_id == lot_id)
+    daily_rows = daily_query.group_by(OccupancyRollup.bucket_start).order_by(OccupancyRollup.bucket_start).all()
+
+    # Time-weighted: occupied slot-seconds over slot-seconds elapsed in the day. Sample counts are
+    # irregular under change-only logging, so averaging samples would overweight transitions.
+    snapshot = get_metadata_cache(current_app).snapshot()
+    slot_count = sum(1 for slot in snapshot.slots.values() if lot_id is None or slot.lot_id == lot_id)
+    now = datetime.utcnow()
+
+    def _daily_pct(day: datetime, occupied_seconds: float | None) -> float:
+        elapsed = (min(day + timedelta(days=1), now) - day).total_seconds()
+        if not slot_count or elapsed <= 0:
+            return 0.0
+        return round(min(100.0, (occupied_seconds or 0.0) / (slot_count * elapsed) * 100), 1)
 
     daily_occupancy_average = [
         {
-            "date": str(row.day),
-            "avg_occupancy_pct": round(float(row.occupied_ratio or 0.0) * 100, 1),
+            "date": row.day.date().isoformat(),
+            "avg_occupancy_pct": _daily_pct(row.day, row.occupied_seconds),
             "samples": int(row.samples or 0),
         }
         for row in daily_rows
     ]
 
-    events = ParkingEvent.query.filter(ParkingEvent.timestamp >= window_start).all()
-    hourly_counter: Counter[int] = Counter()
-    for event in events:
-        if event.timestamp:
-            hourly_counter[event.timestamp.hour] += 1
+    event_hour = _hour_of(ParkingEvent.timestamp)
+    hourly_query = db.session.query(
+        event_hour.label("hour"),
+        func.count(ParkingEvent.id).label("events"),
+    ).filter(ParkingEvent.timestamp >= window_start)
+    if lot_id:
+        hourly_query = hourly_query.filter(ParkingEvent.lot_id == lot_id)
+    hourly_counts = {
+        int(row.hour): int(row.events)
+        for row in hourly_query.group_by(event_hour).all()
+        if row.hour is not None
+    }
 
-    hourly_distribution = [{"hour": hour, "events": hourly_counter.get(hour, 0)} for hour in range(24)]
+    hourly_distribution = [{"hour": hour, "events": hourly_counts.get(hour, 0)} for hour in range(24)]
 
-    if events:
-        peak_hour = max(range(24), key=lambda hour: hourly_counter.get(hour, 0))
+    if hourly_counts:
+        peak_hour = max(range(24), key=lambda hour: hourly_counts.get(hour, 0))
         peak_hour_summary = {
             "hour_utc": f"{peak_hour:02d}:00",
-            "events": hourly_counter.get(peak_hour, 0),
+            "events": hourly_counts.get(peak_hour, 0),
         }
     else:
         peak_hour_summary = {"hour_utc": None, "events": 0}
 
-    zone_rows = []
-    for zone in Zone.query.order_by(Zone.name.asc()).all():
-        total_slots = zone.slots.count()
-        occupied_slots = zone.slots.filter_by(is_occupied=True).count()
-        zone_rows.append(
-            {
-                "zone_id": zone.id,
-                "zone_name": zone.name,
-                "lot_id": zone.lot_id,
-                "lot_name": zone.lot.name if zone.lot else None,
-                "occupied_slots": occupied_slots,
-                "total_slots": total_slots,
-                "utilization_pct": round((occupied_slots / total_slots) * 100, 1) if total_slots else 0.0,
-            }
-        )
+    zone_rows = [
+        {
+            "zone_id": zone["zone_id"],
+            "zone_name": zone["name"],
+            "lot_id": zone["lot_id"],
+            "lot_name": zone["lot_name"],
+            "occupied_slots": zone["occupied_slots"],
+            "total_slots": zone["total_slots"],
+            "utilization_pct": zone["current_occupancy_pct"],
+        }
+        for zone in _zone_utilization(lot_id)
+    ]
 
     zone_rows.sort(key=lambda item: item["utilization_pct"], reverse=True)
 
     return jsonify(
         {
             "window_days": days,
+            "lot_id": lot_id,
             "daily_occupancy_average": daily_occupancy_average,
             "peak_hour": peak_hour_summary,
             "hourly_event_distribution": hourly_distribution,
@@ -453,6 +576,24 @@ def get_admin_analytics():
     )
 
 
+@insights_bp.route("/api/v1/admin/runtime", methods=["GET"])
+@require_roles("admin", error_message="Admin access required")
+@limiter.limit(lambda: current_app.config.get("RATE_LIMIT_READ_HEAVY", "120 per minute"))
+def get_admin_runtime():
+    """Return in-process ingest statistics for this backend process."""
+    mqtt_service = current_app.extensions.get("prism_mqtt")
+    return jsonify(
+        {
+            "mqtt": mqtt_service.stats() if mqtt_service is not None else None,
+            "metadata_cache": get_metadata_cache(current_app).stats(),
+            "insights_cache": get_insights_cache(current_app).stats(),
+            "prediction": current_app.extensions["prism_prediction"].stats(),
+            "notifications": broadcaster.stats(),
+            "generated_at": datetime.utcnow().isoformat(),
+        }
+    )
+
+
 @insights_bp.route("/api/notifications/stream", methods=["GET"])
 @insights_bp.route("/api/v1/notifications/stream", methods=["GET"])
 @jwt_required()
@@ -463,10 +604,16 @@ def stream_notifications():
     if auth_error:
         return auth_error
 
-    lot_filter = request.args.get("lot_id", "").strip() or None
+    coalesce_ms, coalesce_error = _coalesce_window_ms()
+    if coalesce_error:
+        return coalesce_error
+
+    topics = _stream_topics()
+    coalesce_window = max(0, min(coalesce_ms, MAX_SSE_COALESCE_WINDOW_MS)) / 1000
     heartbeat_interval = max(5, int(current_app.config.get("SSE_HEARTBEAT_INTERVAL_SECONDS", 15)))
 
-    subscriber_id, queue = broadcaster.subscribe()
+    last_event_id = _last_event_id()
+    subscriber_id, queue, replay = broadcaster.subscribe(topics, last_event_id=last_event_id)
     connected_at = datetime.utcnow().isoformat()
 
     def generate_events():
@@ -477,20 +624,39 @@ def stream_notifications():
                     "type": "connected",
                     "connected_at": connected_at,
                     "user_id": user.id,
+                    "topics": sorted(topics),
+                    "last_event_id": last_event_id,
+                    "coalesce_ms": coalesce_ms,
                 },
             )
+            if replay is None:
+                # Events after last_event_id were evicted or came from another process.
+                yield _format_sse(
+                    "resync",
+                    {
+                        "type": "resync",
+                        "last_event_id": last_event_id,
+                        "reason": "Requested events are no longer buffered; refetch /slots and resume.",
+                    },
+                )
+            else:
+                yield from _event_frames(replay, coalesce_window > 0)
             while True:
                 try:
-                    event = queue.get(timeout=heartbeat_interval)
+                    pending = [queue.get(timeout=heartbeat_interval)]
                 except Empty:
                     yield _format_sse("ping", {"type": "ping", "timestamp": datetime.utcnow().isoformat()})
                     continue
 
-                if lot_filter and event.get("lot_id") != lot_filter:
-                    continue
-
-                event_name = str(event.get("type", "message"))
-                yield _format_sse(event_name, event)
+                if coalesce_window > 0:
+                    # Collect everything that arrives within the window after the first event.
+                    deadline = time.monotonic() + coalesce_window
+                    while (remaining := deadline - time.monotonic()) > 0:
+                        try:
+                            pending.append(queue.get(timeout=remaining))
+                        except Empty:
+                            break
+                yield from _event_frames(pending, coalesce_window > 0)
         finally:
             broadcaster.unsubscribe(subscriber_id)
 
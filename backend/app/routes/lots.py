@@ -1,15 +1,19 @@
 """
 Parking lots API endpoints.
 """
-from flask import Blueprint, current_app, jsonify, request
+from flask import Blueprint, abort, current_app, jsonify, request
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from marshmallow import ValidationError
+from sqlalchemy import func
 
 from app import db, limiter
 from app.authz import require_roles
-from app.models.parking import ParkingLot
+from app.conditional import conditional_response, state_validators
+from app.models.parking import ParkingLot, ParkingSlot, slot_state_query
 from app.responses import error_response
 from app.schemas import lot_schema
+from app.services.metadata_cache import get_metadata_cache
+from app.services.slot_counters import bump_state_version
 
 lots_bp = Blueprint('lots', __name__)
 
@@ -33,11 +37,16 @@ def get_all_lots():
     if access_error:
         return access_error
 
-    lots = ParkingLot.query.all()
-    return jsonify({
-        'lots': [lot.to_dict() for lot in lots],
-        'total': len(lots)
-    })
+    def build():
+        rows = db.session.query(ParkingLot.id, ParkingLot.available_slots).all()
+        metadata = get_metadata_cache(current_app).snapshot(lot_ids=[row.id for row in rows])
+        return jsonify({
+            'lots': [metadata.lots[row.id].to_dict(available_slots=row.available_slots) for row in rows],
+            'total': len(rows)
+        })
+
+    etag, last_modified = state_validators(db.session)
+    return conditional_response(etag, last_modified, build)
 
 
 @lots_bp.route('/lots/<lot_id>')
@@ -49,10 +58,18 @@ def get_lot(lot_id):
     if access_error:
         return access_error
 
-    lot = ParkingLot.query.get_or_404(lot_id)
-    lot_dict = lot.to_dict()
-    lot_dict['slots'] = [slot.to_dict() for slot in lot.slots]
-    return jsonify(lot_dict)
+    lot = db.session.query(ParkingLot.id, ParkingLot.available_slots).filter(ParkingLot.id == lot_id).first()
+    if lot is None:
+        abort(404)
+
+    def build():
+        cache = get_metadata_cache(current_app)
+        lot_dict = cache.snapshot(lot_ids=[lot.id]).lots[lot.id].to_dict(available_slots=lot.available_slots)
+        lot_dict['slots'] = cache.serialize_slots(slot_state_query().filter(ParkingSlot.lot_id == lot.id))
+        return jsonify(lot_dict)
+
+    etag, last_modified = state_validators(db.session, lot_id=lot.id, include_telemetry=True)
+    return conditional_response(etag, last_modified, build)
 
 
 @lots_bp.route('/lots', methods=['POST'])
@@ -77,7 +94,10 @@ def create_lot():
         longitude=data.get('longitude')
     )
     db.session.add(lot)
+    db.session.flush()
+    bump_state_version(db.session, lot_ids=[lot.id])
     db.session.commit()
+    get_metadata_cache(current_app).invalidate()
     return jsonify(lot.to_dict()), 201
 
 
@@ -90,14 +110,22 @@ def get_lots_summary():
     if access_error:
         return access_error
 
-    lots = ParkingLot.query.all()
-    total_slots = sum(lot.total_slots for lot in lots)
-    available = sum(lot.slots.filter_by(is_occupied=False).count() for lot in lots)
-    
-    return jsonify({
-        'total_lots': len(lots),
-        'total_slots': total_slots,
-        'available_slots': available,
-        'occupied_slots': total_slots - available,
-        'occupancy_rate': round((total_slots - available) / total_slots * 100, 1) if total_slots > 0 else 0
-    })
+    def build():
+        totals = db.session.query(
+            func.count(ParkingLot.id).label('total_lots'),
+            func.coalesce(func.sum(ParkingLot.total_slots), 0).label('total_slots'),
+            func.coalesce(func.sum(ParkingLot.available_slots), 0).label('available_slots'),
+        ).one()
+        total_slots = int(totals.total_slots)
+        available = int(totals.available_slots)
+
+        return jsonify({
+            'total_lots': int(totals.total_lots),
+            'total_slots': total_slots,
+            'available_slots': available,
+            'occupied_slots': total_slots - available,
+            'occupancy_rate': round((total_slots - available) / total_slots * 100, 1) if total_slots > 0 else 0
+        })
+
+    etag, last_modified = state_validators(db.session, variant=('summary',))
+    return conditional_response(etag, last_modified, build)
@@ -2,19 +2,34 @@
 
 from __future__ import annotations
 
+import base64
+import binascii
+import json
 from datetime import datetime, timezone
+from typing import Any
 
 from flask import Blueprint, current_app, jsonify, request
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from marshmallow import ValidationError
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import joinedload
 
 from app import db, limiter
 from app.authz import require_roles
-from app.models.parking import OccupancyLog, ParkingEvent, ParkingSlot
+from app.conditional import conditional_response, state_validators
+from app.models.parking import (
+    OccupancyLog,
+    ParkingEvent,
+    ParkingSlot,
+    slot_state_query,
+)
 from app.responses import error_response
 from app.schemas import slot_status_schema
+from app.services.metadata_cache import get_metadata_cache
 from app.services.notifications import publish_slot_change
+from app.services.slot_counters import SlotCounterDeltas, current_state_version
+from app.services.slot_state import get_slot_state_cache
+from app.services.telemetry import upsert_latest_readings
 
 slots_bp = Blueprint("slots", __name__)
 
@@ -56,8 +71,77 @@ def _parse_iso_datetime(raw_value: str | None, field_name: str) -> tuple[datetim
     return parsed, None
 
 
-def _apply_slot_update(slot: ParkingSlot, data: dict, *, source: str) -> tuple[bool, bool]:
-    """Apply a single slot update and emit event/log rows if occupancy changed."""
+def _parse_changed_since(raw_value: str | None) -> tuple[int | None, datetime | None, object | None]:
+    """Accept a slot state version (integer) or an ISO-8601 timestamp."""
+    if raw_value is None or not raw_value.strip():
+        return None, None, None
+
+    value = raw_value.strip()
+    if value.isdigit():
+        return int(value), None, None
+
+    parsed, err = _parse_iso_datetime(value, "changed_since")
+    if err:
+        return None, None, error_response(
+            "Invalid changed_since. Use a state version or an ISO-8601 datetime.",
+            400,
+            code="validation_error",
+        )
+    return None, parsed, None
+
+
+def _encode_event_cursor(event: ParkingEvent) -> str:
+    raw = json.dumps({"ts": event.timestamp.isoformat(), "id": event.id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_event_cursor(raw_value: str | None) -> tuple[tuple[datetime, int] | None, object | None]:
+    if raw_value is None or not raw_value.strip():
+        return None, None
+
+    value = raw_value.strip()
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)))
+        return (datetime.fromisoformat(decoded["ts"]), int(decoded["id"])), None
+    except (binascii.Error, ValueError, TypeError, KeyError, UnicodeDecodeError):
+        return None, error_response("Invalid cursor", 400, code="validation_error")
+
+
+def _paginate_events(query, limit: int, cursor: tuple[datetime, int] | None) -> tuple[list[ParkingEvent], str | None]:
+    """Keyset page over (timestamp, id) descending; returns events and the cursor for the next page."""
+    if cursor is not None:
+        cursor_ts, cursor_id = cursor
+        query = query.filter(
+            or_(
+                ParkingEvent.timestamp < cursor_ts,
+                and_(ParkingEvent.timestamp == cursor_ts, ParkingEvent.id < cursor_id),
+            )
+        )
+
+    events = (
+        query.order_by(ParkingEvent.timestamp.desc(), ParkingEvent.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    if len(events) <= limit:
+        return events, None
+    events = events[:limit]
+    return events, _encode_event_cursor(events[-1])
+
+
+def _apply_slot_update(
+    slot: ParkingSlot,
+    data: dict,
+    *,
+    source: str,
+    counters: SlotCounterDeltas,
+    notifications: list[dict[str, Any]],
+) -> tuple[bool, bool]:
+    """Apply a single slot update and emit event/log rows if occupancy changed.
+
+    Occupancy changes are appended to ``notifications``; pass them to ``_publish_committed`` only
+    after the transaction commits, so neither SSE clients nor the ingest cache see rolled-back state.
+    """
     touched = False
     changed_occupancy = False
 
@@ -69,31 +153,53 @@ def _apply_slot_update(slot: ParkingSlot, data: dict, *, source: str) -> tuple[b
             slot.is_occupied = incoming_status
             changed_occupancy = True
             slot.last_status_change = datetime.utcnow()
+            counters.record(
+                lot_id=slot.lot_id,
+                zone_id=slot.zone_id,
+                slot_id=slot.id,
+                occupied_delta=1 if slot.is_occupied else -1,
+            )
             event_type = "entry" if slot.is_occupied else "exit"
             distance_cm = data.get("distance_cm")
 
             db.session.add(
                 ParkingEvent(
                     slot_id=slot.id,
+                    lot_id=slot.lot_id,
                     event_type=event_type,
                     sensor_distance_cm=distance_cm,
                 )
             )
+            status_label = "occupied" if slot.is_occupied else "vacant"
             db.session.add(
                 OccupancyLog(
                     slot_id=slot.id,
-                    status="occupied" if slot.is_occupied else "vacant",
+                    status=status_label,
                     distance_cm=distance_cm,
+                    timestamp=slot.last_status_change,
                 )
             )
-            publish_slot_change(
-                slot_id=slot.id,
-                lot_id=slot.lot_id,
-                zone_id=slot.zone_id,
-                is_occupied=slot.is_occupied,
-                event_type=event_type,
-                source=source,
-                distance_cm=distance_cm,
+            upsert_latest_readings(
+                db.session,
+                [
+                    {
+                        "slot_id": slot.id,
+                        "distance_cm": distance_cm,
+                        "status": status_label,
+                        "timestamp": slot.last_status_change,
+                    }
+                ],
+            )
+            notifications.append(
+                {
+                    "slot_id": slot.id,
+                    "lot_id": slot.lot_id,
+                    "zone_id": slot.zone_id,
+                    "is_occupied": slot.is_occupied,
+                    "event_type": event_type,
+                    "source": source,
+                    "distance_cm": distance_cm,
+                }
             )
 
     if "is_reserved" in data:
@@ -101,10 +207,29 @@ def _apply_slot_update(slot: ParkingSlot, data: dict, *, source: str) -> tuple[b
         if incoming_reserved != slot.is_reserved:
             touched = True
             slot.is_reserved = incoming_reserved
+            counters.record(
+                lot_id=slot.lot_id,
+                zone_id=slot.zone_id,
+                slot_id=slot.id,
+                reserved_delta=1 if slot.is_reserved else -1,
+            )
 
     return touched, changed_occupancy
 
 
+def _publish_committed(notifications: list[dict[str, Any]]) -> None:
+    """Record committed occupancy changes in the ingest cache and notify SSE subscribers."""
+    slot_state_cache = get_slot_state_cache(current_app)
+    for notification in notifications:
+        slot_state_cache.record(
+            notification["slot_id"],
+            lot_id=notification["lot_id"],
+            zone_id=notification["zone_id"],
+            is_occupied=notification["is_occupied"],
+        )
+        publish_slot_change(**notification)
+
+
 @slots_bp.route("/slots")
 @jwt_required(optional=True)
 @limiter.limit(lambda: current_app.config.get("RATE_LIMIT_READ_HEAVY", "120 per minute"))
@@ -117,17 +242,41 @@ def get_all_slots():
     lot_id = request.args.get("lot_id")
     status = request.args.get("status")  # available or occupied
 
-    query = ParkingSlot.query
-
-    if lot_id:
-        query = query.filter_by(lot_id=lot_id)
-    if status == "available":
-        query = query.filter_by(is_occupied=False)
-    elif status == "occupied":
-        query = query.filter_by(is_occupied=True)
-
-    slots = query.all()
-    return jsonify({"slots": [slot.to_dict() for slot in slots], "total": len(slots)})
+    since_version, since_time, since_err = _parse_changed_since(request.args.get("changed_since"))
+    if since_err:
+        return since_err
+
+    def build():
+        # Read the version before the rows so a change committed in between is re-sent, not lost.
+        version = current_state_version(db.session, lot_id=lot_id or None)
+        query = slot_state_query()
+
+        if lot_id:
+            query = query.filter(ParkingSlot.lot_id == lot_id)
+        # Deltas ignore ``status``: a slot that left the filtered set must still reach the client.
+        is_delta = since_version is not None or since_time is not None
+        if status == "available" and not is_delta:
+            query = query.filter(ParkingSlot.is_occupied.is_(False))
+        elif status == "occupied" and not is_delta:
+            query = query.filter(ParkingSlot.is_occupied.is_(True))
+        if since_version is not None:
+            query = query.filter(ParkingSlot.state_version > since_version)
+        elif since_time is not None:
+            query = query.filter(ParkingSlot.last_status_change > since_time)
+
+        slots = get_metadata_cache(current_app).serialize_slots(query.all())
+        payload = {"slots": slots, "total": len(slots), "version": version}
+        if is_delta:
+            payload["changed_since"] = request.args.get("changed_since").strip()
+        return jsonify(payload)
+
+    etag, last_modified = state_validators(
+        db.session,
+        lot_id=lot_id or None,
+        include_telemetry=True,
+        variant=("slots", status, since_version, since_time),
+    )
+    return conditional_response(etag, last_modified, build)
 
 
 @slots_bp.route("/slots/<slot_id>")
@@ -161,8 +310,18 @@ def update_slot_status(slot_id):
     except ValidationError as err:
         return error_response("Validation failed", 400, code="validation_error", details=err.messages)
 
-    touched, changed_occupancy = _apply_slot_update(slot, data, source="api")
+    counters = SlotCounterDeltas()
+    notifications: list[dict[str, Any]] = []
+    touched, changed_occupancy = _apply_slot_update(
+        slot,
+        data,
+        source="api",
+        counters=counters,
+        notifications=notifications,
+    )
+    counters.apply(db.session)
     db.session.commit()
+    _publish_committed(notifications)
 
     return jsonify(
         {
@@ -189,6 +348,8 @@ def batch_update_slot_status():
         )
 
     results = []
+    counters = SlotCounterDeltas()
+    notifications: list[dict[str, Any]] = []
     updated = 0
     unchanged = 0
     failed = 0
@@ -263,7 +424,13 @@ def batch_update_slot_status():
             )
             continue
 
-        touched, changed_occupancy = _apply_slot_update(slot, data, source="api_batch")
+        touched, changed_occupancy = _apply_slot_update(
+            slot,
+            data,
+            source="api_batch",
+            counters=counters,
+            notifications=notifications,
+        )
         if touched:
             updated += 1
         else:
@@ -278,7 +445,9 @@ def batch_update_slot_status():
             }
         )
 
+    counters.apply(db.session)
     db.session.commit()
+    _publish_committed(notifications)
 
     summary = {
         "requested": len(updates),
@@ -301,13 +470,16 @@ def get_slot_events(slot_id):
 
     requested_limit = request.args.get("limit", 50, type=int)
     limit = max(1, min(requested_limit, MAX_EVENTS_LIMIT))
-    events = (
-        ParkingEvent.query.filter_by(slot_id=slot_id)
-        .order_by(ParkingEvent.timestamp.desc())
-        .limit(limit)
-        .all()
+    cursor, cursor_err = _decode_event_cursor(request.args.get("cursor"))
+    if cursor_err:
+        return cursor_err
+
+    events, next_cursor = _paginate_events(
+        ParkingEvent.query.filter_by(slot_id=slot_id),
+        limit,
+        cursor,
     )
-    return jsonify({"events": [event.to_dict() for event in events]})
+    return jsonify({"events": [event.to_dict() for event in events], "next_cursor": next_cursor})
 
 
 @slots_bp.route("/events")
@@ -332,6 +504,9 @@ def get_all_events():
     end_at, end_err = _parse_iso_datetime(request.args.get("end"), "end")
     if end_err:
         return end_err
+    cursor, cursor_err = _decode_event_cursor(request.args.get("cursor"))
+    if cursor_err:
+        return cursor_err
 
     if event_type and event_type not in {"entry", "exit"}:
         return error_response(
@@ -350,7 +525,7 @@ def get_all_events():
     query = ParkingEvent.query.options(joinedload(ParkingEvent.slot).joinedload(ParkingSlot.lot))
 
     if lot_id:
-        query = query.join(ParkingSlot).filter(ParkingSlot.lot_id == lot_id)
+        query = query.filter(ParkingEvent.lot_id == lot_id)
 
     if slot_id:
         query = query.filter(ParkingEvent.slot_id == slot_id)
@@ -364,7 +539,7 @@ def get_all_events():
     if end_at:
         query = query.filter(ParkingEvent.timestamp <= end_at)
 
-    events = query.order_by(ParkingEvent.timestamp.desc()).limit(limit).all()
+    events, next_cursor = _paginate_events(query, limit, cursor)
 
     payload = []
     for event in events:
@@ -377,10 +552,10 @@ def get_all_events():
                 "timestamp": event.timestamp.isoformat() if event.timestamp else None,
                 "slot_id": event.slot_id,
                 "slot_number": slot.slot_number if slot else None,
-                "lot_id": slot.lot_id if slot else None,
+                "lot_id": event.lot_id,
                 "lot_name": lot.name if lot else None,
                 "sensor_distance_cm": event.sensor_distance_cm,
             }
         )
 
-    return jsonify({"events": payload, "total": len(payload)})
+    return jsonify({"events": payload, "total": len(payload), "next_cursor": next_cursor})
@@ -1,7 +1,7 @@
 """
 Marshmallow schemas for request/response validation.
 """
-from marshmallow import Schema, fields, validate, validates, ValidationError
+from marshmallow import Schema, fields, pre_load, validate, validates, ValidationError
 
 
 class UserRegisterSchema(Schema):
@@ -97,10 +97,41 @@ class ParkingEventSchema(Schema):
     """Event data in responses."""
     id = fields.Int()
     slot_id = fields.Str()
+    lot_id = fields.Str()
     event_type = fields.Str()
     timestamp = fields.DateTime()
 
 
+class RecommendationTimeSchema(Schema):
+    """One (day, time) slot in a bulk recommendation request."""
+    day = fields.Str(
+        required=True,
+        validate=validate.OneOf(["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]),
+    )
+    time = fields.Str(required=True, validate=validate.Regexp(r"^([01]?\d|2[0-3]):[0-5]\d$"))
+
+    @pre_load
+    def normalize_day(self, data, **kwargs):
+        if isinstance(data, dict) and isinstance(data.get("day"), str):
+            data = {**data, "day": data["day"].strip().lower()}
+        return data
+
+
+class BulkRecommendationSchema(Schema):
+    """Validates bulk recommendation input for kiosk displays."""
+    destinations = fields.List(
+        fields.Str(validate=validate.Length(min=1, max=100)),
+        required=True,
+        validate=validate.Length(min=1, max=50),
+    )
+    times = fields.List(
+        fields.Nested(RecommendationTimeSchema),
+        required=True,
+        validate=validate.Length(min=1, max=48),
+    )
+    top_k = fields.Int(load_default=3, validate=validate.Range(min=1, max=10))
+
+
 # Schema instances
 user_register_schema = UserRegisterSchema()
 user_login_schema = UserLoginSchema()
@@ -115,3 +146,4 @@ slot_response_schema = SlotResponseSchema()
 slots_response_schema = SlotResponseSchema(many=True)
 event_schema = ParkingEventSchema()
 events_schema = ParkingEventSchema(many=True)
+bulk_recommendation_schema = BulkRecommendationSchema()
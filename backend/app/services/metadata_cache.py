@@ -0,0 +1,242 @@
+"""Process-local read-through cache for static lot, zone and slot metadata.
+
+Names, coordinates, walk times, slot numbers/types and sensor ids change only through
+``create_lot`` and ``flask seed-campus``, so hot read endpoints query just the dynamic
+occupancy columns and join them with this cache in Python. Writers in this process call
+``invalidate()``; other processes pick changes up after ``PRISM_METADATA_CACHE_TTL_SECONDS``,
+or immediately when a row references an id the cache has not seen yet.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from functools import cached_property
+from threading import Lock
+from typing import Any
+
+DEFAULT_TTL_SECONDS = 300.0
+
+
+@dataclass(frozen=True)
+class LotMetadata:
+    id: str
+    name: str
+    location: str | None
+    total_slots: int | None
+    latitude: float | None
+    longitude: float | None
+
+    def to_dict(self, *, available_slots: int | None) -> dict[str, Any]:
+        """Same shape as ``ParkingLot.to_dict()``."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "location": self.location,
+            "total_slots": self.total_slots,
+            "available_slots": available_slots or 0,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+        }
+
+
+@dataclass(frozen=True)
+class ZoneMetadata:
+    id: str
+    lot_id: str
+    name: str
+    walk_times: dict[str, int]
+
+
+@dataclass(frozen=True)
+class SlotMetadata:
+    id: str
+    lot_id: str
+    zone_id: str | None
+    zone_name: str | None
+    slot_number: int
+    slot_type: str | None
+    sensor_id: str | None
+
+
+@dataclass(frozen=True)
+class MetadataSnapshot:
+    """Immutable view of every lot, zone and slot loaded at ``loaded_at`` (monotonic seconds)."""
+
+    lots: dict[str, LotMetadata] = field(default_factory=dict)
+    zones: dict[str, ZoneMetadata] = field(default_factory=dict)
+    slots: dict[str, SlotMetadata] = field(default_factory=dict)
+    loaded_at: float = 0.0
+
+    def covers(
+        self,
+        *,
+        lot_ids: Iterable[str] = (),
+        zone_ids: Iterable[str] = (),
+        slot_ids: Iterable[str] = (),
+    ) -> bool:
+        return (
+            all(lot_id in self.lots for lot_id in lot_ids)
+            and all(zone_id in self.zones for zone_id in zone_ids if zone_id is not None)
+            and all(slot_id in self.slots for slot_id in slot_ids)
+        )
+
+    @cached_property
+    def destination_index(self):
+        """Destination x zone walk-time matrix, built on first use for this snapshot."""
+        from app.services.recommendation import DestinationIndex
+
+        return DestinationIndex(self.zones.values())
+
+    def slot_dict(self, row) -> dict[str, Any]:
+        """Merge a ``slot_state_query()`` row with cached metadata; same shape as ``ParkingSlot.to_dict()``."""
+        meta = self.slots[row.id]
+        return {
+            "id": row.id,
+            "lot_id": meta.lot_id,
+            "zone_id": meta.zone_id,
+            "zone_name": meta.zone_name,
+            "slot_number": meta.slot_number,
+            "is_occupied": row.is_occupied,
+            "is_reserved": row.is_reserved,
+            "slot_type": meta.slot_type,
+            "sensor_id": meta.sensor_id,
+            "latest_distance_cm": row.latest_distance_cm,
+            "last_reading_at": row.last_reading_at.isoformat() if row.last_reading_at else None,
+            "last_status_change": row.last_status_change.isoformat() if row.last_status_change else None,
+            "state_version": row.state_version or 0,
+        }
+
+
+def metadata_cache_ttl_seconds() -> float:
+    return max(0.0, float(os.getenv("PRISM_METADATA_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)))
+
+
+class MetadataCache:
+    """Thread-safe holder of one ``MetadataSnapshot`` with hit/miss accounting."""
+
+    def __init__(self, ttl_seconds: float | None = None):
+        self.ttl_seconds = metadata_cache_ttl_seconds() if ttl_seconds is None else ttl_seconds
+        self._snapshot: MetadataSnapshot | None = None
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def _is_fresh(self, snapshot: MetadataSnapshot | None) -> bool:
+        if snapshot is None:
+            return False
+        if self.ttl_seconds <= 0:
+            return True
+        return time.monotonic() - snapshot.loaded_at <= self.ttl_seconds
+
+    def snapshot(
+        self,
+        *,
+        lot_ids: Iterable[str] = (),
+        zone_ids: Iterable[str] = (),
+        slot_ids: Iterable[str] = (),
+    ) -> MetadataSnapshot:
+        """Return cached metadata, reloading when empty, expired or missing a required id.
+
+        Required ids must come from database rows, never from request input, so an unknown id
+        cannot force repeated reloads. Must run inside an application context.
+        """
+        with self._lock:
+            snapshot = self._snapshot
+        if self._is_fresh(snapshot) and snapshot.covers(lot_ids=lot_ids, zone_ids=zone_ids, slot_ids=slot_ids):
+            with self._lock:
+                self._hits += 1
+            return snapshot
+
+        snapshot = self._load()
+        with self._lock:
+            self._misses += 1
+            self._snapshot = snapshot
+        return snapshot
+
+    def serialize_slots(self, rows) -> list[dict[str, Any]]:
+        """Serialize ``slot_state_query()`` rows with one snapshot lookup for the whole list."""
+        rows = list(rows)
+        snapshot = self.snapshot(slot_ids=[row.id for row in rows])
+        return [snapshot.slot_dict(row) for row in rows]
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._snapshot = None
+            self._invalidations += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            snapshot = self._snapshot
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else None,
+                "invalidations": self._invalidations,
+                "ttl_seconds": self.ttl_seconds,
+                "age_seconds": round(time.monotonic() - snapshot.loaded_at, 1) if snapshot else None,
+                "lots": len(snapshot.lots) if snapshot else 0,
+                "zones": len(snapshot.zones) if snapshot else 0,
+                "slots": len(snapshot.slots) if snapshot else 0,
+            }
+
+    @staticmethod
+    def _load() -> MetadataSnapshot:
+        from app import db
+        from app.models.parking import ParkingLot, ParkingSlot, Zone
+
+        lots = {
+            row.id: LotMetadata(
+                id=row.id,
+                name=row.name,
+                location=row.location,
+                total_slots=row.total_slots,
+                latitude=row.latitude,
+                longitude=row.longitude,
+            )
+            for row in db.session.query(
+                ParkingLot.id,
+                ParkingLot.name,
+                ParkingLot.location,
+                ParkingLot.total_slots,
+                ParkingLot.latitude,
+                ParkingLot.longitude,
+            )
+        }
+        zones = {
+            row.id: ZoneMetadata(id=row.id, lot_id=row.lot_id, name=row.name, walk_times=row.walk_times or {})
+            for row in db.session.query(Zone.id, Zone.lot_id, Zone.name, Zone.walk_times)
+        }
+        slots = {
+            row.id: SlotMetadata(
+                id=row.id,
+                lot_id=row.lot_id,
+                zone_id=row.zone_id,
+                zone_name=zones[row.zone_id].name if row.zone_id in zones else None,
+                slot_number=row.slot_number,
+                slot_type=row.slot_type,
+                sensor_id=row.sensor_id,
+            )
+            for row in db.session.query(
+                ParkingSlot.id,
+                ParkingSlot.lot_id,
+                ParkingSlot.zone_id,
+                ParkingSlot.slot_number,
+                ParkingSlot.slot_type,
+                ParkingSlot.sensor_id,
+            )
+        }
+        return MetadataSnapshot(lots=lots, zones=zones, slots=slots, loaded_at=time.monotonic())
+
+
+def get_metadata_cache(app) -> MetadataCache:
+    """Return the metadata cache bound to a Flask app, creating it on first use."""
+    cache = app.extensions.get("prism_metadata")
+    if cache is None:
+        cache = MetadataCache()
+        app.extensions["prism_metadata"] = cache
+    return cache
@@ -5,11 +5,17 @@ from __future__ import annotations
 import json
 import logging
 import os
+from dataclasses import dataclass
 from datetime import datetime
+from threading import Event, Lock, Thread
 from typing import Any
 
 import paho.mqtt.client as mqtt
 
+from app.services.occupancy_filter import OccupancyFilter
+from app.services.slot_state import CachedSlot, get_slot_state_cache
+from app.services.worker_pool import OVERFLOW_POLICIES, PartitionedWorkerPool
+
 logger = logging.getLogger(__name__)
 
 MQTT_BROKER = os.getenv("MQTT_BROKER_HOST", "localhost")
@@ -17,9 +23,25 @@ MQTT_PORT = int(os.getenv("MQTT_BROKER_PORT", 1883))
 MQTT_TOPIC_PATTERN = "prism/+/slot/+"  # prism/{lot_id}/slot/{slot_id}
 HEARTBEAT_TOPIC_PATTERN = "prism/+/heartbeat"
 
-# Sensor threshold (cm) - below this = occupied
+# Sensor threshold (cm) - below this = occupied; default for the filter's enter/exit thresholds
 OCCUPANCY_THRESHOLD = float(os.getenv("PRISM_OCCUPANCY_THRESHOLD_CM", 15))
 
+# immediate: one transaction per reading; buffered: bulk flush on size/time threshold
+INGEST_MODES = {"immediate", "buffered"}
+# all: one occupancy_logs row per reading; transitions: only when occupancy flips
+OCCUPANCY_LOG_POLICIES = {"all", "transitions"}
+
+
+@dataclass(frozen=True)
+class SlotReading:
+    """Parsed slot telemetry waiting to be persisted."""
+
+    lot_id: str
+    slot_id: str
+    distance_cm: float
+    reported_occupied: bool | None
+    received_at: datetime
+
 
 class MQTTService:
     """Handles MQTT connection lifecycle and sensor message processing."""
@@ -28,6 +50,66 @@ class MQTTService:
         self.app = app
         self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
 
+        ingest_mode = os.getenv("PRISM_MQTT_INGEST_MODE", "immediate").strip().lower()
+        if ingest_mode not in INGEST_MODES:
+            logger.warning("MQTT ingest mode unknown, using immediate | ingest_mode=%s", ingest_mode)
+            ingest_mode = "immediate"
+        self.ingest_mode = ingest_mode
+        self.flush_max_readings = max(1, int(os.getenv("PRISM_MQTT_FLUSH_MAX_READINGS", 200)))
+        self.flush_interval_seconds = max(
+            0.05,
+            float(os.getenv("PRISM_MQTT_FLUSH_INTERVAL_SECONDS", 1.0)),
+        )
+        # A failed flush is retried with the next one this many times before it is dropped.
+        self.flush_max_retries = max(0, int(os.getenv("PRISM_MQTT_FLUSH_MAX_RETRIES", 3)))
+        self._buffer: list[SlotReading] = []
+        self._buffer_lock = Lock()
+        self._flush_lock = Lock()
+        self._flush_stop = Event()
+        self._flush_wakeup = Event()
+        self._flush_thread: Thread | None = None
+        self._retry_batch: list[SlotReading] = []
+        self._retry_attempts = 0
+        self._flush_failures = 0
+        self._dropped_readings = 0
+
+        occupancy_log_policy = os.getenv("PRISM_OCCUPANCY_LOG_POLICY", "all").strip().lower()
+        if occupancy_log_policy not in OCCUPANCY_LOG_POLICIES:
+            logger.warning(
+                "Occupancy log policy unknown, using all | occupancy_log_policy=%s",
+                occupancy_log_policy,
+            )
+            occupancy_log_policy = "all"
+        self.occupancy_log_policy = occupancy_log_policy
+        # Either threshold > 0 enables sensor_readings thinning; transitions are always stored.
+        self.reading_deadband_cm = max(0.0, float(os.getenv("PRISM_SENSOR_READING_DEADBAND_CM", 0)))
+        self.reading_max_interval_seconds = max(
+            0.0,
+            float(os.getenv("PRISM_SENSOR_READING_MAX_INTERVAL_SECONDS", 0)),
+        )
+        self._last_stored_readings: dict[str, tuple[float, datetime]] = {}
+        self.occupancy_filter = OccupancyFilter.from_env(OCCUPANCY_THRESHOLD)
+
+        self.use_slot_cache = os.getenv("PRISM_MQTT_SLOT_CACHE", "true").lower() == "true"
+        self.slot_cache_refresh_seconds = float(
+            os.getenv("PRISM_MQTT_SLOT_CACHE_REFRESH_SECONDS", 300)
+        )
+
+        worker_count = max(0, int(os.getenv("PRISM_MQTT_WORKERS", 2)))
+        overflow_policy = os.getenv("PRISM_MQTT_OVERFLOW_POLICY", "drop_oldest").strip().lower()
+        if overflow_policy not in OVERFLOW_POLICIES:
+            logger.warning("MQTT overflow policy unknown, using drop_oldest | overflow_policy=%s", overflow_policy)
+            overflow_policy = "drop_oldest"
+        self._pool: PartitionedWorkerPool | None = None
+        if worker_count > 0:
+            self._pool = PartitionedWorkerPool(
+                self._process_queued_message,
+                workers=worker_count,
+                queue_size=int(os.getenv("PRISM_MQTT_QUEUE_SIZE", 1000)),
+                overflow_policy=overflow_policy,
+                name="prism-mqtt-worker",
+            )
+
         self.reconnect_min_delay = max(1, int(os.getenv("MQTT_RECONNECT_MIN_DELAY", 1)))
         self.reconnect_max_delay = max(
             self.reconnect_min_delay,
@@ -45,6 +127,9 @@ class MQTTService:
         self.client.on_message = self._on_message
         self.client.on_disconnect = self._on_disconnect
 
+        if app is not None:
+            app.extensions["prism_mqtt"] = self
+
     def _next_backoff_seconds(self) -> int:
         return min(
             self.reconnect_max_delay,
@@ -96,13 +181,31 @@ class MQTTService:
         )
 
     def _on_message(self, client, userdata, msg):
-        """Process incoming MQTT messages."""
+        """Route incoming MQTT messages to a worker, or process inline without a pool."""
+        if self._pool is None or not self._pool.running:
+            self._process_message(msg.topic, msg.payload)
+            return
+
+        # Only the topic is inspected on the network thread; parsing and DB work run on workers.
         topic_parts = msg.topic.split("/")
+        if len(topic_parts) == 4 and topic_parts[2] == "slot":
+            key = self._resolve_slot_db_id(topic_parts[1], topic_parts[3])
+        else:
+            key = msg.topic
+        self._pool.submit(key, (msg.topic, msg.payload))
+
+    def _process_queued_message(self, item: tuple[str, bytes]) -> None:
+        topic, raw_payload = item
+        self._process_message(topic, raw_payload)
+
+    def _process_message(self, topic: str, raw_payload: bytes) -> None:
+        """Parse and dispatch one MQTT message."""
+        topic_parts = topic.split("/")
 
         try:
-            payload = json.loads(msg.payload.decode("utf-8"))
+            payload = json.loads(raw_payload.decode("utf-8"))
         except (UnicodeDecodeError, json.JSONDecodeError) as exc:
-            logger.warning("MQTT payload parse failure | topic=%s error=%s", msg.topic, exc)
+            logger.warning("MQTT payload parse failure | topic=%s error=%s", topic, exc)
             return
 
         try:
@@ -117,9 +220,9 @@ class MQTTService:
                 self._handle_slot_update(lot_id, slot_topic_id, payload)
                 return
 
-            logger.warning("MQTT topic pattern mismatch | topic=%s", msg.topic)
+            logger.warning("MQTT topic pattern mismatch | topic=%s", topic)
         except Exception:
-            logger.exception("MQTT message processing failed | topic=%s", msg.topic)
+            logger.exception("MQTT message processing failed | topic=%s", topic)
 
     def _resolve_slot_db_id(self, lot_id: str, slot_topic_id: str) -> str:
         if slot_topic_id.startswith(f"{lot_id}-"):
@@ -149,85 +252,356 @@ class MQTTService:
             )
             return
 
+        reported_occupied = None
         if "occupied" in payload and isinstance(payload["occupied"], bool):
-            is_occupied = payload["occupied"]
-        else:
-            is_occupied = distance < OCCUPANCY_THRESHOLD
+            reported_occupied = payload["occupied"]
 
         slot_id = self._resolve_slot_db_id(lot_id, slot_topic_id)
 
         logger.info(
-            "MQTT slot update | lot_id=%s slot_id=%s distance_cm=%.2f occupied=%s",
+            "MQTT slot update | lot_id=%s slot_id=%s distance_cm=%.2f reported_occupied=%s",
             lot_id,
             slot_id,
             distance,
-            is_occupied,
+            reported_occupied,
         )
 
         if not self.app:
             return
 
-        with self.app.app_context():
-            from app import db
-            from app.models.parking import OccupancyLog, ParkingEvent, ParkingSlot, SensorReading
-            from app.services.notifications import publish_slot_change
-
-            slot = db.session.get(ParkingSlot, slot_id)
-            if slot is None:
+        reading = SlotReading(
+            lot_id=lot_id,
+            slot_id=slot_id,
+            distance_cm=distance,
+            reported_occupied=reported_occupied,
+            received_at=datetime.utcnow(),
+        )
+        if self.ingest_mode == "buffered":
+            self._enqueue_reading(reading)
+        else:
+            self._persist_readings([reading])
+
+    def _enqueue_reading(self, reading: SlotReading) -> None:
+        with self._buffer_lock:
+            self._buffer.append(reading)
+            should_flush = len(self._buffer) >= self.flush_max_readings
+
+        if should_flush:
+            if self._flush_thread is not None:
+                # Hand off to the flusher so a slow commit never stalls message intake.
+                self._flush_wakeup.set()
+            else:
+                self.flush()
+
+    def flush(self) -> int:
+        """Persist buffered readings in one transaction and return how many were flushed.
+
+        A batch whose commit fails is kept and retried ahead of newer readings on the next
+        flush, up to ``flush_max_retries`` times, then dropped and counted.
+        """
+        # Swap under the flush lock so concurrent flushes commit in arrival order.
+        with self._flush_lock:
+            with self._buffer_lock:
+                pending, self._buffer = self._retry_batch + self._buffer, []
+            self._retry_batch = []
+            if not pending or self._persist_readings(pending):
+                self._retry_attempts = 0
+                return len(pending)
+
+            self._flush_failures += 1
+            self._retry_attempts += 1
+            if self._retry_attempts <= self.flush_max_retries:
+                self._retry_batch = pending
                 logger.warning(
-                    "MQTT slot update dropped: slot not found | lot_id=%s slot_id=%s",
-                    lot_id,
-                    slot_id,
+                    "MQTT flush failed; batch kept for retry | readings=%s attempt=%s max_retries=%s",
+                    len(pending),
+                    self._retry_attempts,
+                    self.flush_max_retries,
                 )
-                return
+            else:
+                self._dropped_readings += len(pending)
+                self._retry_attempts = 0
+                logger.error(
+                    "MQTT flush failed too often; readings dropped | readings=%s retries=%s",
+                    len(pending),
+                    self.flush_max_retries,
+                )
+        return 0
+
+    def _flush_loop(self) -> None:
+        while not self._flush_stop.is_set():
+            self._flush_wakeup.wait(self.flush_interval_seconds)
+            self._flush_wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("MQTT periodic flush failed")
+
+    def _start_flusher(self) -> None:
+        if self._flush_thread is not None:
+            return
+        self._flush_stop.clear()
+        self._flush_wakeup.clear()
+        self._flush_thread = Thread(
+            target=self._flush_loop,
+            name="prism-mqtt-flush",
+            daemon=True,
+        )
+        self._flush_thread.start()
+
+    def _slot_states(self, slot_ids: set[str]) -> dict[str, CachedSlot]:
+        """Resolve current slot state from the warm cache, or the database when cold."""
+        if self.use_slot_cache:
+            slot_state_cache = get_slot_state_cache(self.app)
+            if slot_state_cache.is_stale(self.slot_cache_refresh_seconds):
+                slot_state_cache.warm()
+            states = {}
+            for slot_id in slot_ids:
+                cached = slot_state_cache.get(slot_id)
+                if cached is not None:
+                    states[slot_id] = cached
+            return states
+
+        from app import db
+        from app.models.parking import ParkingSlot
+
+        rows = (
+            db.session.query(
+                ParkingSlot.id,
+                ParkingSlot.lot_id,
+                ParkingSlot.zone_id,
+                ParkingSlot.is_occupied,
+            )
+            .filter(ParkingSlot.id.in_(slot_ids))
+            .all()
+        )
+        return {
+            row.id: CachedSlot(lot_id=row.lot_id, zone_id=row.zone_id, is_occupied=bool(row.is_occupied))
+            for row in rows
+        }
+
+    def _should_store_reading(self, reading: SlotReading, *, transition: bool) -> bool:
+        """Apply the sensor_readings deadband/max-interval thinning policy."""
+        if self.reading_deadband_cm <= 0 and self.reading_max_interval_seconds <= 0:
+            return True
+
+        last = self._last_stored_readings.get(reading.slot_id)
+        if transition or last is None:
+            return True
+
+        last_distance, last_at = last
+        if self.reading_deadband_cm > 0 and abs(reading.distance_cm - last_distance) >= self.reading_deadband_cm:
+            return True
+        if (
+            self.reading_max_interval_seconds > 0
+            and (reading.received_at - last_at).total_seconds() >= self.reading_max_interval_seconds
+        ):
+            return True
+        return False
+
+    def _persist_readings(self, readings: list[SlotReading]) -> bool:
+        """Apply readings in order and write all resulting rows with bulk inserts.
+
+        Returns False when the commit failed and nothing was written.
+        """
+        with self.app.app_context():
+            from sqlalchemy import insert
 
-            old_status = slot.is_occupied
-            slot.is_occupied = is_occupied
-
-            if old_status != is_occupied:
-                slot.last_status_change = datetime.utcnow()
-                event_type = "entry" if is_occupied else "exit"
-                db.session.add(
-                    ParkingEvent(
-                        slot_id=slot.id,
-                        event_type=event_type,
-                        sensor_distance_cm=distance,
+            from app import db
+            from app.models.parking import OccupancyLog, ParkingEvent, SensorReading
+            from app.services.notifications import publish_slot_change
+            from app.services.slot_counters import SlotCounterDeltas
+            from app.services.telemetry import upsert_latest_readings
+
+            slot_ids = {reading.slot_id for reading in readings}
+            states = self._slot_states(slot_ids)
+
+            slot_updates: dict[str, dict[str, Any]] = {}
+            transitions: list[tuple[str, dict[str, Any], dict[str, Any]]] = []
+            counters = SlotCounterDeltas()
+            event_rows: list[dict[str, Any]] = []
+            reading_rows: list[dict[str, Any]] = []
+            log_rows: list[dict[str, Any]] = []
+            latest_rows: list[dict[str, Any]] = []
+            notifications: list[dict[str, Any]] = []
+
+            for reading in readings:
+                state = states.get(reading.slot_id)
+                if state is None:
+                    logger.warning(
+                        "MQTT slot update dropped: slot not found | lot_id=%s slot_id=%s",
+                        reading.lot_id,
+                        reading.slot_id,
                     )
+                    continue
+
+                # Debounce before anything is written or published.
+                is_occupied = self.occupancy_filter.decide(
+                    reading.slot_id,
+                    distance_cm=reading.distance_cm,
+                    reported_occupied=reading.reported_occupied,
+                    current=state.is_occupied,
+                    at=reading.received_at,
                 )
-                publish_slot_change(
-                    slot_id=slot.id,
-                    lot_id=slot.lot_id,
-                    zone_id=slot.zone_id,
-                    is_occupied=slot.is_occupied,
-                    event_type=event_type,
-                    source="mqtt",
-                    distance_cm=distance,
-                )
+                transition = state.is_occupied != is_occupied
+                if transition:
+                    # The database must still hold the state this batch started from.
+                    expected = slot_updates.get(reading.slot_id, {}).get("expected", state.is_occupied)
+                    state = CachedSlot(
+                        lot_id=state.lot_id,
+                        zone_id=state.zone_id,
+                        is_occupied=is_occupied,
+                    )
+                    states[reading.slot_id] = state
+                    slot_updates[reading.slot_id] = {
+                        "slot_id": reading.slot_id,
+                        "expected": expected,
+                        "new_occupied": is_occupied,
+                        "changed_at": reading.received_at,
+                    }
+                    event_type = "entry" if is_occupied else "exit"
+                    transitions.append(
+                        (
+                            reading.slot_id,
+                            {
+                                "slot_id": reading.slot_id,
+                                "lot_id": state.lot_id,
+                                "event_type": event_type,
+                                "sensor_distance_cm": reading.distance_cm,
+                                "timestamp": reading.received_at,
+                            },
+                            {
+                                "slot_id": reading.slot_id,
+                                "lot_id": state.lot_id,
+                                "zone_id": state.zone_id,
+                                "is_occupied": is_occupied,
+                                "event_type": event_type,
+                                "source": "mqtt",
+                                "distance_cm": reading.distance_cm,
+                            },
+                        )
+                    )
 
-            db.session.add(
-                SensorReading(
-                    slot_id=slot.id,
-                    distance_cm=distance,
-                    is_occupied=is_occupied,
+                latest_rows.append(
+                    {
+                        "slot_id": reading.slot_id,
+                        "distance_cm": reading.distance_cm,
+                        "status": "occupied" if is_occupied else "vacant",
+                        "timestamp": reading.received_at,
+                    }
                 )
-            )
-            db.session.add(
-                OccupancyLog(
-                    slot_id=slot.id,
-                    status="occupied" if is_occupied else "vacant",
-                    distance_cm=distance,
+                if self._should_store_reading(reading, transition=transition):
+                    self._last_stored_readings[reading.slot_id] = (reading.distance_cm, reading.received_at)
+                    reading_rows.append(
+                        {
+                            "slot_id": reading.slot_id,
+                            "distance_cm": reading.distance_cm,
+                            "is_occupied": is_occupied,
+                            "timestamp": reading.received_at,
+                        }
+                    )
+                if transition or self.occupancy_log_policy == "all":
+                    log_rows.append(
+                        {
+                            "slot_id": reading.slot_id,
+                            "status": "occupied" if is_occupied else "vacant",
+                            "distance_cm": reading.distance_cm,
+                            "timestamp": reading.received_at,
+                        }
+                    )
+
+            # Only slots whose occupancy flipped touch parking_slots at all, and only rows that still
+            # hold the expected state change: a stale cache must not replay a transition another
+            # process or an API override already applied.
+            applied = self._apply_slot_transitions(db.session, slot_updates.values())
+            stale_slot_ids = set(slot_updates) - applied
+            for slot_id, event_row, notification in transitions:
+                if slot_id not in applied:
+                    continue
+                counters.record(
+                    lot_id=event_row["lot_id"],
+                    zone_id=notification["zone_id"],
+                    slot_id=slot_id,
+                    occupied_delta=1 if notification["is_occupied"] else -1,
                 )
-            )
+                event_rows.append(event_row)
+                notifications.append(notification)
+            if applied:
+                counters.apply(db.session)
+            if event_rows:
+                db.session.execute(insert(ParkingEvent), event_rows)
+            if reading_rows:
+                db.session.execute(insert(SensorReading), reading_rows)
+            if log_rows:
+                db.session.execute(insert(OccupancyLog), log_rows)
+            upsert_latest_readings(db.session, latest_rows)
 
             try:
                 db.session.commit()
             except Exception:
                 db.session.rollback()
+                # Only this batch's slots ran ahead of the database; other workers' slots are intact.
+                for slot_id in slot_ids:
+                    self._last_stored_readings.pop(slot_id, None)
+                    self.occupancy_filter.reset(slot_id)
+                if self.use_slot_cache:
+                    # Cached state may now be ahead of the database; reload on next batch.
+                    get_slot_state_cache(self.app).clear()
                 logger.exception(
-                    "MQTT slot update commit failed | lot_id=%s slot_id=%s",
-                    lot_id,
-                    slot_id,
+                    "MQTT slot update commit failed | readings=%s slots=%s",
+                    len(readings),
+                    len(slot_ids),
+                )
+                return False
+
+            if stale_slot_ids:
+                logger.warning(
+                    "MQTT slot transitions skipped: slot state changed elsewhere | slots=%s",
+                    sorted(stale_slot_ids),
                 )
+                for slot_id in stale_slot_ids:
+                    self.occupancy_filter.reset(slot_id)
+
+            if self.use_slot_cache:
+                slot_state_cache = get_slot_state_cache(self.app)
+                for slot_id, params in slot_updates.items():
+                    state = states[slot_id]
+                    # A skipped row holds the opposite of what this batch expected.
+                    slot_state_cache.record(
+                        slot_id,
+                        lot_id=state.lot_id,
+                        zone_id=state.zone_id,
+                        is_occupied=state.is_occupied if slot_id in applied else not params["expected"],
+                    )
+
+            for notification in notifications:
+                publish_slot_change(**notification)
+        return True
+
+    @staticmethod
+    def _apply_slot_transitions(session, updates) -> set[str]:
+        """Conditionally update each slot; return the ids whose row still held ``expected``."""
+        from sqlalchemy import bindparam, update
+
+        from app.models.parking import ParkingSlot
+
+        table = ParkingSlot.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("slot_id"), table.c.is_occupied == bindparam("expected"))
+            .values(is_occupied=bindparam("new_occupied"), last_status_change=bindparam("changed_at"))
+        )
+        use_returning = session.get_bind().dialect.update_returning
+        if use_returning:
+            stmt = stmt.returning(table.c.id)
+
+        # One statement per row so each match is known; only transitions reach this point.
+        applied = set()
+        for params in updates:
+            result = session.execute(stmt, params)
+            if (result.first() is not None) if use_returning else result.rowcount == 1:
+                applied.add(params["slot_id"])
+        return applied
 
     def _handle_heartbeat(self, lot_id: str, payload: dict[str, Any]):
         """Process device heartbeat."""
@@ -240,23 +614,73 @@ class MQTTService:
             payload.get("wifi_rssi"),
         )
 
+    def warm_slot_cache(self) -> None:
+        """Load slot state into the process-local cache before messages arrive."""
+        if not self.app or not self.use_slot_cache:
+            return
+        try:
+            with self.app.app_context():
+                slot_count = get_slot_state_cache(self.app).warm()
+            logger.info("MQTT slot cache warmed | slots=%s", slot_count)
+        except Exception:
+            logger.exception("MQTT slot cache warm-up failed; falling back to lazy warm-up")
+
     def start(self):
         """Connect to broker and start processing."""
+        self.warm_slot_cache()
+
+        if self._pool is not None:
+            self._pool.start()
+
+        if self.ingest_mode == "buffered":
+            self._start_flusher()
+
         try:
             self.client.connect(MQTT_BROKER, MQTT_PORT, 60)
             self.client.loop_start()
             logger.info(
-                "MQTT service started | broker=%s port=%s reconnect_min_delay=%s reconnect_max_delay=%s",
+                "MQTT service started | broker=%s port=%s reconnect_min_delay=%s reconnect_max_delay=%s "
+                "ingest_mode=%s flush_max_readings=%s flush_interval_seconds=%s workers=%s",
                 MQTT_BROKER,
                 MQTT_PORT,
                 self.reconnect_min_delay,
                 self.reconnect_max_delay,
+                self.ingest_mode,
+                self.flush_max_readings,
+                self.flush_interval_seconds,
+                self._pool.workers if self._pool is not None else 0,
             )
         except Exception:
             logger.exception("MQTT startup failed | broker=%s port=%s", MQTT_BROKER, MQTT_PORT)
 
+    def stats(self) -> dict[str, Any]:
+        """Return ingest queue and buffer statistics."""
+        with self._buffer_lock:
+            buffered = len(self._buffer)
+        return {
+            "ingest_mode": self.ingest_mode,
+            "buffered_readings": buffered,
+            "flush_max_readings": self.flush_max_readings,
+            "flush_interval_seconds": self.flush_interval_seconds,
+            "retry_readings": len(self._retry_batch),
+            "flush_failures": self._flush_failures,
+            "dropped_readings": self._dropped_readings,
+            "workers": self._pool.stats() if self._pool is not None else None,
+        }
+
     def stop(self):
-        """Stop MQTT processing."""
+        """Stop MQTT processing and flush any buffered readings."""
         self.client.loop_stop()
         self.client.disconnect()
-        logger.info("MQTT service stopped")
+
+        if self._pool is not None:
+            self._pool.stop()
+
+        if self._flush_thread is not None:
+            self._flush_stop.set()
+            self._flush_wakeup.set()
+            self._flush_thread.join(timeout=max(5.0, self.flush_interval_seconds * 2))
+            self._flush_thread = None
+
+        flushed = self.flush()
+        logger.info("MQTT service stopped | flushed_readings=%s", flushed)
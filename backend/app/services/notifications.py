@@ -1,53 +1,442 @@
-"""In-memory event broadcaster for SSE notifications."""
+"""Event broadcaster for SSE notifications.
+
+Each process keeps its own broadcaster, subscriber queues and replay buffer. A transport relays
+published events to the broadcasters of other processes: the default keeps events in-process, and
+``PRISM_NOTIFY_TRANSPORT=mqtt`` fans them out over a topic on the existing MQTT broker so SSE
+clients on every gunicorn worker or host see every slot change.
+"""
 
 from __future__ import annotations
 
+import json
+import logging
+import os
+from collections import deque
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass
 from datetime import datetime
 from queue import Full, Queue
 from threading import Lock
 from typing import Any
 from uuid import uuid4
 
+logger = logging.getLogger(__name__)
+
+ALL_TOPIC = "all"
+DEFAULT_REPLAY_SIZE = 1000
+DEFAULT_MQTT_TOPIC = "prism/_bus/notifications"
+NOTIFY_TRANSPORTS = {"inprocess", "mqtt"}
+
+
+def lot_topic(lot_id: str) -> str:
+    return f"lot:{lot_id}"
+
+
+def zone_topic(zone_id: str) -> str:
+    return f"zone:{zone_id}"
+
+
+def event_topics(event: dict[str, Any]) -> list[str]:
+    """Topics an event is routed to: always ``all``, plus its lot and zone when present."""
+    topics = [ALL_TOPIC]
+    if event.get("lot_id"):
+        topics.append(lot_topic(event["lot_id"]))
+    if event.get("zone_id"):
+        topics.append(zone_topic(event["zone_id"]))
+    return topics
+
+
+@dataclass(frozen=True, slots=True)
+class BroadcastEvent:
+    """A published event with its stream id and its JSON body, serialized once at publish time."""
+
+    id: str
+    payload: dict[str, Any]
+    data: str
+
+    @property
+    def type(self) -> str:
+        return str(self.payload.get("type", "message"))
+
+
+def coalesce_events(events: Sequence[BroadcastEvent]) -> list[BroadcastEvent]:
+    """Keep only the latest event per slot, ordered by when that latest event was published."""
+    latest: dict[str, BroadcastEvent] = {}
+    for event in events:
+        key = f"slot:{event.payload['slot_id']}" if event.payload.get("slot_id") else f"id:{event.id}"
+        latest.pop(key, None)
+        latest[key] = event
+    return list(latest.values())
+
+
+def batch_data(events: Sequence[BroadcastEvent], *, received: int) -> str:
+    """``slot_batch`` JSON body built from the events' pre-serialized data without re-encoding them."""
+    return (
+        '{"type": "slot_batch"'
+        f', "count": {len(events)}'
+        f', "coalesced": {received - len(events)}'
+        f', "first_event_id": {json.dumps(events[0].id)}'
+        f', "last_event_id": {json.dumps(events[-1].id)}'
+        f', "events": [{", ".join(event.data for event in events)}]}}'
+    )
+
+
+class BroadcastTransport:
+    """Relays events between processes; this base class is the in-process default and relays nothing."""
+
+    name = "inprocess"
+
+    def start(self, origin: str, deliver: Callable[[dict[str, Any]], None]) -> None:
+        """Begin receiving; ``deliver`` publishes a remote event to local subscribers only."""
+
+    def send(self, data: str) -> None:
+        """Relay one locally published event, given as its serialized JSON body."""
+
+    def stop(self) -> None:
+        pass
+
+    def after_fork(self) -> None:
+        """Drop connections inherited from the parent process; the next ``start`` opens new ones."""
+
+    def stats(self) -> dict[str, Any]:
+        return {"name": self.name}
+
+
+class MQTTBroadcastTransport(BroadcastTransport):
+    """Fans events out through one topic on the MQTT broker; every process publishes and subscribes.
+
+    Messages carry the sender's origin token so a process skips its own events, which were already
+    delivered locally. ``client`` defaults to a paho client and may be any object with its API.
+    """
+
+    name = "mqtt"
+
+    def __init__(self, *, host: str, port: int, topic: str = DEFAULT_MQTT_TOPIC, qos: int = 1, client=None):
+        self.host = host
+        self.port = port
+        self.topic = topic
+        self.qos = qos
+        self._injected_client = client
+        self._client = client
+        self._reset_state()
+
+    def _reset_state(self) -> None:
+        self._origin: str | None = None
+        self._deliver: Callable[[dict[str, Any]], None] | None = None
+        self._connected = False
+        self._sent = 0
+        self._received = 0
+        self._skipped_own = 0
+        self._send_errors = 0
+        self._decode_errors = 0
+
+    def start(self, origin: str, deliver: Callable[[dict[str, Any]], None]) -> None:
+        self._origin = origin
+        self._deliver = deliver
+        if self._client is None:
+            import paho.mqtt.client as mqtt
+
+            self._client = mqtt.Client(
+                mqtt.CallbackAPIVersion.VERSION2,
+                client_id=f"prism-notify-{origin}-{os.getpid()}",
+            )
+        self._client.on_connect = self._on_connect
+        self._client.on_disconnect = self._on_disconnect
+        self._client.on_message = self._on_message
+        # Non-blocking: the network loop connects, retries and resubscribes in the background.
+        self._client.connect_async(self.host, self.port, 60)
+        self._client.loop_start()
+        logger.info(
+            "Notification transport started | transport=mqtt broker=%s port=%s topic=%s",
+            self.host,
+            self.port,
+            self.topic,
+        )
+
+    def _on_connect(self, client, userdata, flags, reason_code, properties):
+        self._connected = True
+        client.subscribe(self.topic, qos=self.qos)
+
+    def _on_disconnect(self, client, userdata, disconnect_flags, reason_code, properties):
+        self._connected = False
+
+    def _on_message(self, client, userdata, msg):
+        try:
+            envelope = json.loads(msg.payload)
+            origin, event = envelope["origin"], envelope["event"]
+            if not isinstance(event, dict):
+                raise TypeError("event must be an object")
+        except (ValueError, KeyError, TypeError) as exc:
+            self._decode_errors += 1
+            logger.warning("Notification transport message rejected | topic=%s error=%s", msg.topic, exc)
+            return
+        if origin == self._origin:
+            self._skipped_own += 1
+            return
+        self._received += 1
+        self._deliver(event)
+
+    def send(self, data: str) -> None:
+        if self._client is None:
+            return
+        # Embed the already serialized event instead of encoding it again.
+        payload = f'{{"origin": {json.dumps(self._origin)}, "event": {data}}}'
+        result = self._client.publish(self.topic, payload, qos=self.qos)
+        if result.rc == 0:
+            self._sent += 1
+        else:
+            self._send_errors += 1
+
+    def stop(self) -> None:
+        if self._client is None:
+            return
+        self._client.loop_stop()
+        self._client.disconnect()
+        self._connected = False
+
+    def after_fork(self) -> None:
+        """Forget the parent's paho client, socket and network thread without touching them.
+
+        The next ``start`` builds a client with this process's pid in its id; sharing the
+        parent's id would make the broker drop one of the two sessions. An injected client is
+        the caller's to manage and is kept.
+        """
+        self._client = self._injected_client
+        self._reset_state()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "topic": self.topic,
+            "connected": self._connected,
+            "sent": self._sent,
+            "received": self._received,
+            "skipped_own": self._skipped_own,
+            "send_errors": self._send_errors,
+            "decode_errors": self._decode_errors,
+        }
+
 
 class EventBroadcaster:
-    """Thread-safe in-memory pub/sub broadcaster."""
+    """Thread-safe in-memory pub/sub broadcaster with lot/zone topic routing.
 
-    def __init__(self, queue_size: int = 200):
+    Every published event gets an id ``<instance>-<sequence>`` and is kept in a bounded replay
+    buffer. The instance token changes per process, so an id issued by another worker or before
+    a restart is recognized as unknown instead of replaying the wrong range.
+    """
+
+    def __init__(self, queue_size: int = 200, replay_size: int = DEFAULT_REPLAY_SIZE):
         self._queue_size = queue_size
+        self._replay_size = max(0, replay_size)
+        self._transport = BroadcastTransport()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.instance = uuid4().hex[:8]
+        self._sequence = 0
+        self._replay: deque[tuple[int, tuple[str, ...], BroadcastEvent]] = deque(maxlen=self._replay_size)
         self._subs: dict[str, Queue] = {}
+        self._topic_subs: dict[str, set[str]] = {}
+        self._sub_topics: dict[str, frozenset[str]] = {}
         self._lock = Lock()
+        self._transport_started = False
+        self._published = 0
+        self._enqueued = 0
+        self._dropped = 0
+        self._filtered = 0
+        self._replayed = 0
+        self._replay_misses = 0
+        self._remote_published = 0
+
+    def after_fork(self) -> None:
+        """Forked workers (gunicorn ``--preload``) need their own ids, subscribers and transport connection."""
+        self._transport.after_fork()
+        self._reset()
+
+    def use_transport(self, transport: BroadcastTransport) -> None:
+        """Swap the cross-process transport; it connects lazily on first subscribe or broadcast."""
+        with self._lock:
+            previous, started = self._transport, self._transport_started
+            self._transport = transport
+            self._transport_started = False
+        if started:
+            previous.stop()
+
+    def _ensure_transport(self) -> BroadcastTransport:
+        with self._lock:
+            transport, start = self._transport, not self._transport_started
+            self._transport_started = True
+        if start:
+            try:
+                transport.start(self.instance, self._publish_remote)
+            except Exception:
+                logger.exception("Notification transport failed to start | transport=%s", transport.name)
+        return transport
 
-    def subscribe(self) -> tuple[str, Queue]:
+    def _publish_remote(self, event: dict[str, Any]) -> None:
+        self._publish(event)
+        with self._lock:
+            self._remote_published += 1
+
+    def event_id(self, sequence: int) -> str:
+        return f"{self.instance}-{sequence}"
+
+    def _parse_event_id(self, event_id: str) -> int | None:
+        instance, _, sequence = event_id.strip().rpartition("-")
+        if instance != self.instance or not sequence.isdigit():
+            return None
+        return int(sequence)
+
+    def _replay_after(self, last_event_id: str, topics: frozenset[str]) -> list[BroadcastEvent] | None:
+        """Buffered events after ``last_event_id`` for ``topics``; None when the range is not covered."""
+        last_sequence = self._parse_event_id(last_event_id)
+        if last_sequence is None or last_sequence > self._sequence:
+            return None
+        oldest = self._replay[0][0] if self._replay else self._sequence + 1
+        if last_sequence < oldest - 1:
+            return None
+        return [
+            event
+            for sequence, event_topic_list, event in self._replay
+            if sequence > last_sequence and not topics.isdisjoint(event_topic_list)
+        ]
+
+    def subscribe(
+        self,
+        topics: Iterable[str] | None = None,
+        *,
+        last_event_id: str | None = None,
+    ) -> tuple[str, Queue, list[BroadcastEvent] | None]:
+        """Register a subscriber for ``topics`` (default: every event).
+
+        Returns ``(subscriber_id, queue, replay)``. ``replay`` lists buffered events after
+        ``last_event_id``; it is empty when no id was given and None when the id is unknown or
+        already evicted, in which case the client must resynchronize. Registration and the replay
+        snapshot happen under one lock, so no event is both replayed and queued or lost in between.
+        Queue items are ``BroadcastEvent`` instances shared by every subscriber.
+        """
+        self._ensure_transport()
         subscriber_id = str(uuid4())
         queue: Queue = Queue(maxsize=self._queue_size)
+        topic_set = frozenset(topics or (ALL_TOPIC,))
         with self._lock:
+            replay = self._replay_after(last_event_id, topic_set) if last_event_id else []
             self._subs[subscriber_id] = queue
-        return subscriber_id, queue
+            self._sub_topics[subscriber_id] = topic_set
+            for topic in topic_set:
+                self._topic_subs.setdefault(topic, set()).add(subscriber_id)
+            if replay is None:
+                self._replay_misses += 1
+            else:
+                self._replayed += len(replay)
+        return subscriber_id, queue, replay
 
     def unsubscribe(self, subscriber_id: str) -> None:
         with self._lock:
             self._subs.pop(subscriber_id, None)
+            for topic in self._sub_topics.pop(subscriber_id, ()):
+                subscribers = self._topic_subs.get(topic)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscriber_id)
+                if not subscribers:
+                    del self._topic_subs[topic]
 
-    def publish(self, event: dict[str, Any]) -> None:
-        with self._lock:
-            queues = list(self._subs.values())
+    def broadcast(self, event: dict[str, Any]) -> str:
+        """Publish ``event`` to this process and relay it to the others; returns its local event id."""
+        transport = self._ensure_transport()
+        item = self._publish(event)
+        try:
+            transport.send(item.data)
+        except Exception:
+            logger.exception("Notification transport send failed | transport=%s", transport.name)
+        return item.id
 
-        for queue in queues:
-            try:
-                queue.put_nowait(event)
-            except Full:
-                # If a subscriber falls behind, drop oldest and enqueue newest.
-                try:
-                    queue.get_nowait()
-                except Exception:
-                    pass
+    def publish(self, event: dict[str, Any]) -> str:
+        """Deliver ``event`` to this process's subscribers only; returns its event id."""
+        return self._publish(event).id
+
+    def _publish(self, event: dict[str, Any]) -> BroadcastEvent:
+        """Route ``event`` to matching subscribers and the replay buffer."""
+        topics = tuple(event_topics(event))
+        # Serialize once here instead of once per subscriber frame.
+        data = json.dumps(event, default=str)
+        with self._lock:
+            self._sequence += 1
+            event_id = self.event_id(self._sequence)
+            item = BroadcastEvent(id=event_id, payload=event, data=data)
+            self._replay.append((self._sequence, topics, item))
+            recipients: set[str] = set()
+            for topic in topics:
+                recipients.update(self._topic_subs.get(topic, ()))
+            queues = [self._subs[subscriber_id] for subscriber_id in recipients]
+            self._published += 1
+            self._filtered += len(self._subs) - len(queues)
+            # Enqueue under the lock so per-subscriber order always matches id order.
+            for queue in queues:
                 try:
-                    queue.put_nowait(event)
-                except Exception:
-                    pass
+                    queue.put_nowait(item)
+                    self._enqueued += 1
+                except Full:
+                    # If a subscriber falls behind, drop oldest and enqueue newest.
+                    try:
+                        queue.get_nowait()
+                        self._dropped += 1
+                    except Exception:
+                        pass
+                    try:
+                        queue.put_nowait(item)
+                        self._enqueued += 1
+                    except Exception:
+                        self._dropped += 1
+        return item
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "subscribers": len(self._subs),
+                "topics": {topic: len(subscribers) for topic, subscribers in self._topic_subs.items()},
+                "published": self._published,
+                "enqueued": self._enqueued,
+                "dropped": self._dropped,
+                "filtered": self._filtered,
+                "replay_buffered": len(self._replay),
+                "replay_capacity": self._replay.maxlen,
+                "replayed": self._replayed,
+                "replay_misses": self._replay_misses,
+                "last_event_id": self.event_id(self._sequence) if self._sequence else None,
+                "remote_published": self._remote_published,
+                "transport": self._transport.stats(),
+            }
+
+
+broadcaster = EventBroadcaster(
+    replay_size=int(os.getenv("PRISM_SSE_REPLAY_BUFFER_SIZE", DEFAULT_REPLAY_SIZE)),
+)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=broadcaster.after_fork)
+
+
+def transport_from_env() -> BroadcastTransport:
+    name = os.getenv("PRISM_NOTIFY_TRANSPORT", "inprocess").strip().lower()
+    if name not in NOTIFY_TRANSPORTS:
+        logger.warning("Notification transport unknown, using inprocess | transport=%s", name)
+        name = "inprocess"
+    if name == "mqtt":
+        return MQTTBroadcastTransport(
+            host=os.getenv("MQTT_BROKER_HOST", "localhost"),
+            port=int(os.getenv("MQTT_BROKER_PORT", 1883)),
+            topic=os.getenv("PRISM_NOTIFY_MQTT_TOPIC", DEFAULT_MQTT_TOPIC).strip() or DEFAULT_MQTT_TOPIC,
+        )
+    return BroadcastTransport()
 
 
-broadcaster = EventBroadcaster()
+def init_notification_transport(app) -> BroadcastTransport:
+    """Attach the configured transport to the shared broadcaster; it connects on first use."""
+    transport = transport_from_env()
+    broadcaster.use_transport(transport)
+    app.extensions["prism_notifications"] = transport
+    return transport
 
 
 def publish_slot_change(
@@ -60,8 +449,8 @@ def publish_slot_change(
     source: str,
     distance_cm: float | None,
 ) -> None:
-    """Publish normalized slot-change notification payload."""
-    broadcaster.publish(
+    """Publish normalized slot-change notification payload to every process."""
+    broadcaster.broadcast(
         {
             "type": "slot_change",
             "slot_id": slot_id,
@@ -0,0 +1,119 @@
+"""Per-slot hysteresis and debounce filter for distance-based occupancy decisions."""
+
+from __future__ import annotations
+
+import logging
+import os
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class _SlotFilterState:
+    """Compact per-slot filter state: a bitmask of recent candidates plus last transition time."""
+
+    __slots__ = ("window", "samples", "last_transition_at")
+
+    def __init__(self):
+        self.window = 0
+        self.samples = 0
+        self.last_transition_at: datetime | None = None
+
+
+class OccupancyFilter:
+    """Suppress spurious occupancy transitions before they reach the database.
+
+    A reading first becomes a candidate state through enter/exit hysteresis
+    (or the device-reported flag). A transition away from the current state is
+    accepted only when at least ``confirm_n`` of the last ``confirm_m``
+    candidates agree and ``min_dwell_seconds`` passed since the previous
+    accepted transition.
+    """
+
+    def __init__(
+        self,
+        *,
+        enter_cm: float,
+        exit_cm: float,
+        confirm_n: int = 1,
+        confirm_m: int = 1,
+        min_dwell_seconds: float = 0.0,
+    ):
+        if exit_cm < enter_cm:
+            logger.warning(
+                "Occupancy exit threshold below enter threshold, using enter for both | enter_cm=%s exit_cm=%s",
+                enter_cm,
+                exit_cm,
+            )
+            exit_cm = enter_cm
+        self.enter_cm = enter_cm
+        self.exit_cm = exit_cm
+        self.confirm_m = max(1, min(confirm_m, 64))
+        self.confirm_n = max(1, min(confirm_n, self.confirm_m))
+        self.min_dwell_seconds = max(0.0, min_dwell_seconds)
+        self._mask = (1 << self.confirm_m) - 1
+        self._states: dict[str, _SlotFilterState] = {}
+
+    @classmethod
+    def from_env(cls, default_threshold_cm: float) -> "OccupancyFilter":
+        enter_cm = float(os.getenv("PRISM_OCCUPANCY_ENTER_CM", default_threshold_cm))
+        return cls(
+            enter_cm=enter_cm,
+            exit_cm=float(os.getenv("PRISM_OCCUPANCY_EXIT_CM", enter_cm)),
+            confirm_n=int(os.getenv("PRISM_OCCUPANCY_CONFIRM_N", 1)),
+            confirm_m=int(os.getenv("PRISM_OCCUPANCY_CONFIRM_M", 1)),
+            min_dwell_seconds=float(os.getenv("PRISM_OCCUPANCY_MIN_DWELL_SECONDS", 0)),
+        )
+
+    def candidate(self, distance_cm: float, *, current: bool) -> bool:
+        """Classify a distance using hysteresis around the current state."""
+        if current:
+            return distance_cm < self.exit_cm
+        return distance_cm < self.enter_cm
+
+    def decide(
+        self,
+        slot_id: str,
+        *,
+        distance_cm: float,
+        reported_occupied: bool | None,
+        current: bool,
+        at: datetime,
+    ) -> bool:
+        """Return the accepted occupancy state for a slot after this reading."""
+        if reported_occupied is not None:
+            candidate = reported_occupied
+        else:
+            candidate = self.candidate(distance_cm, current=current)
+
+        state = self._states.get(slot_id)
+        if state is None:
+            state = _SlotFilterState()
+            self._states[slot_id] = state
+
+        state.window = ((state.window << 1) | int(candidate)) & self._mask
+        state.samples = min(state.samples + 1, self.confirm_m)
+
+        if candidate == current:
+            return current
+
+        occupied_votes = bin(state.window).count("1")
+        votes = occupied_votes if candidate else state.samples - occupied_votes
+        if votes < self.confirm_n:
+            return current
+
+        if (
+            self.min_dwell_seconds > 0
+            and state.last_transition_at is not None
+            and (at - state.last_transition_at).total_seconds() < self.min_dwell_seconds
+        ):
+            return current
+
+        state.last_transition_at = at
+        return candidate
+
+    def reset(self, slot_id: str | None = None) -> None:
+        if slot_id is None:
+            self._states.clear()
+        else:
+            self._states.pop(slot_id, None)
@@ -0,0 +1,247 @@
+"""Range partitions for high-volume telemetry tables on PostgreSQL.
+
+The migration converts sensor_readings and occupancy_logs into tables partitioned by
+``timestamp`` when running on PostgreSQL. Partitions are named ``<table>_p<YYYYMM>`` (monthly)
+or ``<table>_p<YYYYMMDD>`` (daily) plus a ``<table>_default`` catch-all. On other databases
+every function here is a no-op and retention falls back to batched deletes.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+from datetime import datetime, timedelta
+from threading import Event, Thread
+
+import click
+from flask import Flask
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ("sensor_readings", "occupancy_logs")
+PARTITION_INTERVALS = {"month", "day"}
+DEFAULT_MAINTENANCE_INTERVAL_SECONDS = 3600
+_PARTITION_NAME = re.compile(r"^(?P<table>[a-z_]+)_p(?P<stamp>\d{6}|\d{8})$")
+
+
+def partition_interval() -> str:
+    interval = os.getenv("PRISM_TELEMETRY_PARTITION_INTERVAL", "month").strip().lower()
+    return interval if interval in PARTITION_INTERVALS else "month"
+
+
+def partition_start(ts: datetime, interval: str) -> datetime:
+    if interval == "day":
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    return ts.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_partition_start(start: datetime, interval: str) -> datetime:
+    if interval == "day":
+        return start + timedelta(days=1)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_name(table: str, start: datetime, interval: str) -> str:
+    return f"{table}_p{start.strftime('%Y%m%d' if interval == 'day' else '%Y%m')}"
+
+
+def parse_partition_name(name: str) -> tuple[str, datetime, datetime] | None:
+    """Return (parent_table, lower_bound, upper_bound) for a managed partition name."""
+    match = _PARTITION_NAME.match(name)
+    if match is None:
+        return None
+    stamp = match.group("stamp")
+    interval = "day" if len(stamp) == 8 else "month"
+    start = datetime.strptime(stamp, "%Y%m%d" if interval == "day" else "%Y%m")
+    return match.group("table"), start, next_partition_start(start, interval)
+
+
+def partition_layout(partitions: list[tuple[str, datetime, datetime]]) -> str | None:
+    """Interval of the newest existing partition, or None when the table has none yet."""
+    if not partitions:
+        return None
+    _, lower, upper = partitions[-1]
+    return "day" if upper - lower == timedelta(days=1) else "month"
+
+
+def partition_ranges(first: datetime, last: datetime, interval: str) -> list[tuple[datetime, datetime]]:
+    """Contiguous [start, end) ranges covering ``first`` through ``last``."""
+    ranges = []
+    start = partition_start(first, interval)
+    while start <= last:
+        end = next_partition_start(start, interval)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def is_partitioned(session, table: str) -> bool:
+    if session.get_bind().dialect.name != "postgresql":
+        return False
+    return bool(
+        session.execute(
+            text(
+                "SELECT 1 FROM pg_partitioned_table p "
+                "JOIN pg_class c ON c.oid = p.partrelid "
+                "WHERE c.relname = :table AND pg_table_is_visible(c.oid)"
+            ),
+            {"table": table},
+        ).scalar()
+    )
+
+
+def list_partitions(session, table: str) -> list[tuple[str, datetime, datetime]]:
+    """Managed partitions of ``table`` ordered by lower bound; the default partition is excluded."""
+    rows = session.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = :table AND pg_table_is_visible(parent.oid)"
+        ),
+        {"table": table},
+    ).scalars()
+    partitions = []
+    for name in rows:
+        parsed = parse_partition_name(name)
+        if parsed is not None and parsed[0] == table:
+            partitions.append((name, parsed[1], parsed[2]))
+    return sorted(partitions, key=lambda item: item[1])
+
+
+def ensure_partitions(
+    session=None,
+    *,
+    ahead: int | None = None,
+    interval: str | None = None,
+    now: datetime | None = None,
+) -> list[str]:
+    """Create partitions from the current period through ``ahead`` future periods; returns new names.
+
+    New partitions follow the interval of the existing ones. Ranges of a different interval would
+    overlap them, so a mismatched ``interval`` is logged and ignored.
+    """
+    session = session or db.session
+    requested = interval or partition_interval()
+    if ahead is None:
+        ahead = max(0, int(os.getenv("PRISM_TELEMETRY_PARTITIONS_AHEAD", 2)))
+
+    created: list[str] = []
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(session, table):
+            continue
+        partitions = list_partitions(session, table)
+        existing = {name for name, _, _ in partitions}
+        interval = partition_layout(partitions) or requested
+        if interval != requested:
+            logger.warning(
+                "Telemetry partition interval mismatch; keeping existing layout | table=%s existing=%s requested=%s",
+                table,
+                interval,
+                requested,
+            )
+        start = partition_start(now or datetime.utcnow(), interval)
+        for _ in range(ahead + 1):
+            end = next_partition_start(start, interval)
+            name = partition_name(table, start, interval)
+            if name not in existing:
+                try:
+                    # Savepoint: creation fails if the default partition already holds rows in this range.
+                    with session.begin_nested():
+                        session.execute(
+                            text(
+                                f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table}" '
+                                f"FOR VALUES FROM ('{start.isoformat(sep=' ')}') TO ('{end.isoformat(sep=' ')}')"
+                            )
+                        )
+                    created.append(name)
+                except DBAPIError:
+                    logger.exception("Telemetry partition creation failed | partition=%s", name)
+            start = end
+    session.commit()
+    if created:
+        logger.info("Telemetry partitions created | partitions=%s", ",".join(created))
+    return created
+
+
+def detach_and_drop_partition(session, table: str, name: str) -> None:
+    """Detach then drop one partition; both are catalog operations independent of row count."""
+    session.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"'))
+    session.execute(text(f'DROP TABLE "{name}"'))
+
+
+class PartitionScheduler:
+    """Creates upcoming telemetry partitions on a daemon thread, starting with a pass at startup.
+
+    Without it, rows past the last partition land in the default partition once the
+    migration's initial range runs out.
+    """
+
+    def __init__(self, app: Flask, *, interval_seconds: float | None = None):
+        self.app = app
+        if interval_seconds is None:
+            interval_seconds = float(
+                os.getenv("PRISM_PARTITION_MAINTENANCE_SECONDS", DEFAULT_MAINTENANCE_INTERVAL_SECONDS)
+            )
+        self.interval_seconds = max(0.0, interval_seconds)
+        self._stop = Event()
+        self._thread: Thread | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval_seconds > 0
+
+    def run_once(self) -> list[str]:
+        with self.app.app_context():
+            try:
+                return ensure_partitions()
+            finally:
+                db.session.remove()
+
+    def _loop(self) -> None:
+        while True:
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Telemetry partition maintenance failed")
+            if self._stop.wait(self.interval_seconds):
+                return
+
+    def start(self) -> None:
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._loop, name="prism-partitions", daemon=True)
+        self._thread.start()
+        logger.info("Telemetry partition scheduler started | interval_seconds=%s", self.interval_seconds)
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=5.0)
+        self._thread = None
+
+
+def register_partition_command(app: Flask) -> None:
+    """Attach telemetry partition maintenance command to Flask CLI."""
+
+    @app.cli.command("prism-partitions")
+    @click.option(
+        "--ahead",
+        default=None,
+        type=click.IntRange(min=0),
+        help="Future partitions to create (default PRISM_TELEMETRY_PARTITIONS_AHEAD or 2).",
+    )
+    def prism_partitions(ahead: int | None) -> None:
+        """Create upcoming sensor_readings/occupancy_logs partitions on PostgreSQL."""
+        if not any(is_partitioned(db.session, table) for table in PARTITIONED_TABLES):
+            click.echo("Telemetry tables are not partitioned on this database; nothing to do")
+            return
+        created = ensure_partitions(ahead=ahead)
+        click.echo(f"Telemetry partitions ready: {len(created)} created")
@@ -0,0 +1,337 @@
+"""Zone occupancy prediction engines for /predict and /recommend.
+
+A trained forecast artifact is a JSON file with one 7x24 table of occupancy percentages per zone
+(weekday 0 = Monday, hour 0-23 UTC). It is expanded once at load time into a dense
+zone x (weekday * 24 + hour) array, so a request costs one index lookup per zone. Without an
+artifact the original rule-based heuristic is served and reported as ``mock``.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import time
+from array import array
+from datetime import datetime, timedelta
+from pathlib import Path
+from threading import Lock
+from typing import Any
+
+import click
+from flask import Flask
+from sqlalchemy import func
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_FORMAT = "prism-zone-forecast/v1"
+DEFAULT_ARTIFACT_NAME = "occupancy_forecast.json"
+DEFAULT_FORECAST_WEIGHT = 0.7
+HOURS_PER_WEEK = 7 * 24
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+DAY_FACTOR = {
+    "monday": 3.0,
+    "tuesday": 2.0,
+    "wednesday": 1.0,
+    "thursday": 2.5,
+    "friday": 4.0,
+    "saturday": -3.0,
+    "sunday": -4.0,
+}
+
+
+def _time_factor(hour: int) -> float:
+    if 8 <= hour <= 10:
+        return 12.0
+    if 11 <= hour <= 14:
+        return 4.0
+    if 15 <= hour <= 17:
+        return 10.0
+    if 18 <= hour <= 20:
+        return -2.0
+    return -8.0
+
+
+def _clamp_pct(value: float) -> float:
+    return max(0.0, min(100.0, round(value, 1)))
+
+
+class PredictionEngine:
+    """Rule-based engine; subclasses override ``predicted_pct`` and the descriptive attributes."""
+
+    status = "mock"
+    version = "day8-skeleton-v1"
+    note = "ML model integration planned in Phase 3."
+
+    def predicted_pct(self, zone_id: str, current: float, day: str, hour: int) -> float:
+        # Skeleton heuristic for Phase 2; real model integration is planned in Phase 3.
+        return _clamp_pct(current + DAY_FACTOR[day] + _time_factor(hour))
+
+    def predict(self, zone_rows: list[dict[str, Any]], day: str, hour: int) -> list[dict[str, Any]]:
+        predictions: list[dict[str, Any]] = []
+        for zone in zone_rows:
+            current = zone["current_occupancy_pct"]
+            predicted = self.predicted_pct(zone["zone_id"], current, day, hour)
+            if predicted >= current + 5:
+                trend = "filling"
+            elif predicted <= current - 5:
+                trend = "clearing"
+            else:
+                trend = "stable"
+
+            predictions.append(
+                {
+                    "zone_id": zone["zone_id"],
+                    "name": zone["name"],
+                    "predicted_occupancy_pct": predicted,
+                    "trend": trend,
+                    "current_occupancy_pct": current,
+                    "total_slots": zone["total_slots"],
+                }
+            )
+        return predictions
+
+    def describe(self) -> dict[str, Any]:
+        return {"status": self.status, "version": self.version, "note": self.note}
+
+
+class ForecastTableEngine(PredictionEngine):
+    """Serves precomputed per-zone weekday/hour forecasts blended with current occupancy."""
+
+    status = "trained"
+
+    def __init__(self, *, version: str, zone_tables: dict[str, list], forecast_weight: float, source: str):
+        self.version = version
+        self.forecast_weight = max(0.0, min(1.0, forecast_weight))
+        self.note = f"Forecast table from {source}, blended {self.forecast_weight:.0%} with current occupancy."
+        self._fallback = PredictionEngine()
+        self._zone_index: dict[str, int] = {}
+        self._forecasts: list[array] = []
+        for zone_id, weekly in zone_tables.items():
+            dense = array("d", [math.nan]) * HOURS_PER_WEEK
+            for weekday, hours in enumerate(weekly[:7]):
+                for hour, value in enumerate(hours[:24]):
+                    if value is not None:
+                        dense[weekday * 24 + hour] = float(value)
+            self._zone_index[zone_id] = len(self._forecasts)
+            self._forecasts.append(dense)
+
+    @property
+    def zone_count(self) -> int:
+        return len(self._forecasts)
+
+    def predicted_pct(self, zone_id: str, current: float, day: str, hour: int) -> float:
+        index = self._zone_index.get(zone_id)
+        forecast = math.nan if index is None else self._forecasts[index][WEEKDAYS.index(day) * 24 + hour]
+        if math.isnan(forecast):
+            # Zones or cells the artifact has no history for keep the heuristic.
+            return self._fallback.predicted_pct(zone_id, current, day, hour)
+        return _clamp_pct(self.forecast_weight * forecast + (1 - self.forecast_weight) * current)
+
+
+def load_forecast_artifact(path: Path) -> ForecastTableEngine:
+    """Parse and validate a forecast artifact; raises ValueError on malformed content."""
+    with path.open("r", encoding="utf-8") as handle:
+        payload = json.load(handle)
+    if not isinstance(payload, dict) or payload.get("format") != ARTIFACT_FORMAT:
+        raise ValueError(f"{path} is not a {ARTIFACT_FORMAT} artifact")
+    zones = payload.get("zones")
+    if not isinstance(zones, dict):
+        raise ValueError(f"{path} has no zones table")
+    for zone_id, weekly in zones.items():
+        if not isinstance(weekly, list) or len(weekly) != 7 or any(
+            not isinstance(hours, list) or len(hours) != 24 for hours in weekly
+        ):
+            raise ValueError(f"Zone {zone_id} in {path} must be a 7x24 table")
+    return ForecastTableEngine(
+        version=str(payload.get("version") or path.stem),
+        zone_tables=zones,
+        forecast_weight=float(payload.get("forecast_weight", DEFAULT_FORECAST_WEIGHT)),
+        source=path.name,
+    )
+
+
+class PredictionEngineProvider:
+    """Holds the active engine and swaps it when the artifact file changes on disk."""
+
+    def __init__(self, artifact_path: str | Path, reload_check_seconds: float = 5.0):
+        self.artifact_path = Path(artifact_path)
+        self.reload_check_seconds = max(0.0, reload_check_seconds)
+        self._engine: PredictionEngine = PredictionEngine()
+        self._loaded_mtime: float | None = None
+        self._checked_at: float | None = None
+        self._lock = Lock()
+        self._reloads = 0
+        self._load_errors = 0
+
+    def _artifact_mtime(self) -> float | None:
+        try:
+            return self.artifact_path.stat().st_mtime
+        except OSError:
+            return None
+
+    def reload(self) -> PredictionEngine:
+        """Load the artifact now; keeps the previous engine if the file is malformed."""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            mtime = self._artifact_mtime()
+            if mtime is None:
+                if self._loaded_mtime is not None:
+                    logger.warning("Prediction artifact removed; using heuristic | path=%s", self.artifact_path)
+                self._engine = PredictionEngine()
+                self._loaded_mtime = None
+                return self._engine
+            try:
+                engine = load_forecast_artifact(self.artifact_path)
+            except (OSError, ValueError, TypeError) as exc:
+                self._load_errors += 1
+                # Remember the mtime so a broken file is not re-parsed on every request.
+                self._loaded_mtime = mtime
+                logger.error("Prediction artifact rejected | path=%s error=%s", self.artifact_path, exc)
+                return self._engine
+            self._engine = engine
+            self._loaded_mtime = mtime
+            self._reloads += 1
+            logger.info(
+                "Prediction artifact loaded | path=%s version=%s zones=%s",
+                self.artifact_path,
+                engine.version,
+                engine.zone_count,
+            )
+            return engine
+
+    def engine(self) -> PredictionEngine:
+        """Return the active engine, reloading first when the artifact's mtime changed."""
+        checked_at = self._checked_at
+        if checked_at is not None and time.monotonic() - checked_at < self.reload_check_seconds:
+            return self._engine
+        if checked_at is not None and self._artifact_mtime() == self._loaded_mtime:
+            self._checked_at = time.monotonic()
+            return self._engine
+        return self.reload()
+
+    def stats(self) -> dict[str, Any]:
+        engine = self._engine
+        return {
+            **engine.describe(),
+            "artifact_path": str(self.artifact_path),
+            "reloads": self._reloads,
+            "load_errors": self._load_errors,
+        }
+
+
+def default_artifact_path(app: Flask) -> Path:
+    configured = os.getenv("ML_MODEL_PATH", "").strip()
+    backend_root = Path(app.root_path).parent
+    if not configured:
+        return backend_root.parent / "ml" / "models" / DEFAULT_ARTIFACT_NAME
+    path = Path(configured)
+    return path if path.is_absolute() else backend_root / path
+
+
+def init_prediction_engine(app: Flask) -> PredictionEngineProvider:
+    """Create the app's engine provider and load the artifact once at startup."""
+    provider = PredictionEngineProvider(
+        default_artifact_path(app),
+        reload_check_seconds=float(os.getenv("PRISM_MODEL_RELOAD_CHECK_SECONDS", 5)),
+    )
+    provider.reload()
+    app.extensions["prism_prediction"] = provider
+    return provider
+
+
+def get_prediction_engine(app: Flask) -> PredictionEngine:
+    provider = app.extensions.get("prism_prediction")
+    if provider is None:
+        provider = init_prediction_engine(app)
+    return provider.engine()
+
+
+def build_forecast_artifact(session=None, *, weeks: int = 8, now: datetime | None = None) -> dict[str, Any]:
+    """Average hourly zone rollups into a 7x24 occupancy table per zone.
+
+    Rollups only exist for hours with logs, so each (weekday, hour) is averaged over every
+    complete hour of that kind in the window, with a missing row counting as 0% occupancy.
+    """
+    from app.models.parking import OccupancyRollup, ParkingSlot
+
+    session = session or db.session
+    now = now or datetime.utcnow()
+    until = now.replace(minute=0, second=0, microsecond=0)
+    since = until - timedelta(weeks=weeks)
+    hours_seen = [[0] * 24 for _ in range(7)]
+    bucket = since
+    while bucket < until:
+        hours_seen[bucket.weekday()][bucket.hour] += 1
+        bucket += timedelta(hours=1)
+    slot_counts = dict(
+        session.query(ParkingSlot.zone_id, func.count(ParkingSlot.id))
+        .filter(ParkingSlot.zone_id.isnot(None))
+        .group_by(ParkingSlot.zone_id)
+        .all()
+    )
+
+    sums: dict[str, list[list[float]]] = {}
+    rows = session.query(
+        OccupancyRollup.scope_id,
+        OccupancyRollup.bucket_start,
+        OccupancyRollup.occupied_seconds,
+    ).filter(
+        OccupancyRollup.granularity == "hour",
+        OccupancyRollup.scope == "zone",
+        OccupancyRollup.bucket_start >= since,
+        OccupancyRollup.bucket_start < until,
+    )
+    for zone_id, bucket_start, occupied_seconds in rows:
+        slots = slot_counts.get(zone_id)
+        if not slots:
+            continue
+        weekday, hour = bucket_start.weekday(), bucket_start.hour
+        zone_sums = sums.setdefault(zone_id, [[0.0] * 24 for _ in range(7)])
+        zone_sums[weekday][hour] += min(100.0, occupied_seconds / (slots * 3600.0) * 100.0)
+
+    zones = {
+        zone_id: [
+            [
+                round(zone_sums[weekday][hour] / hours_seen[weekday][hour], 1)
+                if hours_seen[weekday][hour]
+                else None
+                for hour in range(24)
+            ]
+            for weekday in range(7)
+        ]
+        for zone_id, zone_sums in sums.items()
+    }
+    return {
+        "format": ARTIFACT_FORMAT,
+        "version": f"rollups-{now.strftime('%Y%m%dT%H%M%S')}",
+        "generated_at": now.isoformat(),
+        "history_weeks": weeks,
+        "forecast_weight": DEFAULT_FORECAST_WEIGHT,
+        "zones": zones,
+    }
+
+
+def register_forecast_command(app: Flask) -> None:
+    """Attach forecast artifact export command to Flask CLI."""
+
+    @app.cli.command("prism-forecast")
+    @click.option("--weeks", default=8, show_default=True, type=click.IntRange(min=1), help="History to average.")
+    @click.option("--output", default=None, type=click.Path(dir_okay=False), help="Artifact path (default ML_MODEL_PATH).")
+    def prism_forecast(weeks: int, output: str | None) -> None:
+        """Build the zone forecast artifact from hourly occupancy rollups."""
+        from app.services.rollups import refresh_occupancy_rollups
+
+        refresh_occupancy_rollups()
+        artifact = build_forecast_artifact(weeks=weeks)
+        path = Path(output) if output else default_artifact_path(app)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so a running server never reads a half-written artifact.
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(artifact, indent=2), encoding="utf-8")
+        os.replace(tmp_path, path)
+        click.echo(f"Forecast artifact written: path={path} zones={len(artifact['zones'])} version={artifact['version']}")
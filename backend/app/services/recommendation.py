@@ -0,0 +1,133 @@
+"""Vectorized zone recommendation scoring.
+
+Zone walk times are indexed once per metadata snapshot into a normalized destination x zone
+matrix. A request then scores every zone for every requested destination with one NumPy
+expression and keeps the best ``top_k`` per destination with a partial sort.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+import numpy as np
+
+from app.services.metadata_cache import ZoneMetadata
+from app.services.prediction import PredictionEngine
+
+DEFAULT_WALK_MINUTES = 8.0
+WALK_MINUTE_WEIGHT = 3.0
+
+
+def normalize_destination(name: str) -> str:
+    return " ".join(name.split()).casefold()
+
+
+class DestinationIndex:
+    """Walk minutes for every (normalized destination, zone) pair; unknown pairs use the default."""
+
+    def __init__(self, zones: Iterable[ZoneMetadata]):
+        zones = list(zones)
+        self._zone_pos = {zone.id: pos for pos, zone in enumerate(zones)}
+        self._destination_pos: dict[str, int] = {}
+        cells: list[tuple[int, int, float]] = []
+        for zone_pos, zone in enumerate(zones):
+            seen: set[str] = set()
+            for destination, minutes in (zone.walk_times or {}).items():
+                key = normalize_destination(destination)
+                # First spelling wins when a zone lists the same destination twice.
+                if key in seen or minutes is None:
+                    continue
+                seen.add(key)
+                row = self._destination_pos.setdefault(key, len(self._destination_pos))
+                cells.append((row, zone_pos, float(minutes)))
+
+        self.matrix = np.full((len(self._destination_pos), len(zones)), DEFAULT_WALK_MINUTES)
+        if cells:
+            rows, cols, values = zip(*cells)
+            self.matrix[list(rows), list(cols)] = values
+
+    @property
+    def destinations(self) -> list[str]:
+        return list(self._destination_pos)
+
+    def walk_minutes(self, destinations: Sequence[str], zone_ids: Sequence[str]) -> np.ndarray:
+        """Return a (len(destinations), len(zone_ids)) matrix of walk minutes."""
+        cols = np.fromiter((self._zone_pos.get(zone_id, -1) for zone_id in zone_ids), dtype=np.intp, count=len(zone_ids))
+        rows = np.fromiter(
+            (self._destination_pos.get(normalize_destination(name), -1) for name in destinations),
+            dtype=np.intp,
+            count=len(destinations),
+        )
+        walk = np.full((len(destinations), len(zone_ids)), DEFAULT_WALK_MINUTES)
+        known_rows = rows >= 0
+        known_cols = cols >= 0
+        if known_rows.any() and known_cols.any():
+            walk[np.ix_(known_rows, known_cols)] = self.matrix[np.ix_(rows[known_rows], cols[known_cols])]
+        return walk
+
+
+def _top_k_order(scores: np.ndarray, predicted: np.ndarray, k: int) -> list[np.ndarray]:
+    """Per row, indices of the ``k`` best zones ordered by (score, predicted pct, zone order)."""
+    n_zones = scores.shape[1]
+    if k >= n_zones:
+        candidates = np.ones(scores.shape, dtype=bool)
+    else:
+        # Everything tied with the k-th best score stays a candidate so ties break exactly as a full sort.
+        kth = np.partition(scores, k - 1, axis=1)[:, k - 1]
+        candidates = scores <= kth[:, None]
+
+    zone_order = np.arange(n_zones)
+    ordered = []
+    for row_scores, row_candidates in zip(scores, candidates):
+        index = zone_order[row_candidates]
+        ranking = np.lexsort((index, predicted[index], row_scores[index]))
+        ordered.append(index[ranking][:k])
+    return ordered
+
+
+def rank_zones(
+    engine: PredictionEngine,
+    zone_rows: list[dict[str, Any]],
+    destination_index: DestinationIndex,
+    destinations: Sequence[str],
+    times: Sequence[tuple[str, int]],
+    top_k: int = 3,
+) -> list[list[list[dict[str, Any]]]]:
+    """Rank zones for every (day, hour) in ``times`` and every destination.
+
+    Returns ``result[time_index][destination_index]`` as a list of up to ``top_k`` zone dicts.
+    """
+    if not zone_rows:
+        return [[[] for _ in destinations] for _ in times]
+
+    zone_ids = [zone["zone_id"] for zone in zone_rows]
+    walk = destination_index.walk_minutes(destinations, zone_ids)
+    results = []
+    for day, hour in times:
+        predictions = engine.predict(zone_rows, day=day, hour=hour)
+        predicted = np.fromiter(
+            (prediction["predicted_occupancy_pct"] for prediction in predictions),
+            dtype=float,
+            count=len(predictions),
+        )
+        scores = np.round(predicted[None, :] + WALK_MINUTE_WEIGHT * walk, 2)
+        per_destination = []
+        for row, order in enumerate(_top_k_order(scores, predicted, top_k)):
+            ranked = []
+            for pos in order:
+                prediction = predictions[pos]
+                minutes = float(walk[row, pos])
+                ranked.append(
+                    {
+                        "zone_id": prediction["zone_id"],
+                        "name": prediction["name"],
+                        "predicted_occupancy_pct": prediction["predicted_occupancy_pct"],
+                        "trend": prediction["trend"],
+                        "estimated_walk_minutes": int(minutes) if minutes.is_integer() else minutes,
+                        "score": float(scores[row, pos]),
+                    }
+                )
+            per_destination.append(ranked)
+        results.append(per_destination)
+    return results
@@ -0,0 +1,121 @@
+"""Bounded LRU + TTL cache for computed insight responses.
+
+Entries are keyed by the request inputs plus the lot's slot state version, so any occupancy
+change moves callers to a new key; the TTL only bounds how long an unused key lingers.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from threading import Lock
+from typing import Any
+
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_TTL_SECONDS = 30.0
+
+_MISSING = object()
+
+
+class LRUTTLCache:
+    """Thread-safe mapping that evicts the least recently used entry beyond ``max_entries``."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max(0, int(max_entries))
+        self.ttl_seconds = max(0.0, float(ttl_seconds))
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+        self._bypasses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value or ``_MISSING``; counts a hit or a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                self._expirations += 1
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Any],
+        *,
+        bypass: bool = False,
+        store: bool = True,
+    ) -> tuple[Any, bool]:
+        """Return ``(value, hit)``. ``bypass`` skips the lookup; ``store=False`` skips caching.
+
+        ``compute`` may return None to signal a result that must not be cached.
+        """
+        if self.enabled and not bypass:
+            value = self.get(key)
+            if value is not _MISSING:
+                return value, True
+        elif bypass:
+            with self._lock:
+                self._bypasses += 1
+
+        value = compute()
+        if store and value is not None:
+            self.put(key, value)
+        return value, False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else None,
+                "bypasses": self._bypasses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+
+def get_insights_cache(app) -> LRUTTLCache:
+    """Return the /predict and /recommend response cache bound to a Flask app."""
+    cache = app.extensions.get("prism_insights_cache")
+    if cache is None:
+        cache = LRUTTLCache(
+            max_entries=int(os.getenv("PRISM_INSIGHTS_CACHE_SIZE", DEFAULT_MAX_ENTRIES)),
+            ttl_seconds=float(os.getenv("PRISM_INSIGHTS_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+        )
+        app.extensions["prism_insights_cache"] = cache
+    return cache
@@ -0,0 +1,446 @@
+"""Retention for raw telemetry: downsample old rows to per-minute aggregates, then delete them."""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from threading import Event, Thread
+from typing import Any
+
+import click
+from flask import Flask
+from sqlalchemy import case, column, delete, func, literal, select, table, text
+from sqlalchemy.dialects import postgresql
+
+from app import db
+from app.models.parking import (
+    OccupancyLog,
+    RollupWatermark,
+    SensorReading,
+    TelemetryMinuteAggregate,
+)
+from app.services.partitions import (
+    detach_and_drop_partition,
+    ensure_partitions,
+    is_partitioned,
+    list_partitions,
+)
+from app.services.rollups import WATERMARK_NAME, refresh_occupancy_rollups
+from app.services.telemetry import upsert_insert_for
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETENTION_DAYS = 30
+DEFAULT_BATCH_SIZE = 1000
+RETENTION_SOURCES = ("sensor_readings", "occupancy_logs")
+
+
+@dataclass
+class RetentionResult:
+    """Rows removed per source and aggregate rows touched during one retention pass."""
+
+    deleted: dict[str, int]
+    aggregated_minutes: int
+    batches: int
+    dropped_partitions: list[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "deleted": dict(self.deleted),
+            "aggregated_minutes": self.aggregated_minutes,
+            "batches": self.batches,
+            "dropped_partitions": list(self.dropped_partitions),
+        }
+
+
+def _minute_aggregates(source: str, rows) -> list[dict[str, Any]]:
+    buckets: dict[tuple[str, datetime], dict[str, Any]] = {}
+    for row in rows:
+        key = (row.slot_id, row.timestamp.replace(second=0, microsecond=0))
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = {
+                "source": source,
+                "slot_id": key[0],
+                "minute_start": key[1],
+                "samples": 0,
+                "occupied_samples": 0,
+                "distance_samples": 0,
+                "distance_sum": 0.0,
+                "distance_min": None,
+                "distance_max": None,
+            }
+        bucket["samples"] += 1
+        bucket["occupied_samples"] += int(bool(row.occupied))
+        if row.distance_cm is not None:
+            bucket["distance_samples"] += 1
+            bucket["distance_sum"] += row.distance_cm
+            if bucket["distance_min"] is None or row.distance_cm < bucket["distance_min"]:
+                bucket["distance_min"] = row.distance_cm
+            if bucket["distance_max"] is None or row.distance_cm > bucket["distance_max"]:
+                bucket["distance_max"] = row.distance_cm
+    return list(buckets.values())
+
+
+def _upsert_minute_aggregates(session, rows: list[dict[str, Any]]) -> None:
+    if not rows:
+        return
+
+    dialect_insert = upsert_insert_for(session)
+    if dialect_insert is None:
+        for row in rows:
+            existing = (
+                session.query(TelemetryMinuteAggregate)
+                .filter_by(source=row["source"], slot_id=row["slot_id"], minute_start=row["minute_start"])
+                .first()
+            )
+            if existing is None:
+                session.add(TelemetryMinuteAggregate(**row))
+                continue
+            existing.samples += row["samples"]
+            existing.occupied_samples += row["occupied_samples"]
+            existing.distance_samples += row["distance_samples"]
+            existing.distance_sum += row["distance_sum"]
+            if row["distance_min"] is not None:
+                existing.distance_min = (
+                    row["distance_min"]
+                    if existing.distance_min is None
+                    else min(existing.distance_min, row["distance_min"])
+                )
+            if row["distance_max"] is not None:
+                existing.distance_max = (
+                    row["distance_max"]
+                    if existing.distance_max is None
+                    else max(existing.distance_max, row["distance_max"])
+                )
+        return
+
+    stmt = _merge_minute_aggregates(dialect_insert(TelemetryMinuteAggregate.__table__))
+    session.execute(stmt, rows)
+
+
+def _merge_minute_aggregates(stmt):
+    """ON CONFLICT clause that folds an incoming minute aggregate into the stored one."""
+    target = TelemetryMinuteAggregate.__table__.c
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=[target.source, target.slot_id, target.minute_start],
+        set_={
+            "samples": target.samples + excluded.samples,
+            "occupied_samples": target.occupied_samples + excluded.occupied_samples,
+            "distance_samples": target.distance_samples + excluded.distance_samples,
+            "distance_sum": target.distance_sum + excluded.distance_sum,
+            "distance_min": case(
+                (target.distance_min.is_(None), excluded.distance_min),
+                (excluded.distance_min < target.distance_min, excluded.distance_min),
+                else_=target.distance_min,
+            ),
+            "distance_max": case(
+                (target.distance_max.is_(None), excluded.distance_max),
+                (excluded.distance_max > target.distance_max, excluded.distance_max),
+                else_=target.distance_max,
+            ),
+        },
+    )
+
+
+def _newest_log_ids(session) -> set[int]:
+    """Each slot's newest occupancy log id, computed once per retention pass.
+
+    Logs written during the pass are newer than the cutoff, so this set stays sufficient.
+    """
+    return {
+        row_id
+        for (row_id,) in session.query(func.max(OccupancyLog.id)).group_by(OccupancyLog.slot_id)
+        if row_id is not None
+    }
+
+
+def _expired_rows(session, source: str, cutoff: datetime, batch_size: int, protected_ids: set[int]):
+    if source == "sensor_readings":
+        return (
+            session.query(
+                SensorReading.id,
+                SensorReading.slot_id,
+                SensorReading.timestamp,
+                SensorReading.distance_cm,
+                SensorReading.is_occupied.label("occupied"),
+            )
+            .filter(SensorReading.timestamp < cutoff)
+            .order_by(SensorReading.id.asc())
+            .limit(batch_size)
+            .all()
+        )
+
+    # Occupancy logs feed the rollups: only prune rows already folded in, and keep each
+    # slot's newest log so the next refresh can still attribute time from its state.
+    watermark = session.get(RollupWatermark, WATERMARK_NAME)
+    if watermark is None:
+        return []
+    # Over-fetch by the protected count and filter in Python: no per-batch GROUP BY over the
+    # whole table and no bind parameter per slot.
+    rows = (
+        session.query(
+            OccupancyLog.id,
+            OccupancyLog.slot_id,
+            OccupancyLog.timestamp,
+            OccupancyLog.distance_cm,
+            (OccupancyLog.status == "occupied").label("occupied"),
+        )
+        .filter(
+            OccupancyLog.timestamp < cutoff,
+            OccupancyLog.id <= watermark.last_id,
+        )
+        .order_by(OccupancyLog.id.asc())
+        .limit(batch_size + len(protected_ids))
+        .all()
+    )
+    return [row for row in rows if row.id not in protected_ids][:batch_size]
+
+
+def _prune_batch(
+    session,
+    source: str,
+    cutoff: datetime,
+    batch_size: int,
+    protected_ids: set[int],
+) -> tuple[int, int]:
+    rows = _expired_rows(session, source, cutoff, batch_size, protected_ids)
+    if not rows:
+        session.rollback()
+        return 0, 0
+
+    aggregates = _minute_aggregates(source, rows)
+    model = SensorReading if source == "sensor_readings" else OccupancyLog
+    # Aggregate and delete in one short transaction so a retried batch never double counts.
+    _upsert_minute_aggregates(session, aggregates)
+    session.execute(
+        delete(model)
+        .where(model.id.in_([row.id for row in rows]))
+        .execution_options(synchronize_session=False)
+    )
+    session.commit()
+    return len(rows), len(aggregates)
+
+
+def _partition_drop_allowed(session, source: str, name: str, protected_ids: set[int]) -> bool:
+    if source != "occupancy_logs":
+        return True
+    # Same guarantees as the row path: rolled up already, and not holding any slot's newest log.
+    watermark = session.get(RollupWatermark, WATERMARK_NAME)
+    if watermark is None:
+        return False
+    max_id = session.execute(text(f'SELECT MAX(id) FROM "{name}"')).scalar()
+    if max_id is not None and max_id > watermark.last_id:
+        return False
+    if not protected_ids:
+        return True
+    holds_newest = session.execute(
+        text(f'SELECT 1 FROM "{name}" WHERE id = ANY(:ids) LIMIT 1'),
+        {"ids": sorted(protected_ids)},
+    ).scalar()
+    return holds_newest is None
+
+
+def _aggregate_partition(session, source: str, name: str) -> int:
+    """Fold a whole partition into telemetry_minute_aggregates with one INSERT ... SELECT."""
+    occupied_column = "is_occupied" if source == "sensor_readings" else "status"
+    partition = table(name, column("slot_id"), column("timestamp"), column("distance_cm"), column(occupied_column))
+    occupied = (
+        partition.c.is_occupied.is_(True)
+        if source == "sensor_readings"
+        else partition.c.status == "occupied"
+    )
+    minute = func.date_trunc("minute", partition.c.timestamp)
+    aggregates = select(
+        literal(source),
+        partition.c.slot_id,
+        minute,
+        func.count(),
+        func.sum(case((occupied, 1), else_=0)),
+        func.count(partition.c.distance_cm),
+        func.coalesce(func.sum(partition.c.distance_cm), 0.0),
+        func.min(partition.c.distance_cm),
+        func.max(partition.c.distance_cm),
+    ).group_by(partition.c.slot_id, minute)
+    stmt = postgresql.insert(TelemetryMinuteAggregate.__table__).from_select(
+        [
+            "source",
+            "slot_id",
+            "minute_start",
+            "samples",
+            "occupied_samples",
+            "distance_samples",
+            "distance_sum",
+            "distance_min",
+            "distance_max",
+        ],
+        aggregates,
+    )
+    return session.execute(_merge_minute_aggregates(stmt)).rowcount
+
+
+def _drop_expired_partitions(
+    session,
+    source: str,
+    cutoff: datetime,
+    result: RetentionResult,
+    protected_ids: set[int],
+) -> None:
+    for name, _, upper_bound in list_partitions(session, source):
+        if upper_bound > cutoff:
+            break
+        if not _partition_drop_allowed(session, source, name, protected_ids):
+            session.rollback()
+            continue
+        rows = session.execute(text(f'SELECT COUNT(*) FROM "{name}"')).scalar() or 0
+        result.aggregated_minutes += _aggregate_partition(session, source, name)
+        detach_and_drop_partition(session, source, name)
+        session.commit()
+        result.deleted[source] += rows
+        result.dropped_partitions.append(name)
+
+
+def apply_retention(
+    session=None,
+    *,
+    retention_days: int = DEFAULT_RETENTION_DAYS,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_batches: int | None = None,
+    pause_seconds: float = 0.0,
+    now: datetime | None = None,
+) -> RetentionResult:
+    """Downsample and delete sensor_readings/occupancy_logs older than ``retention_days``.
+
+    On PostgreSQL with partitioned telemetry tables, fully expired partitions are aggregated
+    and dropped whole. Remaining rows are split into transactions of at most ``batch_size``
+    rows; ``pause_seconds`` between batches leaves gaps for ingest writers on databases with
+    coarse write locks. ``max_batches`` applies to each source separately, so a large
+    ``sensor_readings`` backlog cannot starve ``occupancy_logs`` pruning.
+    """
+    session = session or db.session
+    cutoff = (now or datetime.utcnow()) - timedelta(days=retention_days)
+    result = RetentionResult(deleted=defaultdict(int), aggregated_minutes=0, batches=0)
+
+    # Fold pending logs first so pruning never removes rows the rollups have not seen.
+    refresh_occupancy_rollups(session)
+    ensure_partitions(session, now=now)
+    protected_ids = _newest_log_ids(session)
+
+    for source in RETENTION_SOURCES:
+        if is_partitioned(session, source):
+            _drop_expired_partitions(session, source, cutoff, result, protected_ids)
+        source_batches = 0
+        while max_batches is None or source_batches < max_batches:
+            deleted, aggregated = _prune_batch(session, source, cutoff, batch_size, protected_ids)
+            if not deleted:
+                break
+            result.deleted[source] += deleted
+            result.aggregated_minutes += aggregated
+            result.batches += 1
+            source_batches += 1
+            if deleted < batch_size:
+                break
+            if pause_seconds:
+                time.sleep(pause_seconds)
+
+    for source in RETENTION_SOURCES:
+        result.deleted.setdefault(source, 0)
+    return result
+
+
+def retention_settings_from_env() -> dict[str, Any]:
+    return {
+        "retention_days": max(1, int(os.getenv("PRISM_RETENTION_DAYS", DEFAULT_RETENTION_DAYS))),
+        "batch_size": max(1, int(os.getenv("PRISM_RETENTION_BATCH_SIZE", DEFAULT_BATCH_SIZE))),
+        "pause_seconds": max(0.0, float(os.getenv("PRISM_RETENTION_BATCH_PAUSE_SECONDS", 0.05))),
+    }
+
+
+class RetentionScheduler:
+    """Runs apply_retention periodically on a daemon thread inside an app context."""
+
+    def __init__(self, app: Flask, *, interval_seconds: float | None = None):
+        self.app = app
+        if interval_seconds is None:
+            interval_seconds = float(os.getenv("PRISM_RETENTION_INTERVAL_SECONDS", 0))
+        self.interval_seconds = max(0.0, interval_seconds)
+        self.settings = retention_settings_from_env()
+        self._stop = Event()
+        self._thread: Thread | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval_seconds > 0
+
+    def run_once(self) -> RetentionResult:
+        with self.app.app_context():
+            try:
+                result = apply_retention(**self.settings)
+            finally:
+                db.session.remove()
+        logger.info("Telemetry retention pass complete | %s", result.to_dict())
+        return result
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Telemetry retention pass failed")
+
+    def start(self) -> None:
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._loop, name="prism-retention", daemon=True)
+        self._thread.start()
+        logger.info(
+            "Telemetry retention scheduler started | interval_seconds=%s retention_days=%s batch_size=%s",
+            self.interval_seconds,
+            self.settings["retention_days"],
+            self.settings["batch_size"],
+        )
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=5.0)
+        self._thread = None
+
+
+def register_retention_command(app: Flask) -> None:
+    """Attach telemetry retention command to Flask CLI."""
+
+    @app.cli.command("prism-retention")
+    @click.option(
+        "--days",
+        default=None,
+        type=click.IntRange(min=1),
+        help="Keep raw rows newer than this many days (default PRISM_RETENTION_DAYS or 30).",
+    )
+    @click.option(
+        "--batch-size",
+        default=None,
+        type=click.IntRange(min=1),
+        help="Rows downsampled and deleted per transaction (default PRISM_RETENTION_BATCH_SIZE or 1000).",
+    )
+    def prism_retention(days: int | None, batch_size: int | None) -> None:
+        """Downsample old sensor_readings/occupancy_logs to per-minute aggregates and delete them."""
+        settings = retention_settings_from_env()
+        if days is not None:
+            settings["retention_days"] = days
+        if batch_size is not None:
+            settings["batch_size"] = batch_size
+        result = apply_retention(**settings)
+        click.echo(
+            "Telemetry retention completed: "
+            f"sensor_readings_deleted={result.deleted['sensor_readings']} "
+            f"occupancy_logs_deleted={result.deleted['occupancy_logs']} "
+            f"minute_aggregates={result.aggregated_minutes} batches={result.batches}"
+        )
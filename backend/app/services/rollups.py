@@ -0,0 +1,514 @@
+"""Incremental hourly/daily occupancy rollups built from occupancy_logs.
+
+Logs are consumed in id order above a high-water mark. On PostgreSQL, ids come from a sequence
+at insert time, so concurrent writers can commit a lower id after a higher one is already
+visible. A refresh therefore stops at the first log newer than ``PRISM_ROLLUP_SAFETY_LAG_SECONDS``.
+Every transaction that could still commit a lower id must finish within that lag.
+
+Each slot's newest folded log is kept in ``rollup_slot_states``, so a refresh only reads the new
+logs. A slot that stays occupied has its open interval credited up to the same lag cutoff on
+every drained pass, so the current hour and day are not under-counted until the next log.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from itertools import takewhile
+from threading import Event, Lock, Thread
+from typing import Any
+
+import click
+from flask import Flask
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.parking import (
+    OccupancyLog,
+    OccupancyRollup,
+    ParkingSlot,
+    RollupSlotState,
+    RollupWatermark,
+)
+from app.services.telemetry import upsert_insert_for
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_GRANULARITIES = ("hour", "day")
+ROLLUP_SCOPES = ("slot", "zone", "lot")
+WATERMARK_NAME = "occupancy_logs"
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_SAFETY_LAG_SECONDS = 60.0
+DEFAULT_REFRESH_INTERVAL_SECONDS = 60.0
+
+
+def _bucket_start(ts: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _split_by_hour(start: datetime, end: datetime):
+    """Yield (hour_bucket_start, seconds) pieces covering [start, end)."""
+    cursor = start
+    while cursor < end:
+        bucket = _bucket_start(cursor, "hour")
+        bucket_end = min(bucket + timedelta(hours=1), end)
+        yield bucket, (bucket_end - cursor).total_seconds()
+        cursor = bucket_end
+
+
+class _RollupAccumulator:
+    """Collects additive rollup increments keyed by (granularity, scope, scope_id, bucket)."""
+
+    def __init__(self):
+        # [samples, occupied_samples, occupied_seconds, transitions]
+        self.buckets: dict[tuple[str, str, str, datetime], list] = defaultdict(lambda: [0, 0, 0.0, 0])
+
+    def add(
+        self,
+        scopes: list[tuple[str, str]],
+        hour_bucket: datetime,
+        *,
+        samples: int = 0,
+        occupied_samples: int = 0,
+        occupied_seconds: float = 0.0,
+        transitions: int = 0,
+    ) -> None:
+        for granularity in ROLLUP_GRANULARITIES:
+            bucket = _bucket_start(hour_bucket, granularity)
+            for scope, scope_id in scopes:
+                counters = self.buckets[(granularity, scope, scope_id, bucket)]
+                counters[0] += samples
+                counters[1] += occupied_samples
+                counters[2] += occupied_seconds
+                counters[3] += transitions
+
+    def rows(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "granularity": granularity,
+                "scope": scope,
+                "scope_id": scope_id,
+                "bucket_start": bucket,
+                "samples": counters[0],
+                "occupied_samples": counters[1],
+                "occupied_seconds": counters[2],
+                "transitions": counters[3],
+            }
+            for (granularity, scope, scope_id, bucket), counters in self.buckets.items()
+        ]
+
+
+def _previous_states(session, slot_ids: set[str], watermark: int) -> dict[str, dict[str, Any]]:
+    """Newest already-rolled-up log per slot, used to attribute time up to the next log.
+
+    Read from ``rollup_slot_states``. A slot without a stored state (rollups built before that
+    table existed) falls back to one ``ORDER BY timestamp DESC LIMIT 1`` lookup on the slot/time
+    index.
+    """
+    previous = {
+        row.slot_id: {
+            "log_id": row.log_id,
+            "status": row.status,
+            "timestamp": row.timestamp,
+            "credited_until": row.credited_until,
+            "stored": True,
+        }
+        for row in session.query(
+            RollupSlotState.slot_id,
+            RollupSlotState.log_id,
+            RollupSlotState.status,
+            RollupSlotState.timestamp,
+            RollupSlotState.credited_until,
+        ).filter(RollupSlotState.slot_id.in_(slot_ids))
+    }
+    for slot_id in slot_ids - previous.keys():
+        newest = (
+            session.query(OccupancyLog.id, OccupancyLog.status, OccupancyLog.timestamp)
+            .filter(OccupancyLog.slot_id == slot_id, OccupancyLog.id <= watermark)
+            .order_by(OccupancyLog.timestamp.desc(), OccupancyLog.id.desc())
+            .first()
+        )
+        if newest is not None:
+            previous[slot_id] = {
+                "log_id": newest.id,
+                "status": newest.status,
+                "timestamp": newest.timestamp,
+                "credited_until": newest.timestamp,
+                "stored": False,
+            }
+    return previous
+
+
+def _save_slot_states(session, states: dict[str, dict[str, Any]], previous: dict[str, dict[str, Any]]) -> bool:
+    """Write the batch's new per-slot states; False when another refresher changed one first.
+
+    Stored rows are compare-and-set on ``credited_until`` so an interval closed concurrently is
+    never credited twice.
+    """
+    for slot_id, state in states.items():
+        prev = previous.get(slot_id)
+        if prev is not None and prev["stored"]:
+            result = session.execute(
+                update(RollupSlotState)
+                .where(
+                    RollupSlotState.slot_id == slot_id,
+                    RollupSlotState.credited_until == prev["credited_until"],
+                )
+                .values(**state)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != 1:
+                return False
+        else:
+            session.add(RollupSlotState(slot_id=slot_id, **state))
+    try:
+        session.flush()
+    except IntegrityError:
+        return False
+    return True
+
+
+def _slot_scopes(session, slot_ids: set[str]) -> dict[str, list[tuple[str, str]]]:
+    slot_scopes: dict[str, list[tuple[str, str]]] = {}
+    for slot_id, lot_id, zone_id in (
+        session.query(ParkingSlot.id, ParkingSlot.lot_id, ParkingSlot.zone_id)
+        .filter(ParkingSlot.id.in_(slot_ids))
+        .all()
+    ):
+        scopes = [("slot", slot_id), ("lot", lot_id)]
+        if zone_id:
+            scopes.append(("zone", zone_id))
+        slot_scopes[slot_id] = scopes
+    return slot_scopes
+
+
+def _upsert_rollups(session, rows: list[dict[str, Any]]) -> None:
+    if not rows:
+        return
+
+    dialect_insert = upsert_insert_for(session)
+    if dialect_insert is None:
+        for row in rows:
+            existing = (
+                session.query(OccupancyRollup)
+                .filter_by(
+                    granularity=row["granularity"],
+                    scope=row["scope"],
+                    scope_id=row["scope_id"],
+                    bucket_start=row["bucket_start"],
+                )
+                .first()
+            )
+            if existing is None:
+                session.add(OccupancyRollup(**row))
+                continue
+            existing.samples += row["samples"]
+            existing.occupied_samples += row["occupied_samples"]
+            existing.occupied_seconds += row["occupied_seconds"]
+            existing.transitions += row["transitions"]
+        return
+
+    table = OccupancyRollup.__table__
+    stmt = dialect_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.granularity, table.c.scope, table.c.scope_id, table.c.bucket_start],
+        set_={
+            "samples": table.c.samples + stmt.excluded.samples,
+            "occupied_samples": table.c.occupied_samples + stmt.excluded.occupied_samples,
+            "occupied_seconds": table.c.occupied_seconds + stmt.excluded.occupied_seconds,
+            "transitions": table.c.transitions + stmt.excluded.transitions,
+        },
+    )
+    session.execute(stmt, rows)
+
+
+def _advance_watermark(session, old_last_id: int | None, new_last_id: int) -> bool:
+    """Move the watermark forward; False when another refresher already moved it."""
+    if old_last_id is None:
+        session.add(RollupWatermark(name=WATERMARK_NAME, last_id=new_last_id))
+        try:
+            session.flush()
+        except IntegrityError:
+            session.rollback()
+            return False
+        return True
+
+    result = session.execute(
+        update(RollupWatermark)
+        .where(
+            RollupWatermark.name == WATERMARK_NAME,
+            RollupWatermark.last_id == old_last_id,
+        )
+        .values(last_id=new_last_id, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def _refresh_batch(session, batch_size: int, settled_before: datetime) -> tuple[int, bool]:
+    """Fold one batch; returns (rows folded, whether the batch stopped at an unsettled log)."""
+    watermark_row = session.get(RollupWatermark, WATERMARK_NAME)
+    watermark = watermark_row.last_id if watermark_row else 0
+
+    logs = (
+        session.query(OccupancyLog.id, OccupancyLog.slot_id, OccupancyLog.status, OccupancyLog.timestamp)
+        .filter(OccupancyLog.id > watermark)
+        .order_by(OccupancyLog.id.asc())
+        .limit(batch_size)
+        .all()
+    )
+    # Stop at the first recent log: ids below it may still belong to uncommitted transactions,
+    # and the watermark must never move past a row that has not been folded in.
+    fetched = len(logs)
+    logs = list(takewhile(lambda log: log.timestamp < settled_before, logs))
+    unsettled = len(logs) < fetched
+    if not logs:
+        session.rollback()
+        return 0, unsettled
+
+    slot_ids = {log.slot_id for log in logs}
+    slot_scopes = _slot_scopes(session, slot_ids)
+    previous = _previous_states(session, slot_ids, watermark)
+    logs_by_slot: dict[str, list[Any]] = defaultdict(list)
+    for log in logs:
+        logs_by_slot[log.slot_id].append(log)
+
+    accumulator = _RollupAccumulator()
+    states: dict[str, dict[str, Any]] = {}
+    for slot_id, slot_logs in logs_by_slot.items():
+        scopes = slot_scopes.get(slot_id, [("slot", slot_id)])
+        stored = previous.get(slot_id)
+        prev_status = stored["status"] if stored else None
+        prev_timestamp = stored["timestamp"] if stored else None
+        credited_until = stored["credited_until"] if stored else None
+        newest = (stored["timestamp"], stored["log_id"], stored["status"]) if stored else None
+        for log in sorted(slot_logs, key=lambda row: (row.timestamp, row.id)):
+            occupied = log.status == "occupied"
+            accumulator.add(
+                scopes,
+                _bucket_start(log.timestamp, "hour"),
+                samples=1,
+                occupied_samples=int(occupied),
+                transitions=int(prev_status is not None and prev_status != log.status),
+            )
+            # Time between consecutive logs is attributed to the earlier log's state, minus
+            # whatever an earlier pass already credited while the interval was still open.
+            if prev_status == "occupied":
+                start = max(prev_timestamp, credited_until)
+                if log.timestamp > start:
+                    for hour_bucket, seconds in _split_by_hour(start, log.timestamp):
+                        accumulator.add(scopes, hour_bucket, occupied_seconds=seconds)
+            credited_until = max(credited_until, log.timestamp) if credited_until else log.timestamp
+            prev_status, prev_timestamp = log.status, log.timestamp
+            if newest is None or (log.timestamp, log.id) > newest[:2]:
+                newest = (log.timestamp, log.id, log.status)
+        states[slot_id] = {
+            "log_id": newest[1],
+            "status": newest[2],
+            "timestamp": newest[0],
+            "credited_until": max(credited_until, newest[0]),
+        }
+
+    if not _advance_watermark(session, watermark_row.last_id if watermark_row else None, logs[-1].id):
+        session.rollback()
+        return 0, False
+    if not _save_slot_states(session, states, previous):
+        session.rollback()
+        return 0, False
+
+    _upsert_rollups(session, accumulator.rows())
+    session.commit()
+    return len(logs), unsettled
+
+
+def _close_open_intervals(session, settled_before: datetime) -> int:
+    """Credit still-occupied slots up to ``settled_before``; returns the number of slots credited."""
+    open_states = (
+        session.query(RollupSlotState.slot_id, RollupSlotState.credited_until)
+        .filter(RollupSlotState.status == "occupied", RollupSlotState.credited_until < settled_before)
+        .all()
+    )
+    if not open_states:
+        session.rollback()
+        return 0
+
+    slot_scopes = _slot_scopes(session, {slot_id for slot_id, _ in open_states})
+    accumulator = _RollupAccumulator()
+    for slot_id, credited_until in open_states:
+        scopes = slot_scopes.get(slot_id, [("slot", slot_id)])
+        for hour_bucket, seconds in _split_by_hour(credited_until, settled_before):
+            accumulator.add(scopes, hour_bucket, occupied_seconds=seconds)
+        result = session.execute(
+            update(RollupSlotState)
+            .where(RollupSlotState.slot_id == slot_id, RollupSlotState.credited_until == credited_until)
+            .values(credited_until=settled_before)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            # Another refresher folded or closed this slot meanwhile; the next pass retries.
+            session.rollback()
+            return 0
+
+    _upsert_rollups(session, accumulator.rows())
+    session.commit()
+    return len(open_states)
+
+
+def rollup_safety_lag_seconds() -> float:
+    return max(0.0, float(os.getenv("PRISM_ROLLUP_SAFETY_LAG_SECONDS", DEFAULT_SAFETY_LAG_SECONDS)))
+
+
+def refresh_occupancy_rollups(
+    session=None,
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_rows: int | None = None,
+    safety_lag_seconds: float | None = None,
+    now: datetime | None = None,
+) -> int:
+    """Fold settled occupancy_logs rows above the high-water mark into rollups.
+
+    Returns the number of log rows processed. ``max_rows`` bounds the work done per call
+    so scheduled refreshes stay short; the CLI backfill runs unbounded. Logs newer than
+    ``safety_lag_seconds`` (default ``PRISM_ROLLUP_SAFETY_LAG_SECONDS``) wait for a later call.
+    Once the backlog is drained, occupied slots are credited up to that same cutoff.
+    """
+    session = session or db.session
+    if safety_lag_seconds is None:
+        safety_lag_seconds = rollup_safety_lag_seconds()
+    settled_before = (now or datetime.utcnow()) - timedelta(seconds=safety_lag_seconds)
+    processed = 0
+    drained = False
+    while max_rows is None or processed < max_rows:
+        limit = batch_size if max_rows is None else min(batch_size, max_rows - processed)
+        batch, unsettled = _refresh_batch(session, limit, settled_before)
+        processed += batch
+        if batch < limit or unsettled:
+            drained = True
+            break
+    if drained:
+        _close_open_intervals(session, settled_before)
+    return processed
+
+
+def reset_occupancy_rollups(session=None) -> None:
+    """Drop all rollup rows and the watermark so the next refresh rebuilds from scratch."""
+    session = session or db.session
+    session.execute(delete(OccupancyRollup))
+    session.execute(delete(RollupSlotState))
+    session.execute(delete(RollupWatermark).where(RollupWatermark.name == WATERMARK_NAME))
+    session.commit()
+
+
+def scheduled_refresh_max_rows() -> int:
+    return max(0, int(os.getenv("PRISM_ROLLUP_REFRESH_MAX_ROWS", 20000)))
+
+
+class RollupScheduler:
+    """Folds new occupancy logs into the rollups periodically on a daemon thread.
+
+    Read endpoints only query ``occupancy_rollups``; this keeps them fresh without a GET
+    doing writes or waiting on the ingest backlog. ``init_rollup_scheduler`` starts it on the
+    first request of each serving process, so WSGI workers refresh too.
+    """
+
+    def __init__(self, app: Flask, *, interval_seconds: float | None = None, max_rows: int | None = None):
+        self.app = app
+        if interval_seconds is None:
+            interval_seconds = float(os.getenv("PRISM_ROLLUP_INTERVAL_SECONDS", DEFAULT_REFRESH_INTERVAL_SECONDS))
+        self.interval_seconds = max(0.0, interval_seconds)
+        # 0 = unbounded: each pass drains every settled log.
+        self.max_rows = scheduled_refresh_max_rows() if max_rows is None else max(0, max_rows)
+        self._stop = Event()
+        self._start_lock = Lock()
+        self._thread: Thread | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval_seconds > 0
+
+    def run_once(self) -> int:
+        with self.app.app_context():
+            try:
+                return refresh_occupancy_rollups(max_rows=self.max_rows or None)
+            finally:
+                db.session.remove()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                processed = self.run_once()
+                if processed:
+                    logger.debug("Occupancy rollup refresh | processed=%s", processed)
+            except Exception:
+                logger.exception("Occupancy rollup refresh failed")
+
+    def start(self) -> None:
+        if not self.enabled or self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = Thread(target=self._loop, name="prism-rollups", daemon=True)
+            self._thread.start()
+        logger.info(
+            "Occupancy rollup scheduler started | interval_seconds=%s max_rows=%s",
+            self.interval_seconds,
+            self.max_rows,
+        )
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=5.0)
+        self._thread = None
+
+
+def init_rollup_scheduler(app: Flask) -> RollupScheduler:
+    """Create the app's rollup scheduler and start it lazily in whichever process serves requests.
+
+    Starting on the first request rather than in the factory keeps CLI commands, tests and a
+    gunicorn ``--preload`` master from running it. Forked workers each start their own, and
+    concurrent refreshers are safe because every batch is compare-and-set on the watermark.
+    """
+    scheduler = RollupScheduler(app)
+    app.extensions["prism_rollups"] = scheduler
+
+    @app.before_request
+    def _start_rollup_scheduler():
+        if not app.testing:
+            scheduler.start()
+
+    return scheduler
+
+
+def register_rollup_command(app: Flask) -> None:
+    """Attach rollup backfill command to Flask CLI."""
+
+    @app.cli.command("prism-rollups")
+    @click.option(
+        "--rebuild",
+        is_flag=True,
+        default=False,
+        help="Delete existing rollups and rebuild them from all occupancy logs.",
+    )
+    @click.option(
+        "--batch-size",
+        default=DEFAULT_BATCH_SIZE,
+        show_default=True,
+        type=click.IntRange(min=1),
+        help="Occupancy log rows folded per transaction.",
+    )
+    def prism_rollups(rebuild: bool, batch_size: int) -> None:
+        """Backfill hourly/daily occupancy rollups from occupancy_logs."""
+        if rebuild:
+            reset_occupancy_rollups()
+        processed = refresh_occupancy_rollups(batch_size=batch_size)
+        click.echo(f"Occupancy rollups refreshed: {processed} log rows processed")
@@ -0,0 +1,168 @@
+"""Denormalized occupied/available/reserved slot counters and state versions on lots and zones."""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Iterable
+from datetime import datetime
+
+from sqlalchemy import case, func, select, update
+
+from app.models.parking import ParkingLot, ParkingSlot, StateCounter, Zone
+from app.services.telemetry import upsert_insert_for
+
+SLOT_STATE_COUNTER = "slot_state"
+
+
+def current_state_version(session, lot_id: str | None = None) -> int:
+    """Global (or one lot's) slot state version; 0 before the first recorded change."""
+    if lot_id is None:
+        query = select(StateCounter.value).where(StateCounter.name == SLOT_STATE_COUNTER)
+    else:
+        query = select(ParkingLot.state_version).where(ParkingLot.id == lot_id)
+    return int(session.execute(query).scalar() or 0)
+
+
+def bump_state_version(
+    session,
+    *,
+    lot_ids: Iterable[str] = (),
+    slot_ids: Iterable[str] = (),
+) -> int:
+    """Increment the global state version and stamp it on the touched lots and slots.
+
+    Runs inside the caller's transaction, so readers see the new version together with the
+    state change it describes. The global version is a single ``state_counters`` row, so its
+    row lock serializes every state-changing transaction from this update until commit. Keep
+    those transactions short and call this as late in them as possible.
+    """
+    now = datetime.utcnow()
+    dialect_insert = upsert_insert_for(session)
+    if dialect_insert is not None:
+        table = StateCounter.__table__
+        stmt = dialect_insert(table).values(name=SLOT_STATE_COUNTER, value=1, updated_at=now)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.name],
+            set_={"value": table.c.value + 1, "updated_at": now},
+        ).returning(table.c.value)
+        version = int(session.execute(stmt).scalar_one())
+    else:
+        counter = session.get(StateCounter, SLOT_STATE_COUNTER, with_for_update=True)
+        if counter is None:
+            counter = StateCounter(name=SLOT_STATE_COUNTER, value=0)
+            session.add(counter)
+        counter.value += 1
+        counter.updated_at = now
+        session.flush()
+        version = counter.value
+
+    lot_ids = list(lot_ids)
+    slot_ids = list(slot_ids)
+    if lot_ids:
+        session.execute(
+            update(ParkingLot)
+            .where(ParkingLot.id.in_(lot_ids))
+            .values(state_version=version, state_changed_at=now)
+            .execution_options(synchronize_session=False)
+        )
+    if slot_ids:
+        session.execute(
+            update(ParkingSlot)
+            .where(ParkingSlot.id.in_(slot_ids))
+            .values(state_version=version)
+            .execution_options(synchronize_session=False)
+        )
+    return version
+
+
+class SlotCounterDeltas:
+    """Collects counter changes for one transaction and applies them as in-database increments."""
+
+    def __init__(self):
+        self._lots: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+        self._zones: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+        self._slot_ids: set[str] = set()
+
+    def record(
+        self,
+        *,
+        lot_id: str,
+        zone_id: str | None,
+        slot_id: str | None = None,
+        occupied_delta: int = 0,
+        reserved_delta: int = 0,
+    ) -> None:
+        if not occupied_delta and not reserved_delta:
+            return
+        if slot_id:
+            self._slot_ids.add(slot_id)
+        targets = [self._lots[lot_id]]
+        if zone_id:
+            targets.append(self._zones[zone_id])
+        for target in targets:
+            target[0] += occupied_delta
+            target[1] += reserved_delta
+
+    def __bool__(self) -> bool:
+        return any(any(delta) for delta in self._lots.values())
+
+    def apply(self, session) -> int | None:
+        """Issue one UPDATE per touched lot and zone inside the caller's transaction.
+
+        Also bumps the global state version once for the whole batch and returns it, or
+        returns None when nothing changed.
+        """
+        version = None
+        if self._lots:
+            version = bump_state_version(session, lot_ids=self._lots.keys(), slot_ids=self._slot_ids)
+        for model, deltas in ((ParkingLot, self._lots), (Zone, self._zones)):
+            for row_id, (occupied_delta, reserved_delta) in deltas.items():
+                if not occupied_delta and not reserved_delta:
+                    continue
+                session.execute(
+                    update(model)
+                    .where(model.id == row_id)
+                    .values(
+                        occupied_slots=model.occupied_slots + occupied_delta,
+                        available_slots=model.available_slots - occupied_delta,
+                        reserved_slots=model.reserved_slots + reserved_delta,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+        self._lots.clear()
+        self._zones.clear()
+        self._slot_ids.clear()
+        return version
+
+
+def rebuild_slot_counters(session) -> None:
+    """Recompute every lot and zone counter from parking_slots with grouped queries."""
+    for model, group_column in ((ParkingLot, ParkingSlot.lot_id), (Zone, ParkingSlot.zone_id)):
+        rows = (
+            session.query(
+                group_column.label("group_id"),
+                func.count(ParkingSlot.id).label("total"),
+                func.sum(case((ParkingSlot.is_occupied.is_(True), 1), else_=0)).label("occupied"),
+                func.sum(case((ParkingSlot.is_reserved.is_(True), 1), else_=0)).label("reserved"),
+            )
+            .filter(group_column.isnot(None))
+            .group_by(group_column)
+            .all()
+        )
+        counts = {row.group_id: row for row in rows}
+
+        for row_id, in session.query(model.id).all():
+            row = counts.get(row_id)
+            total = int(row.total) if row else 0
+            occupied = int(row.occupied or 0) if row else 0
+            reserved = int(row.reserved or 0) if row else 0
+            session.execute(
+                update(model)
+                .where(model.id == row_id)
+                .values(
+                    occupied_slots=occupied,
+                    available_slots=total - occupied,
+                    reserved_slots=reserved,
+                )
+                .execution_options(synchronize_session=False)
+            )
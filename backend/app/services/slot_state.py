@@ -0,0 +1,94 @@
+"""Process-local slot occupancy state cache used by MQTT ingest.
+
+Only this process writes through to it, and only after a commit. Changes committed by other
+processes show up after the next ``warm()``, i.e. within ``PRISM_MQTT_SLOT_CACHE_REFRESH_SECONDS``.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from threading import Lock
+
+
+@dataclass(frozen=True)
+class CachedSlot:
+    """Minimal slot state needed to classify an incoming reading."""
+
+    lot_id: str
+    zone_id: str | None
+    is_occupied: bool
+
+
+class SlotStateCache:
+    """Thread-safe slot_id -> state map, warmed from the database in one query."""
+
+    def __init__(self):
+        self._slots: dict[str, CachedSlot] = {}
+        self._lock = Lock()
+        self._warmed_at: float | None = None
+
+    @property
+    def is_warm(self) -> bool:
+        return self._warmed_at is not None
+
+    def is_stale(self, max_age_seconds: float) -> bool:
+        """Return True when the cache was never warmed or is older than max_age_seconds."""
+        warmed_at = self._warmed_at
+        if warmed_at is None:
+            return True
+        if max_age_seconds <= 0:
+            return False
+        return time.monotonic() - warmed_at > max_age_seconds
+
+    def warm(self) -> int:
+        """Load every slot's state. Must run inside an application context."""
+        from app import db
+        from app.models.parking import ParkingSlot
+
+        rows = db.session.query(
+            ParkingSlot.id,
+            ParkingSlot.lot_id,
+            ParkingSlot.zone_id,
+            ParkingSlot.is_occupied,
+        ).all()
+        slots = {
+            row.id: CachedSlot(
+                lot_id=row.lot_id,
+                zone_id=row.zone_id,
+                is_occupied=bool(row.is_occupied),
+            )
+            for row in rows
+        }
+
+        with self._lock:
+            self._slots = slots
+            self._warmed_at = time.monotonic()
+        return len(slots)
+
+    def get(self, slot_id: str) -> CachedSlot | None:
+        with self._lock:
+            return self._slots.get(slot_id)
+
+    def record(self, slot_id: str, *, lot_id: str, zone_id: str | None, is_occupied: bool) -> None:
+        """Store the latest committed state for a slot."""
+        with self._lock:
+            self._slots[slot_id] = CachedSlot(
+                lot_id=lot_id,
+                zone_id=zone_id,
+                is_occupied=bool(is_occupied),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._slots = {}
+            self._warmed_at = None
+
+
+def get_slot_state_cache(app) -> SlotStateCache:
+    """Return the slot state cache bound to a Flask app, creating it on first use."""
+    cache = app.extensions.get("prism_slot_state")
+    if cache is None:
+        cache = SlotStateCache()
+        app.extensions["prism_slot_state"] = cache
+    return cache
@@ -0,0 +1,58 @@
+"""Telemetry write helpers shared by MQTT ingest and API slot updates."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.models.parking import SlotLatestReading
+
+_UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def upsert_insert_for(session):
+    """Return the dialect insert() supporting ON CONFLICT for this session, or None."""
+    return _UPSERT_INSERTS.get(session.get_bind().dialect.name)
+
+
+def upsert_latest_readings(session, rows: list[dict[str, Any]]) -> None:
+    """Upsert slot_latest_readings; an older timestamp never overwrites a newer one.
+
+    Each row needs slot_id, distance_cm, status and timestamp.
+    """
+    newest: dict[str, dict[str, Any]] = {}
+    for row in rows:
+        current = newest.get(row["slot_id"])
+        if current is None or row["timestamp"] >= current["timestamp"]:
+            newest[row["slot_id"]] = row
+    if not newest:
+        return
+
+    dialect_insert = upsert_insert_for(session)
+    if dialect_insert is None:
+        for row in newest.values():
+            existing = session.get(SlotLatestReading, row["slot_id"])
+            if existing is None:
+                session.add(SlotLatestReading(**row))
+            elif existing.timestamp <= row["timestamp"]:
+                existing.distance_cm = row["distance_cm"]
+                existing.status = row["status"]
+                existing.timestamp = row["timestamp"]
+        return
+
+    table = SlotLatestReading.__table__
+    stmt = dialect_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.slot_id],
+        set_={
+            "distance_cm": stmt.excluded.distance_cm,
+            "status": stmt.excluded.status,
+            "timestamp": stmt.excluded.timestamp,
+        },
+        where=table.c.timestamp <= stmt.excluded.timestamp,
+    )
+    session.execute(stmt, list(newest.values()))
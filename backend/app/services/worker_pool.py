@@ -0,0 +1,161 @@
+"""Bounded worker pool that keeps per-key ordering for MQTT message processing."""
+
+from __future__ import annotations
+
+import logging
+import zlib
+from queue import Empty, Full, Queue
+from threading import Lock, Thread
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+# drop_oldest: evict queued item; drop_newest: reject incoming item; block: producer waits for space.
+# Never use block when the producer is paho's network thread: a full queue would stall the client.
+OVERFLOW_POLICIES = {"block", "drop_oldest", "drop_newest"}
+
+_STOP = object()
+
+
+class PartitionedWorkerPool:
+    """Fixed set of worker threads, each with its own bounded queue.
+
+    Items are routed by a stable hash of their key, so all items sharing a key
+    are handled by the same worker in submission order.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Any], None],
+        *,
+        workers: int,
+        queue_size: int,
+        overflow_policy: str = "drop_oldest",
+        name: str = "prism-worker",
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+
+        self._handler = handler
+        self._name = name
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.overflow_policy = overflow_policy
+        self._queues: list[Queue] = [Queue(maxsize=self.queue_size) for _ in range(self.workers)]
+        self._threads: list[Thread] = []
+        self._stats_lock = Lock()
+        self._submitted = 0
+        self._processed = 0
+        self._dropped = 0
+        self._failed = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads)
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        for index, queue in enumerate(self._queues):
+            thread = Thread(
+                target=self._run,
+                args=(queue,),
+                name=f"{self._name}-{index}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Let workers drain their queues, then join them."""
+        if not self._threads:
+            return
+        for queue in self._queues:
+            queue.put(_STOP)
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def partition_for(self, key: str) -> int:
+        return zlib.crc32(key.encode("utf-8")) % self.workers
+
+    def submit(self, key: str, item: Any) -> bool:
+        """Enqueue an item; returns False when the item (or an older one) was dropped."""
+        queue = self._queues[self.partition_for(key)]
+        with self._stats_lock:
+            self._submitted += 1
+
+        if self.overflow_policy == "block":
+            queue.put(item)
+            return True
+
+        try:
+            queue.put_nowait(item)
+            return True
+        except Full:
+            pass
+
+        if self.overflow_policy == "drop_newest":
+            self._record_drop()
+            return False
+
+        # drop_oldest: evict from the head until the new item fits.
+        while True:
+            try:
+                queue.get_nowait()
+                queue.task_done()
+                self._record_drop()
+            except Empty:
+                pass
+            try:
+                queue.put_nowait(item)
+                return False
+            except Full:
+                continue
+
+    def queue_depth(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    def stats(self) -> dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "workers": self.workers,
+                "running": self.running,
+                "queue_size": self.queue_size,
+                "overflow_policy": self.overflow_policy,
+                "queue_depth": self.queue_depth(),
+                "queue_depth_per_worker": [queue.qsize() for queue in self._queues],
+                "submitted": self._submitted,
+                "processed": self._processed,
+                "dropped": self._dropped,
+                "failed": self._failed,
+            }
+
+    def _record_drop(self) -> None:
+        with self._stats_lock:
+            self._dropped += 1
+            dropped = self._dropped
+        if dropped == 1 or dropped % 1000 == 0:
+            logger.warning(
+                "Worker queue overflow | pool=%s policy=%s dropped_total=%s",
+                self._name,
+                self.overflow_policy,
+                dropped,
+            )
+
+    def _run(self, queue: Queue) -> None:
+        while True:
+            item = queue.get()
+            try:
+                if item is _STOP:
+                    return
+                try:
+                    self._handler(item)
+                    with self._stats_lock:
+                        self._processed += 1
+                except Exception:
+                    with self._stats_lock:
+                        self._failed += 1
+                    logger.exception("Worker handler failed | pool=%s", self._name)
+            finally:
+                queue.task_done()
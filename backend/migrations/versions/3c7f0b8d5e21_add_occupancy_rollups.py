@@ -0,0 +1,49 @@
+"""add occupancy_rollups and rollup_watermarks tables
+
+Revision ID: 3c7f0b8d5e21
+Revises: 9d4a1f6e2c88
+Create Date: 2026-10-18 11:24:53.604117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c7f0b8d5e21'
+down_revision = '9d4a1f6e2c88'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('occupancy_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('granularity', sa.String(length=10), nullable=False),
+    sa.Column('scope', sa.String(length=10), nullable=False),
+    sa.Column('scope_id', sa.String(length=50), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('samples', sa.Integer(), nullable=False),
+    sa.Column('occupied_samples', sa.Integer(), nullable=False),
+    sa.Column('occupied_seconds', sa.Float(), nullable=False),
+    sa.Column('transitions', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('granularity', 'scope', 'scope_id', 'bucket_start', name='uq_occupancy_rollups_bucket')
+    )
+    with op.batch_alter_table('occupancy_rollups', schema=None) as batch_op:
+        batch_op.create_index('idx_occupancy_rollups_scope_time', ['granularity', 'scope', 'bucket_start'], unique=False)
+
+    op.create_table('rollup_watermarks',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('last_id', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('rollup_watermarks')
+    with op.batch_alter_table('occupancy_rollups', schema=None) as batch_op:
+        batch_op.drop_index('idx_occupancy_rollups_scope_time')
+
+    op.drop_table('occupancy_rollups')
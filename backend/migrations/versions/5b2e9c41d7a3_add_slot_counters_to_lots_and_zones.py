@@ -0,0 +1,55 @@
+"""add denormalized slot counters to lots and zones
+
+Revision ID: 5b2e9c41d7a3
+Revises: ac67284e56b9
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2e9c41d7a3'
+down_revision = 'ac67284e56b9'
+branch_labels = None
+depends_on = None
+
+
+COUNTER_COLUMNS = ('occupied_slots', 'available_slots', 'reserved_slots')
+
+
+def upgrade():
+    for table_name in ('parking_lots', 'zones'):
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            for column_name in COUNTER_COLUMNS:
+                batch_op.add_column(
+                    sa.Column(column_name, sa.Integer(), nullable=False, server_default='0')
+                )
+
+    # Backfill from the current slot state.
+    for table_name, fk_column in (('parking_lots', 'lot_id'), ('zones', 'zone_id')):
+        op.execute(
+            f"""
+            UPDATE {table_name} SET
+                occupied_slots = (
+                    SELECT COUNT(*) FROM parking_slots s
+                    WHERE s.{fk_column} = {table_name}.id AND COALESCE(s.is_occupied, FALSE)
+                ),
+                available_slots = (
+                    SELECT COUNT(*) FROM parking_slots s
+                    WHERE s.{fk_column} = {table_name}.id AND NOT COALESCE(s.is_occupied, FALSE)
+                ),
+                reserved_slots = (
+                    SELECT COUNT(*) FROM parking_slots s
+                    WHERE s.{fk_column} = {table_name}.id AND COALESCE(s.is_reserved, FALSE)
+                )
+            """
+        )
+
+
+def downgrade():
+    for table_name in ('zones', 'parking_lots'):
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            for column_name in reversed(COUNTER_COLUMNS):
+                batch_op.drop_column(column_name)
@@ -0,0 +1,27 @@
+"""add parking_events keyset pagination indexes
+
+Revision ID: 7e1d2a9b4c60
+Revises: 3c7f0b8d5e21
+Create Date: 2026-10-18 12:08:31.270519
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7e1d2a9b4c60'
+down_revision = '3c7f0b8d5e21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('parking_events', schema=None) as batch_op:
+        batch_op.create_index('idx_parking_events_time_id', ['timestamp', 'id'], unique=False)
+        batch_op.create_index('idx_parking_events_slot_time_id', ['slot_id', 'timestamp', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('parking_events', schema=None) as batch_op:
+        batch_op.drop_index('idx_parking_events_slot_time_id')
+        batch_op.drop_index('idx_parking_events_time_id')
@@ -0,0 +1,59 @@
+"""add slot_latest_readings table
+
+Revision ID: 9d4a1f6e2c88
+Revises: 5b2e9c41d7a3
+Create Date: 2026-10-18 10:02:17.530941
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4a1f6e2c88'
+down_revision = '5b2e9c41d7a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('slot_latest_readings',
+    sa.Column('slot_id', sa.String(length=50), nullable=False),
+    sa.Column('distance_cm', sa.Float(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['slot_id'], ['parking_slots.id'], ),
+    sa.PrimaryKeyConstraint('slot_id')
+    )
+
+    # Seed from the newest row across both telemetry tables.
+    op.execute(
+        """
+        INSERT INTO slot_latest_readings (slot_id, distance_cm, status, timestamp)
+        SELECT slot_id, distance_cm, status, timestamp FROM (
+            SELECT
+                slot_id,
+                distance_cm,
+                status,
+                timestamp,
+                ROW_NUMBER() OVER (PARTITION BY slot_id ORDER BY timestamp DESC) AS row_rank
+            FROM (
+                SELECT slot_id, distance_cm, status, timestamp
+                FROM occupancy_logs
+                UNION ALL
+                SELECT
+                    slot_id,
+                    distance_cm,
+                    CASE WHEN is_occupied THEN 'occupied' ELSE 'vacant' END,
+                    timestamp
+                FROM sensor_readings
+                WHERE timestamp IS NOT NULL
+            ) telemetry
+        ) ranked
+        WHERE row_rank = 1
+        """
+    )
+
+
+def downgrade():
+    op.drop_table('slot_latest_readings')
@@ -0,0 +1,33 @@
+"""add rollup_slot_states for incremental rollup refreshes
+
+Revision ID: a8c4e2f69d15
+Revises: f18b6d4c2a57
+Create Date: 2026-10-18 17:05:22.418093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8c4e2f69d15'
+down_revision = 'f18b6d4c2a57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Starts empty: the first refresh after the upgrade seeds each slot from its newest log.
+    op.create_table('rollup_slot_states',
+    sa.Column('slot_id', sa.String(length=50), nullable=False),
+    sa.Column('log_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.Column('credited_until', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['slot_id'], ['parking_slots.id'], ),
+    sa.PrimaryKeyConstraint('slot_id')
+    )
+
+
+def downgrade():
+    op.drop_table('rollup_slot_states')
@@ -0,0 +1,41 @@
+"""add denormalized lot_id to parking_events
+
+Revision ID: b4f8c3e1a925
+Revises: 7e1d2a9b4c60
+Create Date: 2026-10-18 12:47:06.913352
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4f8c3e1a925'
+down_revision = '7e1d2a9b4c60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('parking_events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('lot_id', sa.String(length=50), nullable=True))
+
+    op.execute(
+        """
+        UPDATE parking_events SET lot_id = (
+            SELECT s.lot_id FROM parking_slots s WHERE s.id = parking_events.slot_id
+        )
+        """
+    )
+
+    with op.batch_alter_table('parking_events', schema=None) as batch_op:
+        batch_op.alter_column('lot_id', existing_type=sa.String(length=50), nullable=False)
+        batch_op.create_foreign_key('fk_parking_events_lot_id', 'parking_lots', ['lot_id'], ['id'])
+        batch_op.create_index('idx_parking_events_lot_time_id', ['lot_id', 'timestamp', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('parking_events', schema=None) as batch_op:
+        batch_op.drop_index('idx_parking_events_lot_time_id')
+        batch_op.drop_constraint('fk_parking_events_lot_id', type_='foreignkey')
+        batch_op.drop_column('lot_id')
@@ -0,0 +1,38 @@
+"""add telemetry_minute_aggregates table
+
+Revision ID: c92e5d7a1f34
+Revises: b4f8c3e1a925
+Create Date: 2026-10-18 13:31:42.558017
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c92e5d7a1f34'
+down_revision = 'b4f8c3e1a925'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('telemetry_minute_aggregates',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('source', sa.String(length=20), nullable=False),
+    sa.Column('slot_id', sa.String(length=50), nullable=False),
+    sa.Column('minute_start', sa.DateTime(), nullable=False),
+    sa.Column('samples', sa.Integer(), nullable=False),
+    sa.Column('occupied_samples', sa.Integer(), nullable=False),
+    sa.Column('distance_samples', sa.Integer(), nullable=False),
+    sa.Column('distance_sum', sa.Float(), nullable=False),
+    sa.Column('distance_min', sa.Float(), nullable=True),
+    sa.Column('distance_max', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['slot_id'], ['parking_slots.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('source', 'slot_id', 'minute_start', name='uq_telemetry_minute_aggregates_bucket')
+    )
+
+
+def downgrade():
+    op.drop_table('telemetry_minute_aggregates')
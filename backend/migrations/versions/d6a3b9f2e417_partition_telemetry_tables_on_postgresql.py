@@ -0,0 +1,145 @@
+"""range-partition sensor_readings and occupancy_logs by timestamp on PostgreSQL
+
+Revision ID: d6a3b9f2e417
+Revises: c92e5d7a1f34
+Create Date: 2026-10-18 14:16:09.842771
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+# Same layout helpers as prism-partitions, so the initial partitions follow
+# PRISM_TELEMETRY_PARTITION_INTERVAL and later maintenance extends them without overlaps.
+from app.services.partitions import (
+    next_partition_start,
+    partition_interval,
+    partition_name,
+    partition_start,
+)
+
+
+# revision identifiers, used by Alembic.
+revision = 'd6a3b9f2e417'
+down_revision = 'c92e5d7a1f34'
+branch_labels = None
+depends_on = None
+
+
+# Column DDL for each table. The partition key has to be part of the primary key, so
+# (id, timestamp) replaces id and timestamp becomes NOT NULL.
+TABLES = {
+    'sensor_readings': {
+        'columns': """
+            id INTEGER NOT NULL DEFAULT nextval('sensor_readings_id_seq'),
+            slot_id VARCHAR(50) NOT NULL REFERENCES parking_slots (id),
+            distance_cm FLOAT NOT NULL,
+            is_occupied BOOLEAN NOT NULL,
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        """,
+        'copy_columns': 'id, slot_id, distance_cm, is_occupied, timestamp',
+        'select_columns': "id, slot_id, distance_cm, is_occupied, COALESCE(timestamp, now() AT TIME ZONE 'utc')",
+        'index': ('idx_sensor_readings_slot_time', 'slot_id, timestamp'),
+        'timestamp_nullable': True,
+    },
+    'occupancy_logs': {
+        'columns': """
+            id INTEGER NOT NULL DEFAULT nextval('occupancy_logs_id_seq'),
+            slot_id VARCHAR(50) NOT NULL REFERENCES parking_slots (id),
+            status VARCHAR(20) NOT NULL,
+            distance_cm FLOAT,
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        """,
+        'copy_columns': 'id, slot_id, status, distance_cm, timestamp',
+        'select_columns': 'id, slot_id, status, distance_cm, timestamp',
+        'index': ('idx_occupancy_logs_slot_time', 'slot_id, timestamp'),
+        'timestamp_nullable': False,
+    },
+}
+PARTITIONS_AHEAD = 2
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        # Other databases keep plain tables; retention uses batched deletes there.
+        return
+
+    interval = partition_interval()
+
+    for table_name, spec in TABLES.items():
+        legacy = f'{table_name}_unpartitioned'
+        index_name, index_columns = spec['index']
+
+        op.execute(f'ALTER TABLE {table_name} RENAME TO {legacy}')
+        op.execute(f'ALTER TABLE {legacy} RENAME CONSTRAINT {table_name}_pkey TO {legacy}_pkey')
+        op.execute(f'ALTER INDEX {index_name} RENAME TO {index_name}_unpartitioned')
+        op.execute(
+            f"""
+            CREATE TABLE {table_name} (
+                {spec['columns']},
+                PRIMARY KEY (id, timestamp)
+            ) PARTITION BY RANGE (timestamp)
+            """
+        )
+        op.execute(f'CREATE INDEX {index_name} ON {table_name} ({index_columns})')
+        op.execute(f'CREATE TABLE {table_name}_default PARTITION OF {table_name} DEFAULT')
+
+        bounds = bind.execute(sa.text(f'SELECT MIN(timestamp), MAX(timestamp) FROM {legacy}')).one()
+        now = datetime.utcnow()
+        first = partition_start(bounds[0] or now, interval)
+        last = partition_start(now, interval)
+        for _ in range(PARTITIONS_AHEAD):
+            last = next_partition_start(last, interval)
+        if bounds[1] is not None and bounds[1] > last:
+            last = partition_start(bounds[1], interval)
+
+        start = first
+        while start <= last:
+            end = next_partition_start(start, interval)
+            op.execute(
+                f"CREATE TABLE {partition_name(table_name, start, interval)} PARTITION OF {table_name} "
+                f"FOR VALUES FROM ('{start.isoformat(sep=' ')}') TO ('{end.isoformat(sep=' ')}')"
+            )
+            start = end
+
+        op.execute(
+            f"INSERT INTO {table_name} ({spec['copy_columns']}) "
+            f"SELECT {spec['select_columns']} FROM {legacy}"
+        )
+        # Keep the id sequence alive when the legacy table that owned it is dropped.
+        op.execute(f'ALTER SEQUENCE {table_name}_id_seq OWNED BY {table_name}.id')
+        op.execute(f'DROP TABLE {legacy}')
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    for table_name, spec in TABLES.items():
+        partitioned = f'{table_name}_partitioned'
+        index_name, index_columns = spec['index']
+
+        op.execute(f'ALTER TABLE {table_name} RENAME TO {partitioned}')
+        op.execute(f'ALTER TABLE {partitioned} RENAME CONSTRAINT {table_name}_pkey TO {partitioned}_pkey')
+        op.execute(f'ALTER INDEX {index_name} RENAME TO {index_name}_partitioned')
+        op.execute(
+            f"""
+            CREATE TABLE {table_name} (
+                {spec['columns']},
+                PRIMARY KEY (id)
+            )
+            """
+        )
+        if spec['timestamp_nullable']:
+            op.execute(f'ALTER TABLE {table_name} ALTER COLUMN timestamp DROP NOT NULL')
+        op.execute(f'CREATE INDEX {index_name} ON {table_name} ({index_columns})')
+        op.execute(
+            f"INSERT INTO {table_name} ({spec['copy_columns']}) "
+            f"SELECT {spec['copy_columns']} FROM {partitioned}"
+        )
+        op.execute(f'ALTER SEQUENCE {table_name}_id_seq OWNED BY {table_name}.id')
+        # Dropping the partitioned parent drops every partition with it.
+        op.execute(f'DROP TABLE {partitioned}')
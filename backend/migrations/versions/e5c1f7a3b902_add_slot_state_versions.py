@@ -0,0 +1,47 @@
+"""add state_counters table and slot/lot state versions
+
+Revision ID: e5c1f7a3b902
+Revises: d6a3b9f2e417
+Create Date: 2026-10-18 15:02:37.114380
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5c1f7a3b902'
+down_revision = 'd6a3b9f2e417'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('state_counters',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+    with op.batch_alter_table('parking_lots', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('state_version', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('state_changed_at', sa.DateTime(), nullable=True))
+
+    with op.batch_alter_table('parking_slots', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('state_version', sa.Integer(), nullable=False, server_default='0'))
+
+    op.execute(
+        "INSERT INTO state_counters (name, value, updated_at) "
+        "VALUES ('slot_state', 0, CURRENT_TIMESTAMP)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('parking_slots', schema=None) as batch_op:
+        batch_op.drop_column('state_version')
+
+    with op.batch_alter_table('parking_lots', schema=None) as batch_op:
+        batch_op.drop_column('state_changed_at')
+        batch_op.drop_column('state_version')
+
+    op.drop_table('state_counters')
@@ -0,0 +1,27 @@
+"""add parking_slots state_version indexes for delta listings
+
+Revision ID: f18b6d4c2a57
+Revises: e5c1f7a3b902
+Create Date: 2026-10-18 15:41:12.603955
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f18b6d4c2a57'
+down_revision = 'e5c1f7a3b902'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('parking_slots', schema=None) as batch_op:
+        batch_op.create_index('idx_parking_slots_state_version', ['state_version'], unique=False)
+        batch_op.create_index('idx_parking_slots_lot_state_version', ['lot_id', 'state_version'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('parking_slots', schema=None) as batch_op:
+        batch_op.drop_index('idx_parking_slots_lot_state_version')
+        batch_op.drop_index('idx_parking_slots_state_version')
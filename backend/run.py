@@ -8,9 +8,14 @@ load_dotenv()
 
 from app import create_app
 from app.services.mqtt_service import MQTTService
+from app.services.partitions import PartitionScheduler
+from app.services.retention import RetentionScheduler
 
 app = create_app()
 mqtt_service = MQTTService(app)
+retention_scheduler = RetentionScheduler(app)
+rollup_scheduler = app.extensions["prism_rollups"]
+partition_scheduler = PartitionScheduler(app)
 
 
 def _should_start_mqtt(debug_mode: bool) -> bool:
@@ -26,6 +31,9 @@ if __name__ == '__main__':
 
     if start_mqtt:
         mqtt_service.start()
+        retention_scheduler.start()
+        rollup_scheduler.start()
+        partition_scheduler.start()
 
     try:
         # Run Flask development server
@@ -37,4 +45,7 @@ if __name__ == '__main__':
         )
     finally:
         if start_mqtt:
+            partition_scheduler.stop()
+            rollup_scheduler.stop()
+            retention_scheduler.stop()
             mqtt_service.stop()
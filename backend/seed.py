@@ -6,11 +6,13 @@ from dataclasses import dataclass
 from typing import Any
 
 import click
-from flask import Flask
+from flask import Flask, current_app
 
 from app import db
 from app.models.parking import ParkingLot, ParkingSlot, Zone
 from app.models.user import User
+from app.services.metadata_cache import get_metadata_cache
+from app.services.slot_counters import bump_state_version, rebuild_slot_counters
 
 
 @dataclass(frozen=True)
@@ -191,6 +193,10 @@ def seed_campus_data(admin_email: str, admin_password: str) -> dict[str, int]:
         summary["slots_created"] += slots_created
         summary["slots_updated"] += slots_updated
 
+    db.session.flush()
+    rebuild_slot_counters(db.session)
+    bump_state_version(db.session, lot_ids=[lot_seed.lot["id"] for lot_seed in SEED_DATA])
+
     admin_created = _upsert_admin_user(admin_email=admin_email, admin_password=admin_password)
     if admin_created:
         summary["admin_users_created"] += 1
@@ -198,6 +204,7 @@ def seed_campus_data(admin_email: str, admin_password: str) -> dict[str, int]:
         summary["admin_users_updated"] += 1
 
     db.session.commit()
+    get_metadata_cache(current_app).invalidate()
     return summary
 
 
@@ -2,13 +2,20 @@
 
 from __future__ import annotations
 
+import json
+import os
 from datetime import datetime, timedelta
 from pathlib import Path
 
 import pytest
 
 from app import create_app, db
-from app.models.parking import OccupancyLog, ParkingEvent, ParkingSlot
+from app.models.parking import OccupancyLog, OccupancyRollup, ParkingEvent, ParkingSlot
+from app.services import response_cache as response_cache_module
+from app.services.metadata_cache import ZoneMetadata
+from app.services.prediction import ARTIFACT_FORMAT, PredictionEngine, build_forecast_artifact
+from app.services.recommendation import DestinationIndex, rank_zones
+from app.services.response_cache import LRUTTLCache
 from seed import seed_campus_data
 
 
@@ -158,3 +165,222 @@ def test_admin_endpoints_return_sensor_and_analytics_payload_for_admin(client):
     assert "peak_hour" in analytics_payload
     assert "zone_utilization_comparison" in analytics_payload
     assert len(analytics_payload["hourly_event_distribution"]) == 24
+
+
+def test_recommendations_are_served_from_cache_until_lot_state_changes(client):
+    _register_student(client, email="day8.student4@gla.ac.in")
+    headers = _auth_headers(client, "day8.student4@gla.ac.in", "StrongPass123")
+    admin_headers = _auth_headers(client, "admin@prism.local", "Admin@12345")
+    path = "/api/v1/lots/lot-a/recommend?destination=Library&day=monday&time=09:00"
+
+    first = client.get(path, headers=headers)
+    assert first.headers["X-Cache"] == "MISS"
+
+    # Same hour and case-insensitive destination share the cached ranking.
+    second = client.get(
+        "/api/v1/lots/lot-a/recommend?destination=library&day=monday&time=09:45",
+        headers=headers,
+    )
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.get_json()["recommended_zone"] == first.get_json()["recommended_zone"]
+    assert second.get_json()["predicted_for"] == {"day": "monday", "time": "09:45"}
+    assert second.get_json()["destination"] == "library"
+
+    bypassed = client.get(path, headers={**headers, "Cache-Control": "no-cache"})
+    assert bypassed.headers["X-Cache"] == "BYPASS"
+
+    update = client.put(
+        "/api/v1/slots/lot-a-slot-2/status",
+        json={"is_occupied": True},
+        headers=admin_headers,
+    )
+    assert update.status_code == 200
+    assert client.get(path, headers=headers).headers["X-Cache"] == "MISS"
+
+    missing = client.get("/api/v1/lots/lot-zz/predict", headers=headers)
+    assert missing.status_code == 404
+
+    runtime = client.get("/api/v1/admin/runtime", headers=admin_headers).get_json()["insights_cache"]
+    assert runtime["hits"] == 1
+    assert runtime["bypasses"] == 1
+
+
+def test_lru_ttl_cache_evicts_oldest_and_expires_entries(monkeypatch: pytest.MonkeyPatch):
+    clock = {"now": 100.0}
+    monkeypatch.setattr(response_cache_module.time, "monotonic", lambda: clock["now"])
+    cache = LRUTTLCache(max_entries=2, ttl_seconds=10)
+
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get_or_compute("a", lambda: 0) == (1, True)
+    cache.put("c", 3)  # evicts "b", the least recently used
+    assert cache.get_or_compute("b", lambda: 20) == (20, False)  # evicts "a"
+
+    clock["now"] += 11
+    assert cache.get_or_compute("c", lambda: 30) == (30, False)
+    stats = cache.stats()
+    assert stats["evictions"] == 2
+    assert stats["expirations"] == 1
+    assert LRUTTLCache(max_entries=0, ttl_seconds=10).get_or_compute("x", lambda: 1) == (1, False)
+
+
+def _write_forecast(path: Path, version: str, monday_9am: float) -> None:
+    table = [[None] * 24 for _ in range(7)]
+    table[0][9] = monday_9am
+    path.write_text(
+        json.dumps(
+            {
+                "format": ARTIFACT_FORMAT,
+                "version": version,
+                "forecast_weight": 0.5,
+                "zones": {"zone-a-east": table},
+            }
+        ),
+        encoding="utf-8",
+    )
+
+
+def test_prediction_uses_forecast_artifact_and_hot_reloads(client, tmp_path: Path):
+    _register_student(client, email="day8.student5@gla.ac.in")
+    headers = _auth_headers(client, "day8.student5@gla.ac.in", "StrongPass123")
+    provider = client.application.extensions["prism_prediction"]
+    provider.artifact_path = tmp_path / "forecast.json"
+    provider.reload_check_seconds = 0
+    path = "/api/v1/lots/lot-a/predict?day=monday&time=09:00"
+
+    assert client.get(path, headers=headers).get_json()["model"]["status"] == "mock"
+
+    _write_forecast(provider.artifact_path, "table-v1", 80.0)
+    payload = client.get(path, headers=headers).get_json()
+    assert payload["model"]["status"] == "trained"
+    assert payload["model"]["version"] == "table-v1"
+    zones = {zone["zone_id"]: zone for zone in payload["zones"]}
+    east = zones["zone-a-east"]
+    assert east["predicted_occupancy_pct"] == round(0.5 * 80.0 + 0.5 * east["current_occupancy_pct"], 1)
+    # Zones missing from the artifact keep the heuristic.
+    west = zones["zone-a-west"]
+    assert west["predicted_occupancy_pct"] == min(100.0, round(west["current_occupancy_pct"] + 3.0 + 12.0, 1))
+
+    _write_forecast(provider.artifact_path, "table-v2", 20.0)
+    stat = provider.artifact_path.stat()
+    os.utime(provider.artifact_path, (stat.st_atime, stat.st_mtime + 5))
+    reloaded = client.get(path, headers=headers).get_json()
+    assert reloaded["model"]["version"] == "table-v2"
+
+    provider.artifact_path.write_text("{not json", encoding="utf-8")
+    os.utime(provider.artifact_path, (stat.st_atime, stat.st_mtime + 10))
+    assert client.get(path, headers=headers).get_json()["model"]["version"] == "table-v2"
+    assert provider.stats()["load_errors"] == 1
+
+
+def test_forecast_command_builds_artifact_from_rollups(client, tmp_path: Path):
+    output = tmp_path / "models" / "forecast.json"
+    result = client.application.test_cli_runner().invoke(
+        args=["prism-forecast", "--weeks", "2", "--output", str(output)]
+    )
+    assert result.exit_code == 0, result.output
+
+    artifact = json.loads(output.read_text(encoding="utf-8"))
+    assert artifact["format"] == ARTIFACT_FORMAT
+    assert "zone-a-east" in artifact["zones"]
+    table = artifact["zones"]["zone-a-east"]
+    assert len(table) == 7 and all(len(hours) == 24 for hours in table)
+    assert any(value is not None for hours in table for value in hours)
+
+
+def test_forecast_counts_hours_without_rollups_as_empty(client):
+    now = datetime(2026, 6, 15, 12, 30)  # a Monday
+    busy_hour = datetime(2026, 6, 8, 9, 0)
+    with client.application.app_context():
+        slots = ParkingSlot.query.filter_by(zone_id="zone-a-east").count()
+        db.session.query(OccupancyRollup).delete()
+        db.session.add(
+            OccupancyRollup(
+                granularity="hour",
+                scope="zone",
+                scope_id="zone-a-east",
+                bucket_start=busy_hour,
+                samples=1,
+                occupied_samples=1,
+                occupied_seconds=slots * 3600.0,
+            )
+        )
+        db.session.commit()
+
+        artifact = build_forecast_artifact(db.session, weeks=2, now=now)
+
+    table = artifact["zones"]["zone-a-east"]
+    # One fully occupied Monday 09:00 out of two in the window averages to 50%, not 100%.
+    assert table[0][9] == 50.0
+    assert table[0][10] == 0.0
+    assert table[2][9] == 0.0
+
+
+def test_bulk_recommendations_match_single_requests(client):
+    _register_student(client, email="day8.student6@gla.ac.in")
+    headers = _auth_headers(client, "day8.student6@gla.ac.in", "StrongPass123")
+
+    response = client.post(
+        "/api/v1/lots/lot-a/recommend/bulk",
+        json={
+            "destinations": ["Library", "Nowhere Hall"],
+            "times": [{"day": "Monday", "time": "09:00"}, {"day": "friday", "time": "17:30"}],
+            "top_k": 2,
+        },
+        headers=headers,
+    )
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload["total"] == 4
+    assert [(item["destination"], item["predicted_for"]["day"]) for item in payload["results"]] == [
+        ("Library", "monday"),
+        ("Nowhere Hall", "monday"),
+        ("Library", "friday"),
+        ("Nowhere Hall", "friday"),
+    ]
+
+    single = client.get(
+        "/api/v1/lots/lot-a/recommend?destination=Library&day=friday&time=17:30",
+        headers=headers,
+    ).get_json()
+    assert payload["results"][2]["recommended_zone"] == single["recommended_zone"]
+    assert payload["results"][2]["alternatives"] == single["alternatives"][:1]
+    assert payload["results"][1]["recommended_zone"]["estimated_walk_minutes"] == 8
+
+    invalid = client.post(
+        "/api/v1/lots/lot-a/recommend/bulk",
+        json={"destinations": [], "times": [{"day": "someday", "time": "25:00"}]},
+        headers=headers,
+    )
+    assert invalid.status_code == 400
+    assert set(invalid.get_json()["details"]) == {"destinations", "times"}
+
+
+def test_vectorized_ranking_matches_full_sort_with_ties():
+    zones = [
+        ZoneMetadata(id=f"z{index}", lot_id="lot", name=f"Zone {index}", walk_times=walk)
+        for index, walk in enumerate(
+            [{"Library": 2}, {"library ": 1}, {"LIBRARY": 2}, {}, {"Library": 1, "Gym": 5}]
+        )
+    ]
+    zone_rows = [
+        {"zone_id": zone.id, "name": zone.name, "current_occupancy_pct": pct, "total_slots": 4}
+        for zone, pct in zip(zones, [30.0, 33.0, 30.0, 10.0, 33.0])
+    ]
+    engine = PredictionEngine()
+    index = DestinationIndex(zones)
+    assert sorted(index.destinations) == ["gym", "library"]
+
+    ranked = rank_zones(engine, zone_rows, index, ["Library", "gym"], [("sunday", 3)], top_k=2)[0]
+
+    for destination, result in zip(["library", "gym"], ranked):
+        expected = []
+        for zone, prediction in zip(zones, engine.predict(zone_rows, day="sunday", hour=3)):
+            walk = next(
+                (minutes for key, minutes in zone.walk_times.items() if key.strip().lower() == destination),
+                8,
+            )
+            predicted = prediction["predicted_occupancy_pct"]
+            expected.append((round(predicted + walk * 3, 2), predicted, zone.id))
+        expected.sort(key=lambda item: (item[0], item[1]))
+        assert [zone["zone_id"] for zone in result] == [item[2] for item in expected[:2]]
@@ -0,0 +1,121 @@
+"""Tests for the process-local lot/zone/slot metadata cache."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models.parking import ParkingLot
+from app.services import metadata_cache as metadata_cache_module
+from app.services.metadata_cache import get_metadata_cache
+from seed import seed_campus_data
+
+
+@pytest.fixture()
+def app(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    db_file = tmp_path / "metadata_cache.db"
+
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db_file}")
+    monkeypatch.setenv("SECRET_KEY", "metadata-cache-secret")
+    monkeypatch.setenv("JWT_SECRET_KEY", "metadata-cache-jwt-secret")
+    monkeypatch.setenv("PRISM_ALLOW_PUBLIC_READS", "true")
+    monkeypatch.setenv("PRISM_METADATA_CACHE_TTL_SECONDS", "60")
+
+    app = create_app()
+    app.config.update(TESTING=True)
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed_campus_data(admin_email="admin@prism.local", admin_password="Admin@12345")
+
+    return app
+
+
+def _admin_headers(client) -> dict[str, str]:
+    login = client.post(
+        "/api/v1/auth/login",
+        json={"email": "admin@prism.local", "password": "Admin@12345"},
+    )
+    assert login.status_code == 200
+    return {"Authorization": f"Bearer {login.get_json()['access_token']}"}
+
+
+def _statements_for(app, client, path: str) -> tuple[object, list[str]]:
+    statements: list[str] = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    try:
+        response = client.get(path)
+    finally:
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+    assert response.status_code == 200
+    return response, statements
+
+
+@pytest.mark.parametrize("path", ["/api/v1/slots", "/api/v1/lots", "/api/v1/lots/lot-a"])
+def test_warm_reads_skip_static_metadata_queries(app, path: str):
+    client = app.test_client()
+
+    cold, cold_statements = _statements_for(app, client, path)
+    warm, warm_statements = _statements_for(app, client, path)
+
+    assert warm.get_json() == cold.get_json()
+    assert len(warm_statements) < len(cold_statements)
+    assert not any("walk_times" in statement or "sensor_id" in statement for statement in warm_statements)
+
+    stats = get_metadata_cache(app).stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] >= 1
+    assert stats["slots"] > 0
+
+
+def test_create_lot_and_seed_invalidate_the_cache(app):
+    client = app.test_client()
+    headers = _admin_headers(client)
+    client.get("/api/v1/lots")
+    invalidations = get_metadata_cache(app).stats()["invalidations"]
+
+    created = client.post(
+        "/api/v1/lots",
+        json={"id": "lot-c", "name": "Library Annex", "total_slots": 0},
+        headers=headers,
+    )
+    assert created.status_code == 201
+
+    lots = {lot["id"]: lot for lot in client.get("/api/v1/lots").get_json()["lots"]}
+    assert lots["lot-c"]["name"] == "Library Annex"
+
+    with app.app_context():
+        seed_campus_data(admin_email="admin@prism.local", admin_password="Admin@12345")
+
+    runtime = client.get("/api/v1/admin/runtime", headers=headers).get_json()["metadata_cache"]
+    assert runtime["invalidations"] == invalidations + 2
+    assert runtime["misses"] >= 2
+
+
+def test_out_of_band_changes_appear_after_ttl(app, monkeypatch: pytest.MonkeyPatch):
+    client = app.test_client()
+    clock = {"now": 1000.0}
+    monkeypatch.setattr(metadata_cache_module.time, "monotonic", lambda: clock["now"])
+    client.get("/api/v1/lots")
+
+    with app.app_context():
+        db.session.get(ParkingLot, "lot-a").name = "Renamed Elsewhere"
+        db.session.commit()
+
+    def lot_a_name() -> str:
+        lots = client.get("/api/v1/lots").get_json()["lots"]
+        return next(lot["name"] for lot in lots if lot["id"] == "lot-a")
+
+    assert lot_a_name() != "Renamed Elsewhere"
+    clock["now"] += 61
+    assert lot_a_name() == "Renamed Elsewhere"
@@ -0,0 +1,464 @@
+"""Tests for MQTT slot ingest persistence without a live broker."""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from threading import Event, current_thread
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models.parking import (
+    OccupancyLog,
+    ParkingEvent,
+    ParkingLot,
+    ParkingSlot,
+    SensorReading,
+    SlotLatestReading,
+    Zone,
+)
+from app.services.mqtt_service import MQTTService, SlotReading
+from app.services.occupancy_filter import OccupancyFilter
+from app.services.slot_state import get_slot_state_cache
+from app.services.worker_pool import PartitionedWorkerPool
+from seed import seed_campus_data
+
+
+@pytest.fixture()
+def app(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    db_file = tmp_path / "mqtt_ingest.db"
+
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db_file}")
+    monkeypatch.setenv("SECRET_KEY", "mqtt-ingest-secret")
+    monkeypatch.setenv("JWT_SECRET_KEY", "mqtt-ingest-jwt-secret")
+
+    app = create_app()
+    app.config.update(TESTING=True)
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed_campus_data(admin_email="admin@prism.local", admin_password="Admin@12345")
+
+    return app
+
+
+def _row_counts(app) -> tuple[int, int, int]:
+    with app.app_context():
+        return (
+            SensorReading.query.count(),
+            OccupancyLog.query.count(),
+            ParkingEvent.query.count(),
+        )
+
+
+@contextmanager
+def _capture_statements(app):
+    statements: list[str] = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+def test_immediate_mode_persists_each_reading(app, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("PRISM_MQTT_INGEST_MODE", "immediate")
+    service = MQTTService(app)
+
+    service._handle_slot_update("lot-a", "slot-1", {"distance_cm": 8.0})
+
+    assert _row_counts(app) == (1, 1, 1)
+    with app.app_context():
+        assert db.session.get(ParkingSlot, "lot-a-slot-1").is_occupied is True
+        lot = db.session.get(ParkingLot, "lot-a")
+        assert (lot.occupied_slots, lot.available_slots) == (1, 5)
+        assert db.session.get(Zone, "zone-a-east").occupied_slots == 1
+
+
+def test_buffered_mode_flushes_on_size_threshold(app, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("PRISM_MQTT_INGEST_MODE", "buffered")
+    monkeypatch.setenv("PRISM_MQTT_FLUSH_MAX_READINGS", "3")
+    service = MQTTService(app)
+
+    service._handle_slot_update("lot-a", "slot-1", {"distance_cm": 8.0})
+    service._handle_slot_update("lot-a", "slot-1", {"distance_cm": 90.0})
+    assert _row_counts(app) == (0, 0, 0)
+
+    service._handle_slot_update("lot-a", "slot-2", {"distance_cm": 7.5})
+    assert _row_counts(app) == (3, 3, 3)
+
+    with app.app_context():
+        events = ParkingEvent.query.order_by(ParkingEvent.id.asc()).all()
+        assert [(event.slot_id, event.event_type) for event in events] == [
+            ("lot-a-slot-1", "entry"),
+            ("lot-a-slot-1", "exit"),
+            ("lot-a-slot-2", "entry"),
+        ]
+        assert db.session.get(ParkingSlot, "lot-a-slot-1").is_occupied is False
+
+
+def test_buffered_mode_flushes_pending_readings_on_stop(app, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("PRISM_MQTT_INGEST_MODE", "buffered")
+    monkeypatch.setenv("PRISM_MQTT_FLUSH_MAX_READINGS", "100")
+    service = MQTTService(app)
+
+    service._handle_slot_update("lot-b", "slot-4", {"distance_cm": 6.0})
+    service._handle_slot_update("lot-b", "missing-slot", {"distance_cm": 6.0})
+    assert _row_counts(app) == (0, 0, 0)
+
+    service.stop()
+
+    assert _row_counts(app) == (1, 1, 1)
+    assert service.flush() == 0
+
+
+def test_size_triggered_flush_runs_on_the_flusher_thread(app, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("PRISM_MQTT_INGEST_MODE", "buffered")
+    monkeypatch.setenv("PRISM_MQTT_FLUSH_MAX_READINGS", "2")
+    monkeypatch.setenv("PRISM_MQTT_FLUSH_INTERVAL_SECONDS", "60")
+    service = MQTTService(app)
+    persist = service._persist_readings
+    flushed_on: list[str] = []
+    flushed = Event()
+
+    def _recording_persist(readings):
+        flushed_on.append(current_thread().name)
+        result = persist(readings)
+        flushed.set()
+        return result
+
+    monkeypatch.setattr(service, "_persist_readings", _recording_persist)
+    service._start_flusher()
+    try:
+        service._handle_slot_update("lot-a", "slot-1", {"distance_cm": 8.0})
+        service._handle_slot_update("lot-a", "slot-2", {"distance_cm": 8.0})
+        assert flushed.wait(5.0)
+    finally:
+        service.stop()
+
+    assert flushed_on[0] == "prism-mqtt-flush"
+    assert _row_counts(app) == (2, 2, 2)
+
+
+def test_failed_flush_is_retried_then_dropped_after_the_bound(app, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("PRISM_MQTT_INGEST_MODE", "buffered")
+    monkeypatch.setenv("PRISM_MQTT_FLUSH_MAX_READINGS", "100")
+    monkeypatch.setenv("PRISM_MQTT_FLUSH_MAX_RETRIES", "1")
+    service = MQTTService(app)
+
+    def _failing_commit():
+        raise RuntimeError("commit failed")
+
+    service._handle_slot_update("lot-a", "slot-1", {"distance_cm": 8.0})
+    with monkeypatch.context() as patch:
+        patch.setattr(db.session, "commit", _failing_commit)
+        assert service.flush() == 0
+    assert service.stats()["retry_readings"] == 1
+
+    # The kept batch goes out ahead of newer readings once commits succeed again.
+    service._handle_slot_update("lot-a", "slot-1", {"distance_cm": 90.0})
+    assert service.flush() == 2
+    assert _row_counts(app) == (2, 2, 2)
+
+    service._handle_slot_update("lot-a", "slot-2", {"distance_cm": 8.0})
+    with monkeypatch.context() as patch:
+        patch.setattr(db.session, "commit", _failing_commit)
+        assert service.flush() == 0
+        assert service.flush() == 0
+    stats = service.stats()
+    assert (stats["retry_readings"], stats["dropped_readings"], stats["flush_failures"]) == (0, 1, 3)
+    assert service.flush() == 0
+
+
+def test_warm_slot_cache_skips_parking_slots_for_unchanged_and_unknown_slots(
+    app, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setenv("PRISM_MQTT_INGEST_MODE", "immediate")
+    service = MQTTService(app)
+    service.warm_slot_cache()
+
+    with _capture_statements(app) as statements:
+        service._handle_slot_update("lot-a", "slot-1", {"distance_cm": 90.0})
+        service._handle_slot_update("lot-a", "missing-slot", {"distance_cm": 8.0})
+
+    assert statements
+    assert not any("parking_slots" in statement for statement in statements)
+    assert _row_counts(app) == (1, 1, 0)
+
+    with _capture_statements(app) as statements:
+        service._handle_slot_update("lot-a", "slot-1", {"distance_cm": 8.0})
+
+    assert any(statement.startswith("UPDATE parking_slots") for statement in statements)
+    assert not any(statement.startswith("SELECT") and "parking_slots" in statement for statement in statements)
+    assert get_slot_state_cache(app).get("lot-a-slot-1").is_occupied is True
+
+
+def test_api_slot_update_keeps_slot_cache_consistent(app):
+    service = MQTTService(app)
+    service.warm_slot_cache()
+
+    client = app.test_client()
+    login = client.post(
+        "/api/v1/auth/login",
+        json={"email": "admin@prism.local", "password": "Admin@12345"},
+    )
+    headers = {"Authorization": f"Bearer {login.get_json()['access_token']}"}
+    response = client.put(
+        "/api/v1/slots/lot-a-slot-3/status",
+        headers=headers,
+        json={"is_occupied": True},
+    )
+    assert response.status_code == 200
+    assert get_slot_state_cache(app).get("lot-a-slot-3").is_occupied is True
+
+    service._handle_slot_update("lot-a", "slot-3", {"distance_cm": 9.0})
+
+    with app.app_context():
+        assert ParkingEvent.query.filter_by(slot_id="lot-a-slot-3").count() == 1
+
+
+def test_stale_slot_cache_does_not_replay_applied_transition(app):
+    service = MQTTService(app)
+    service.warm_slot_cache()
+
+    # Another process occupies the slot and adjusts the counters; this cache still says vacant.
+    with app.app_context():
+        slot = db.session.get(ParkingSlot, "lot-a-slot-1")
+        slot.is_occupied = True
+        lot = db.session.get(ParkingLot, "lot-a")
+        lot.occupied_slots += 1
+        lot.available_slots -= 1
+        db.session.commit()
+        occupied_before = lot.occupied_slots
+        version_before = slot.state_version
+    assert get_slot_state_cache(app).get("lot-a-slot-1").is_occupied is False
+
+    service._handle_slot_update("lot-a", "slot-1", {"distance_cm": 8.0})
+
+    with app.app_context():
+        assert ParkingEvent.query.filter_by(slot_id="lot-a-slot-1").count() == 0
+        assert db.session.get(ParkingLot, "lot-a").occupied_slots == occupied_before
+        assert db.session.get(ParkingSlot, "lot-a-slot-1").state_version == version_before
+    # The reading is still stored, and the cache now matches the database.
+    assert _row_counts(app) == (1, 1, 0)
+    assert get_slot_state_cache(app).get("lot-a-slot-1").is_occupied is True
+
+
+def test_failed_api_commit_leaves_slot_cache_and_stream_untouched(app, monkeypatch: pytest.MonkeyPatch):
+    from app.services.notifications import broadcaster
+
+    service = MQTTService(app)
+    service.warm_slot_cache()
+    client = app.test_client()
+    login = client.post(
+        "/api/v1/auth/login",
+        json={"email": "admin@prism.local", "password": "Admin@12345"},
+    )
+    headers = {"Authorization": f"Bearer {login.get_json()['access_token']}"}
+    published = broadcaster.stats()["published"]
+
+    def _failing_commit():
+        raise RuntimeError("commit failed")
+
+    monkeypatch.setattr(db.session, "commit", _failing_commit)
+    response = client.put(
+        "/api/v1/slots/lot-a-slot-3/status",
+        headers=headers,
+        json={"is_occupied": True},
+    )
+
+    assert response.status_code == 500
+    assert get_slot_state_cache(app).get("lot-a-slot-3").is_occupied is False
+    assert broadcaster.stats()["published"] == published
+
+
+def test_worker_pool_preserves_per_key_order():
+    handled: list[tuple[str, int]] = []
+    pool = PartitionedWorkerPool(handled.append, workers=3, queue_size=100)
+    pool.start()
+
+    for sequence in range(20):
+        for key in ("lot-a-slot-1", "lot-a-slot-2", "lot-b-slot-5"):
+            pool.submit(key, (key, sequence))
+    pool.stop()
+
+    for key in ("lot-a-slot-1", "lot-a-slot-2", "lot-b-slot-5"):
+        assert [sequence for item_key, sequence in handled if item_key == key] == list(range(20))
+    assert pool.stats()["processed"] == 60
+    assert pool.queue_depth() == 0
+
+
+@pytest.mark.parametrize(
+    ("policy", "expected"),
+    [("drop_newest", [0, 1]), ("drop_oldest", [2, 3])],
+)
+def test_worker_pool_overflow_policies(policy: str, expected: list[int]):
+    handled: list[int] = []
+    pool = PartitionedWorkerPool(handled.append, workers=1, queue_size=2, overflow_policy=policy)
+
+    accepted = [pool.submit("lot-a-slot-1", sequence) for sequence in range(4)]
+    assert accepted == [True, True, False, False]
+    assert pool.queue_depth() == 2
+    assert pool.stats()["dropped"] == 2
+
+    pool.start()
+    pool.stop()
+    assert handled == expected
+
+
+def test_on_message_dispatches_to_worker_pool(app, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("PRISM_MQTT_WORKERS", "2")
+    service = MQTTService(app)
+    service._pool.start()
+
+    class _Message:
+        topic = "prism/lot-a/slot/slot-4"
+        payload = b'{"distance_cm": 6.5}'
+
+    processed = Event()
+    original = service._process_message
+
+    def _process_and_signal(topic, raw_payload):
+        original(topic, raw_payload)
+        processed.set()
+
+    monkeypatch.setattr(service, "_process_message", _process_and_signal)
+    service._on_message(service.client, None, _Message())
+
+    assert processed.wait(timeout=5)
+    service.stop()
+    assert _row_counts(app) == (1, 1, 1)
+    assert app.extensions["prism_mqtt"].stats()["workers"]["processed"] == 1
+
+
+def test_failed_ingest_commit_resets_only_that_batchs_filter_state(app, monkeypatch: pytest.MonkeyPatch):
+    service = MQTTService(app)
+    service._handle_slot_update("lot-a", "slot-1", {"distance_cm": 90.0})
+    assert "lot-a-slot-1" in service.occupancy_filter._states
+
+    def _failing_commit():
+        raise RuntimeError("commit failed")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(db.session, "commit", _failing_commit)
+        service._handle_slot_update("lot-a", "slot-2", {"distance_cm": 8.0})
+
+    assert "lot-a-slot-2" not in service.occupancy_filter._states
+    assert "lot-a-slot-1" in service.occupancy_filter._states
+
+
+def test_worker_pool_defaults_to_non_blocking_overflow():
+    pool = PartitionedWorkerPool(lambda item: None, workers=1, queue_size=1)
+    assert pool.overflow_policy == "drop_oldest"
+    # Without running workers a blocking put would hang; the second submit evicts instead.
+    assert pool.submit("lot-a-slot-1", 1) is True
+    assert pool.submit("lot-a-slot-1", 2) is False
+    assert pool.stats()["dropped"] == 1
+
+
+def test_change_only_policy_thins_readings_and_logs(app, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("PRISM_OCCUPANCY_LOG_POLICY", "transitions")
+    monkeypatch.setenv("PRISM_SENSOR_READING_DEADBAND_CM", "5")
+    monkeypatch.setenv("PRISM_SENSOR_READING_MAX_INTERVAL_SECONDS", "30")
+    service = MQTTService(app)
+
+    started = datetime(2026, 3, 2, 9, 0, 0)
+    samples = [
+        (0, 90.0),   # first reading for the slot: stored
+        (5, 91.0),   # within deadband and interval: skipped
+        (10, 97.0),  # beyond deadband: stored
+        (15, 96.0),  # skipped
+        (45, 96.5),  # max interval elapsed: stored
+        (50, 8.0),   # transition: stored, logged and evented
+        (55, 8.2),   # skipped
+    ]
+    service._persist_readings(
+        [
+            SlotReading(
+                lot_id="lot-a",
+                slot_id="lot-a-slot-1",
+                distance_cm=distance,
+                reported_occupied=None,
+                received_at=started + timedelta(seconds=offset),
+            )
+            for offset, distance in samples
+        ]
+    )
+
+    assert _row_counts(app) == (4, 1, 1)
+    with app.app_context():
+        latest = db.session.get(SlotLatestReading, "lot-a-slot-1")
+        assert (latest.distance_cm, latest.status) == (8.2, "occupied")
+        assert latest.timestamp == started + timedelta(seconds=55)
+        stored = [
+            row.distance_cm
+            for row in SensorReading.query.order_by(SensorReading.timestamp.asc()).all()
+        ]
+        assert stored == [90.0, 97.0, 96.5, 8.0]
+        assert OccupancyLog.query.one().status == "occupied"
+
+
+def test_occupancy_filter_hysteresis_holds_state_between_thresholds():
+    occupancy_filter = OccupancyFilter(enter_cm=12, exit_cm=18)
+    at = datetime(2026, 3, 2, 9, 0, 0)
+    state = False
+    decisions = []
+    for distance in (14, 16, 14, 10, 16, 14, 17, 19):
+        state = occupancy_filter.decide(
+            "lot-a-slot-1",
+            distance_cm=distance,
+            reported_occupied=None,
+            current=state,
+            at=at,
+        )
+        decisions.append(state)
+
+    assert decisions == [False, False, False, True, True, True, True, False]
+
+
+def test_occupancy_filter_requires_n_of_m_confirmation_and_dwell():
+    occupancy_filter = OccupancyFilter(
+        enter_cm=15,
+        exit_cm=15,
+        confirm_n=2,
+        confirm_m=3,
+        min_dwell_seconds=60,
+    )
+    started = datetime(2026, 3, 2, 9, 0, 0)
+    state = False
+    decisions = []
+    for offset, distance in ((0, 8), (5, 90), (10, 8), (15, 90), (20, 90), (90, 90)):
+        state = occupancy_filter.decide(
+            "lot-a-slot-1",
+            distance_cm=distance,
+            reported_occupied=None,
+            current=state,
+            at=started + timedelta(seconds=offset),
+        )
+        decisions.append(state)
+
+    # Entry needs 2 of the last 3 samples; exit is then held back by the 60s dwell time.
+    assert decisions == [False, False, True, True, True, False]
+
+
+def test_debounced_flapping_creates_no_events(app, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("PRISM_OCCUPANCY_ENTER_CM", "12")
+    monkeypatch.setenv("PRISM_OCCUPANCY_EXIT_CM", "18")
+    service = MQTTService(app)
+
+    for distance in (14.8, 15.3, 14.6, 15.9, 14.9):
+        service._handle_slot_update("lot-a", "slot-2", {"distance_cm": distance})
+
+    assert _row_counts(app) == (5, 5, 0)
+    with app.app_context():
+        assert db.session.get(ParkingSlot, "lot-a-slot-2").is_occupied is False
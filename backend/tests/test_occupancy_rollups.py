@@ -0,0 +1,292 @@
+"""Tests for incremental occupancy rollups and the analytics endpoint reading them."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from app import create_app, db
+from sqlalchemy import event
+
+from app.models.parking import OccupancyLog, OccupancyRollup, ParkingSlot, RollupSlotState, RollupWatermark
+from app.services.rollups import RollupScheduler, refresh_occupancy_rollups
+from seed import seed_campus_data
+
+
+@pytest.fixture()
+def app(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    db_file = tmp_path / "occupancy_rollups.db"
+
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db_file}")
+    monkeypatch.setenv("SECRET_KEY", "rollup-secret")
+    monkeypatch.setenv("JWT_SECRET_KEY", "rollup-jwt-secret")
+
+    app = create_app()
+    app.config.update(TESTING=True)
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed_campus_data(admin_email="admin@prism.local", admin_password="Admin@12345")
+
+    return app
+
+
+def _add_logs(app, slot_id: str, entries: list[tuple[datetime, str]]) -> None:
+    with app.app_context():
+        for timestamp, status in entries:
+            db.session.add(
+                OccupancyLog(slot_id=slot_id, status=status, distance_cm=50.0, timestamp=timestamp)
+            )
+        db.session.commit()
+
+
+def _rollup(scope: str, scope_id: str, granularity: str, bucket_start: datetime) -> OccupancyRollup:
+    return OccupancyRollup.query.filter_by(
+        granularity=granularity,
+        scope=scope,
+        scope_id=scope_id,
+        bucket_start=bucket_start,
+    ).one()
+
+
+def test_refresh_attributes_occupied_seconds_across_hour_buckets(app):
+    day = datetime(2026, 3, 2)
+    _add_logs(
+        app,
+        "lot-a-slot-1",
+        [
+            (day.replace(hour=9, minute=30), "vacant"),
+            (day.replace(hour=10, minute=15), "occupied"),
+            (day.replace(hour=11, minute=45), "vacant"),
+        ],
+    )
+
+    with app.app_context():
+        assert refresh_occupancy_rollups(db.session) == 3
+
+        ten = _rollup("slot", "lot-a-slot-1", "hour", day.replace(hour=10))
+        eleven = _rollup("slot", "lot-a-slot-1", "hour", day.replace(hour=11))
+        assert ten.occupied_seconds == pytest.approx(2700.0)
+        assert eleven.occupied_seconds == pytest.approx(2700.0)
+        assert ten.transitions == 1
+        assert eleven.transitions == 1
+
+        for scope, scope_id in (("slot", "lot-a-slot-1"), ("zone", "zone-a-east"), ("lot", "lot-a")):
+            daily = _rollup(scope, scope_id, "day", day)
+            assert daily.samples == 3
+            assert daily.occupied_samples == 1
+            assert daily.occupied_seconds == pytest.approx(5400.0)
+            assert daily.transitions == 2
+
+
+def test_refresh_is_incremental_from_watermark(app):
+    day = datetime(2026, 3, 3)
+    _add_logs(app, "lot-a-slot-2", [(day.replace(hour=8), "occupied")])
+
+    with app.app_context():
+        assert refresh_occupancy_rollups(db.session, safety_lag_seconds=0, now=day.replace(hour=9)) == 1
+        assert refresh_occupancy_rollups(db.session, safety_lag_seconds=0, now=day.replace(hour=9)) == 0
+        # The still-open occupied interval is credited up to the cutoff.
+        assert _rollup("lot", "lot-a", "day", day).occupied_seconds == pytest.approx(3600.0)
+
+    _add_logs(app, "lot-a-slot-2", [(day.replace(hour=9, minute=30), "vacant")])
+
+    with app.app_context():
+        statements: list[str] = []
+
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", _record)
+        try:
+            refreshed = refresh_occupancy_rollups(
+                db.session, batch_size=1, safety_lag_seconds=0, now=day.replace(hour=12)
+            )
+        finally:
+            event.remove(db.engine, "before_cursor_execute", _record)
+        assert refreshed == 1
+        # The previous state comes from rollup_slot_states, not a scan of the slot's history.
+        assert not any("row_number" in statement.lower() for statement in statements)
+
+        daily = _rollup("lot", "lot-a", "day", day)
+        assert daily.samples == 2
+        assert daily.transitions == 1
+        assert daily.occupied_seconds == pytest.approx(5400.0)
+        assert db.session.get(RollupWatermark, "occupancy_logs").last_id == OccupancyLog.query.count()
+        state = db.session.get(RollupSlotState, "lot-a-slot-2")
+        assert (state.status, state.timestamp) == ("vacant", day.replace(hour=9, minute=30))
+
+
+def test_open_occupied_intervals_are_credited_up_to_the_cutoff(app):
+    now = datetime(2026, 3, 7, 12)
+    _add_logs(app, "lot-b-slot-2", [(now - timedelta(hours=2), "occupied")])
+
+    with app.app_context():
+        assert refresh_occupancy_rollups(db.session, safety_lag_seconds=60, now=now) == 1
+        daily = _rollup("slot", "lot-b-slot-2", "day", now.replace(hour=0))
+        assert daily.occupied_seconds == pytest.approx(119 * 60.0)
+
+        # No new logs: the pass only extends the open interval.
+        assert refresh_occupancy_rollups(db.session, safety_lag_seconds=60, now=now + timedelta(minutes=10)) == 0
+        db.session.refresh(daily)
+        assert daily.occupied_seconds == pytest.approx(129 * 60.0)
+
+    _add_logs(app, "lot-b-slot-2", [(now + timedelta(minutes=20), "vacant")])
+
+    with app.app_context():
+        assert refresh_occupancy_rollups(db.session, safety_lag_seconds=60, now=now + timedelta(minutes=30)) == 1
+        assert refresh_occupancy_rollups(db.session, safety_lag_seconds=60, now=now + timedelta(hours=2)) == 0
+        daily = _rollup("slot", "lot-b-slot-2", "day", now.replace(hour=0))
+        # Already-credited time is not counted again when the closing log arrives.
+        assert daily.occupied_seconds == pytest.approx(140 * 60.0)
+        assert _rollup("slot", "lot-b-slot-2", "hour", now.replace(hour=12)).occupied_seconds == pytest.approx(
+            20 * 60.0
+        )
+
+
+def test_refresh_falls_back_to_logs_without_a_stored_slot_state(app):
+    day = datetime(2026, 3, 8)
+    _add_logs(app, "lot-a-slot-1", [(day.replace(hour=8), "vacant"), (day.replace(hour=9), "occupied")])
+
+    with app.app_context():
+        # Stopping at max_rows skips closing the open interval, so nothing is credited yet.
+        assert refresh_occupancy_rollups(
+            db.session, batch_size=2, max_rows=2, safety_lag_seconds=0, now=day.replace(hour=12)
+        ) == 2
+        # As if the rollups predated rollup_slot_states.
+        db.session.query(RollupSlotState).delete()
+        db.session.commit()
+
+    _add_logs(app, "lot-a-slot-1", [(day.replace(hour=10), "vacant")])
+
+    with app.app_context():
+        assert refresh_occupancy_rollups(db.session, safety_lag_seconds=0, now=day.replace(hour=11)) == 1
+        daily = _rollup("slot", "lot-a-slot-1", "day", day)
+        assert daily.transitions == 2
+        assert daily.occupied_seconds == pytest.approx(3600.0)
+        assert db.session.get(RollupSlotState, "lot-a-slot-1").status == "vacant"
+
+
+def test_refresh_respects_max_rows(app):
+    start = datetime(2026, 3, 4, 8)
+    _add_logs(
+        app,
+        "lot-b-slot-1",
+        [(start + timedelta(minutes=index), "occupied" if index % 2 else "vacant") for index in range(5)],
+    )
+
+    with app.app_context():
+        assert refresh_occupancy_rollups(db.session, batch_size=2, max_rows=3) == 3
+        assert refresh_occupancy_rollups(db.session, batch_size=2) == 2
+        assert _rollup("slot", "lot-b-slot-1", "day", start.replace(hour=0)).samples == 5
+
+
+def test_refresh_waits_for_logs_inside_the_safety_lag(app):
+    now = datetime(2026, 3, 6, 12)
+    _add_logs(
+        app,
+        "lot-a-slot-1",
+        [
+            (now - timedelta(minutes=10), "occupied"),
+            (now - timedelta(seconds=10), "vacant"),
+            (now - timedelta(minutes=20), "occupied"),
+        ],
+    )
+
+    with app.app_context():
+        # The second log is still inside the lag, so the batch stops before it even though the
+        # third one is old enough: the watermark may not skip over an unfolded id.
+        assert refresh_occupancy_rollups(db.session, safety_lag_seconds=60, now=now) == 1
+        assert db.session.get(RollupWatermark, "occupancy_logs").last_id == 1
+        assert refresh_occupancy_rollups(db.session, safety_lag_seconds=60, now=now + timedelta(minutes=1)) == 2
+
+
+def test_rollup_cli_rebuild_matches_incremental_refresh(app):
+    day = datetime(2026, 3, 5)
+    _add_logs(
+        app,
+        "lot-a-slot-4",
+        [(day.replace(hour=12), "occupied"), (day.replace(hour=14), "vacant")],
+    )
+
+    runner = app.test_cli_runner()
+    first = runner.invoke(args=["prism-rollups"])
+    rebuilt = runner.invoke(args=["prism-rollups", "--rebuild", "--batch-size", "1"])
+
+    assert first.exit_code == 0
+    assert rebuilt.exit_code == 0
+    assert "2 log rows processed" in rebuilt.output
+
+    with app.app_context():
+        daily = _rollup("zone", "zone-a-west", "day", day)
+        assert daily.samples == 2
+        assert daily.occupied_seconds == pytest.approx(7200.0)
+
+
+def test_admin_analytics_reads_daily_rollups(app, monkeypatch: pytest.MonkeyPatch):
+    yesterday = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
+    # One slot occupied for 12 of 24 hours; the samples (2 of 4 occupied) carry no duration.
+    _add_logs(
+        app,
+        "lot-a-slot-3",
+        [(yesterday, "occupied"), (yesterday + timedelta(hours=12), "vacant")],
+    )
+    _add_logs(
+        app,
+        "lot-b-slot-3",
+        [(yesterday + timedelta(hours=12), "occupied"), (yesterday + timedelta(hours=12), "vacant")],
+    )
+
+    client = app.test_client()
+    login = client.post(
+        "/api/v1/auth/login",
+        json={"email": "admin@prism.local", "password": "Admin@12345"},
+    )
+    headers = {"Authorization": f"Bearer {login.get_json()['access_token']}"}
+
+    # The endpoint is read-only: unfolded logs stay out of the response and the watermark stays put.
+    stale = client.get("/api/v1/admin/analytics?days=2", headers=headers)
+    assert stale.status_code == 200
+    assert stale.get_json()["daily_occupancy_average"] == []
+    with app.app_context():
+        assert db.session.get(RollupWatermark, "occupancy_logs") is None
+
+    monkeypatch.setenv("PRISM_ROLLUP_SAFETY_LAG_SECONDS", "0")
+    assert RollupScheduler(app, interval_seconds=60, max_rows=0).run_once() == 4
+
+    response = client.get("/api/v1/admin/analytics?days=2", headers=headers)
+    assert response.status_code == 200
+
+    with app.app_context():
+        total_slots = ParkingSlot.query.count()
+        lot_a_slots = ParkingSlot.query.filter_by(lot_id="lot-a").count()
+    daily = response.get_json()["daily_occupancy_average"]
+    assert daily == [
+        {
+            "date": yesterday.date().isoformat(),
+            "avg_occupancy_pct": round(50.0 / total_slots, 1),
+            "samples": 4,
+        }
+    ]
+    lot_a = client.get("/api/v1/admin/analytics?days=2&lot_id=lot-a", headers=headers).get_json()
+    assert lot_a["daily_occupancy_average"][0]["avg_occupancy_pct"] == round(50.0 / lot_a_slots, 1)
+
+    with app.app_context():
+        assert OccupancyRollup.query.filter_by(granularity="day", scope="lot").count() == 2
+
+
+def test_app_factory_starts_rollup_scheduler_on_first_request(app):
+    scheduler = app.extensions["prism_rollups"]
+    app.test_client().get("/health")
+    assert scheduler._thread is None  # never under TESTING
+
+    app.config.update(TESTING=False)
+    try:
+        app.test_client().get("/health")
+        assert scheduler._thread is not None and scheduler._thread.is_alive()
+    finally:
+        scheduler.stop()
+        app.config.update(TESTING=True)
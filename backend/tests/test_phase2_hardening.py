@@ -2,14 +2,26 @@
 
 from __future__ import annotations
 
+import json
+import os
 from datetime import datetime
 from pathlib import Path
+from types import SimpleNamespace
 
 import pytest
 
 from app import create_app, db
-from app.models.parking import OccupancyLog, ParkingEvent, ParkingSlot
+from app.models.parking import OccupancyLog, ParkingEvent, ParkingLot, ParkingSlot, Zone
 from app.models.user import User
+from app.services.notifications import (
+    BroadcastTransport,
+    EventBroadcaster,
+    MQTTBroadcastTransport,
+    batch_data,
+    coalesce_events,
+    lot_topic,
+    zone_topic,
+)
 from seed import seed_campus_data
 
 
@@ -155,6 +167,42 @@ def test_batch_status_update_supports_partial_failures(client):
     assert slot_response.get_json()["is_occupied"] is True
 
 
+def test_slot_updates_maintain_lot_and_zone_counters(client):
+    admin_headers = _auth_headers(client, "admin@prism.local", "Admin@12345")
+
+    response = client.put(
+        "/api/v1/slots/status/batch",
+        headers=admin_headers,
+        json={
+            "updates": [
+                {"slot_id": "lot-a-slot-1", "is_occupied": True},
+                {"slot_id": "lot-a-slot-4", "is_occupied": True, "is_reserved": True},
+                {"slot_id": "lot-b-slot-2", "is_reserved": True},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    client.put(
+        "/api/v1/slots/lot-a-slot-1/status",
+        headers=admin_headers,
+        json={"is_occupied": False},
+    )
+
+    with client.application.app_context():
+        lot_a = db.session.get(ParkingLot, "lot-a")
+        assert (lot_a.occupied_slots, lot_a.available_slots, lot_a.reserved_slots) == (1, 5, 1)
+        west = db.session.get(Zone, "zone-a-west")
+        assert (west.occupied_slots, west.available_slots, west.reserved_slots) == (1, 2, 1)
+        assert db.session.get(Zone, "zone-b-north").reserved_slots == 1
+
+    slot = client.get("/api/v1/slots/lot-a-slot-1", headers=admin_headers).get_json()
+    assert slot["last_reading_at"] == slot["last_status_change"]
+
+    summary = client.get("/api/v1/lots/summary", headers=admin_headers).get_json()
+    assert summary["occupied_slots"] == 1
+    assert summary["available_slots"] == 11
+
+
 def test_event_filter_queries_are_deterministic(client):
     headers = _auth_headers(client, "faculty@prism.local", "Faculty@12345")
     query = (
@@ -175,6 +223,47 @@ def test_event_filter_queries_are_deterministic(client):
     assert payload["events"][0]["event_type"] == "entry"
 
 
+def test_event_listings_paginate_with_keyset_cursor(client):
+    headers = _auth_headers(client, "faculty@prism.local", "Faculty@12345")
+    tied_at = datetime(2026, 3, 2, 8, 0, 0)
+    with client.application.app_context():
+        db.session.add_all(
+            ParkingEvent(slot_id="lot-a-slot-2", event_type="entry", timestamp=tied_at)
+            for _ in range(3)
+        )
+        db.session.commit()
+
+    seen: list[int] = []
+    cursor = None
+    for _ in range(10):
+        url = "/api/v1/events?lot_id=lot-a&limit=2"
+        if cursor:
+            url += f"&cursor={cursor}"
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        payload = response.get_json()
+        seen.extend(event["id"] for event in payload["events"])
+        cursor = payload["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == len(set(seen)) == 5
+    assert seen[:3] == sorted(seen[:3], reverse=True)
+
+    first = client.get("/api/v1/slots/lot-a-slot-1/events?limit=1", headers=headers).get_json()
+    assert [event["event_type"] for event in first["events"]] == ["exit"]
+    second = client.get(
+        f"/api/v1/slots/lot-a-slot-1/events?limit=1&cursor={first['next_cursor']}",
+        headers=headers,
+    ).get_json()
+    assert [event["event_type"] for event in second["events"]] == ["entry"]
+    assert second["next_cursor"] is None
+
+    invalid = client.get("/api/v1/events?cursor=not-a-cursor", headers=headers)
+    assert invalid.status_code == 400
+    assert invalid.get_json()["code"] == "validation_error"
+
+
 def test_sse_stream_requires_authentication(client):
     response = client.get("/api/v1/notifications/stream")
     assert response.status_code == 401
@@ -214,3 +303,257 @@ def test_sse_stream_delivers_slot_change_events(client):
     assert found_slot_change
 
 
+def test_broadcaster_only_enqueues_for_matching_topics():
+    broadcaster = EventBroadcaster(queue_size=1)
+    _, everything, _ = broadcaster.subscribe()
+    lot_a_id, lot_a, _ = broadcaster.subscribe([lot_topic("lot-a")])
+    _, zone_b, _ = broadcaster.subscribe([zone_topic("zone-b-north")])
+
+    broadcaster.publish({"type": "slot_change", "lot_id": "lot-a", "zone_id": "zone-a-east"})
+    broadcaster.publish({"type": "slot_change", "lot_id": "lot-b", "zone_id": "zone-b-north"})
+
+    assert lot_a.qsize() == 1 and lot_a.get_nowait().payload["lot_id"] == "lot-a"
+    assert zone_b.qsize() == 1 and zone_b.get_nowait().payload["zone_id"] == "zone-b-north"
+    # The catch-all subscriber kept only the newest event and dropped the oldest.
+    assert everything.get_nowait().payload["lot_id"] == "lot-b"
+
+    stats = broadcaster.stats()
+    assert stats["published"] == 2
+    assert stats["enqueued"] == 4
+    assert stats["dropped"] == 1
+    assert stats["filtered"] == 2
+
+    broadcaster.unsubscribe(lot_a_id)
+    assert lot_topic("lot-a") not in broadcaster.stats()["topics"]
+
+
+
+
+def test_broadcaster_replays_buffered_events_after_last_event_id():
+    broadcaster = EventBroadcaster(replay_size=2)
+    ids = [
+        broadcaster.publish({"type": "slot_change", "lot_id": lot_id, "slot_id": f"{lot_id}-slot-{n}"})
+        for n, lot_id in enumerate(["lot-a", "lot-b", "lot-a", "lot-a"], start=1)
+    ]
+
+    # Only events after the given id, in order, and only for the subscribed topics.
+    _, _, replay = broadcaster.subscribe([lot_topic("lot-a")], last_event_id=ids[1])
+    assert [event.id for event in replay] == [ids[2], ids[3]]
+    _, _, caught_up = broadcaster.subscribe(last_event_id=ids[3])
+    assert caught_up == []
+
+    # Events after ids[0] were evicted from the 2-entry buffer; foreign or garbage ids cannot be resumed either.
+    assert broadcaster.subscribe(last_event_id=ids[0])[2] is None
+    assert broadcaster.subscribe(last_event_id=ids[0].replace(broadcaster.instance, "deadbeef"))[2] is None
+    assert broadcaster.subscribe(last_event_id="not-an-id")[2] is None
+    assert broadcaster.stats()["replay_misses"] == 3
+
+
+def test_sse_stream_resumes_from_last_event_id(client):
+    admin_headers = _auth_headers(client, "admin@prism.local", "Admin@12345")
+
+    def update(slot_id: str, occupied: bool) -> None:
+        response = client.put(
+            f"/api/v1/slots/{slot_id}/status",
+            headers=admin_headers,
+            json={"is_occupied": occupied, "distance_cm": 8.0 if occupied else 120.0},
+        )
+        assert response.status_code == 200
+
+    from app.services.notifications import broadcaster
+
+    update("lot-a-slot-2", True)
+    resume_from = broadcaster.stats()["last_event_id"]
+    update("lot-a-slot-3", True)
+
+    stream = client.get(
+        "/api/v1/notifications/stream?lot_id=lot-a",
+        headers={**admin_headers, "Last-Event-ID": resume_from},
+        buffered=False,
+    )
+    assert "event: connected" in next(stream.response).decode("utf-8")
+    replayed = next(stream.response).decode("utf-8")
+    stream.close()
+    assert replayed.startswith("id: ")
+    assert "event: slot_change" in replayed and '"slot_id": "lot-a-slot-3"' in replayed
+
+    stale = client.get(
+        "/api/v1/notifications/stream",
+        headers={**admin_headers, "Last-Event-ID": "unknown-1"},
+        buffered=False,
+    )
+    next(stale.response)
+    assert "event: resync" in next(stale.response).decode("utf-8")
+    stale.close()
+
+
+def test_coalesced_batch_keeps_latest_state_per_slot():
+    broadcaster = EventBroadcaster()
+    _, queue, _ = broadcaster.subscribe()
+    for slot_id, occupied in [("s1", True), ("s2", True), ("s1", False), ("s3", True)]:
+        broadcaster.publish({"type": "slot_change", "slot_id": slot_id, "is_occupied": occupied})
+    events = [queue.get_nowait() for _ in range(4)]
+
+    latest = coalesce_events(events)
+    assert [(event.payload["slot_id"], event.payload["is_occupied"]) for event in latest] == [
+        ("s2", True),
+        ("s1", False),
+        ("s3", True),
+    ]
+    # Queued events share the payload serialized once at publish time.
+    assert events[0].data == json.dumps(events[0].payload)
+
+    batch = json.loads(batch_data(latest, received=len(events)))
+    assert batch["type"] == "slot_batch"
+    assert (batch["count"], batch["coalesced"]) == (3, 1)
+    assert batch["last_event_id"] == events[-1].id
+    assert [event["slot_id"] for event in batch["events"]] == ["s2", "s1", "s3"]
+
+
+def test_coalesced_batch_frame_round_trips_as_json():
+    broadcaster = EventBroadcaster()
+    _, queue, _ = broadcaster.subscribe()
+    for slot_id, occupied in [("s1", True), ('s"2', True), ("s1", False)]:
+        broadcaster.publish({"type": "slot_change", "slot_id": slot_id, "is_occupied": occupied, "note": "a\\b"})
+    events = [queue.get_nowait() for _ in range(3)]
+    latest = coalesce_events(events)
+
+    assert json.loads(batch_data(latest, received=len(events))) == {
+        "type": "slot_batch",
+        "count": 2,
+        "coalesced": 1,
+        "first_event_id": latest[0].id,
+        "last_event_id": latest[-1].id,
+        "events": [event.payload for event in latest],
+    }
+
+
+def test_sse_stream_batches_events_within_coalesce_window(client):
+    admin_headers = _auth_headers(client, "admin@prism.local", "Admin@12345")
+
+    invalid = client.get("/api/v1/notifications/stream?coalesce_ms=soon", headers=admin_headers)
+    assert invalid.status_code == 400
+    assert invalid.get_json()["code"] == "validation_error"
+
+    from app.services.notifications import broadcaster
+
+    stream = client.get(
+        "/api/v1/notifications/stream?lot_id=lot-a&coalesce_ms=200",
+        headers=admin_headers,
+        buffered=False,
+    )
+    assert '"coalesce_ms": 200' in next(stream.response).decode("utf-8")
+
+    for slot_id, occupied in [("lot-a-slot-2", True), ("lot-a-slot-3", True), ("lot-a-slot-2", False)]:
+        broadcaster.publish({"type": "slot_change", "lot_id": "lot-a", "slot_id": slot_id, "is_occupied": occupied})
+    chunk = next(stream.response).decode("utf-8")
+    stream.close()
+
+    assert "event: slot_batch" in chunk
+    batch = json.loads(chunk.split("data: ", 1)[1])
+    assert [(event["slot_id"], event["is_occupied"]) for event in batch["events"]] == [
+        ("lot-a-slot-3", True),
+        ("lot-a-slot-2", False),
+    ]
+    assert chunk.startswith(f"id: {batch['last_event_id']}")
+
+
+class _LoopbackBroker:
+    """Synchronous stand-in for the MQTT broker: every publish reaches every subscribed client."""
+
+    def __init__(self):
+        self.clients = []
+
+    def client(self):
+        broker = self
+
+        class Client:
+            def __init__(self):
+                self.topics = set()
+
+            def connect_async(self, host, port, keepalive):
+                broker.clients.append(self)
+
+            def loop_start(self):
+                self.on_connect(self, None, None, 0, None)
+
+            def subscribe(self, topic, qos=0):
+                self.topics.add(topic)
+
+            def publish(self, topic, payload, qos=0):
+                for client in broker.clients:
+                    if topic in client.topics:
+                        client.on_message(client, None, SimpleNamespace(topic=topic, payload=payload.encode("utf-8")))
+                return SimpleNamespace(rc=0)
+
+            def loop_stop(self):
+                pass
+
+            def disconnect(self):
+                broker.clients.remove(self)
+
+        return Client()
+
+
+def test_mqtt_transport_fans_events_out_to_every_process():
+    broker = _LoopbackBroker()
+    workers = []
+    for _ in range(2):
+        worker = EventBroadcaster()
+        worker.use_transport(MQTTBroadcastTransport(host="broker", port=1883, client=broker.client()))
+        workers.append(worker)
+    ingest, web = workers
+
+    _, web_queue, _ = web.subscribe([lot_topic("lot-a")])
+    _, ingest_queue, _ = ingest.subscribe()
+    ingest.broadcast({"type": "slot_change", "lot_id": "lot-a", "slot_id": "lot-a-slot-1"})
+
+    # Each process delivers exactly once, with ids from its own sequence.
+    assert web_queue.get_nowait().payload["slot_id"] == "lot-a-slot-1"
+    assert ingest_queue.get_nowait().payload["slot_id"] == "lot-a-slot-1"
+    assert web_queue.empty() and ingest_queue.empty()
+
+    ingest_stats, web_stats = ingest.stats(), web.stats()
+    assert ingest_stats["transport"]["sent"] == 1 and ingest_stats["transport"]["skipped_own"] == 1
+    assert web_stats["transport"]["received"] == 1 and web_stats["remote_published"] == 1
+
+    # A locally published (already relayed) event is not sent again.
+    web.publish({"type": "slot_change", "lot_id": "lot-a", "slot_id": "lot-a-slot-2"})
+    assert ingest_queue.empty()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+def test_forked_worker_starts_its_own_mqtt_client():
+    worker = EventBroadcaster()
+    transport = MQTTBroadcastTransport(host="127.0.0.1", port=1)
+    worker.use_transport(transport)
+    worker.subscribe()
+    parent_client = transport._client
+    assert parent_client._client_id.decode().endswith(f"-{os.getpid()}")
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(read_fd)
+            worker.after_fork()
+            worker.subscribe()
+            child_client = transport._client
+            fresh = (
+                child_client is not parent_client
+                and child_client._client_id.decode() == f"prism-notify-{worker.instance}-{os.getpid()}"
+                and transport.stats()["sent"] == 0
+            )
+            os.write(write_fd, b"ok" if fresh else b"stale")
+        finally:
+            os._exit(0)
+
+    os.close(write_fd)
+    try:
+        with os.fdopen(read_fd, "rb") as pipe:
+            result = pipe.read()
+        os.waitpid(pid, 0)
+    finally:
+        # Stops the parent's paho network loop.
+        worker.use_transport(BroadcastTransport())
+    assert result == b"ok"
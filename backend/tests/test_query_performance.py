@@ -0,0 +1,371 @@
+"""Query-count and query-plan guards for hot read endpoints."""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models.parking import OccupancyLog, ParkingEvent, ParkingLot, ParkingSlot, SlotLatestReading, Zone
+from seed import seed_campus_data
+
+
+@pytest.fixture()
+def app(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    db_file = tmp_path / "query_performance.db"
+
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db_file}")
+    monkeypatch.setenv("SECRET_KEY", "query-performance-secret")
+    monkeypatch.setenv("JWT_SECRET_KEY", "query-performance-jwt-secret")
+    monkeypatch.setenv("PRISM_ALLOW_PUBLIC_READS", "true")
+    monkeypatch.setenv("PRISM_TELEMETRY_ETAG_BUCKET_SECONDS", "0")
+
+    app = create_app()
+    app.config.update(TESTING=True)
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed_campus_data(admin_email="admin@prism.local", admin_password="Admin@12345")
+
+    return app
+
+
+@contextmanager
+def _count_queries(app):
+    statements: list[str] = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+def _event_query_plans(app, client, path: str, headers: dict[str, str] | None = None) -> list[str]:
+    """Run EXPLAIN QUERY PLAN for each parking_events statement a request issues."""
+    captured: list[tuple[str, object]] = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if "FROM parking_events" in statement:
+            captured.append((statement, parameters))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    try:
+        response = client.get(path, headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+    assert response.status_code == 200
+    assert captured
+
+    plans = []
+    with app.app_context():
+        connection = db.engine.raw_connection()
+        try:
+            for statement, parameters in captured:
+                rows = connection.cursor().execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+                plans.append(" | ".join(row[-1] for row in rows))
+        finally:
+            connection.close()
+    return plans
+
+
+def _add_slots_with_logs(app, lot_id: str, zone_id: str, count: int) -> None:
+    now = datetime.utcnow()
+    with app.app_context():
+        for number in range(100, 100 + count):
+            slot_id = f"{lot_id}-slot-{number}"
+            db.session.add(
+                ParkingSlot(
+                    id=slot_id,
+                    lot_id=lot_id,
+                    zone_id=zone_id,
+                    slot_number=number,
+                    is_occupied=False,
+                )
+            )
+            for minutes in (3, 2, 1):
+                db.session.add(
+                    OccupancyLog(
+                        slot_id=slot_id,
+                        status="vacant",
+                        distance_cm=80.0 + minutes,
+                        timestamp=now - timedelta(minutes=minutes),
+                    )
+                )
+            db.session.add(
+                SlotLatestReading(
+                    slot_id=slot_id,
+                    status="vacant",
+                    distance_cm=81.0,
+                    timestamp=now - timedelta(minutes=1),
+                )
+            )
+        db.session.commit()
+
+
+@pytest.mark.parametrize("path", ["/api/v1/slots", "/api/v1/slots?lot_id=lot-a", "/api/v1/lots/lot-a"])
+def test_slot_listings_use_constant_query_count(app, path: str):
+    client = app.test_client()
+
+    with _count_queries(app) as baseline:
+        first = client.get(path)
+    assert first.status_code == 200
+
+    _add_slots_with_logs(app, "lot-a", "zone-a-east", 25)
+
+    with _count_queries(app) as grown:
+        second = client.get(path)
+    assert second.status_code == 200
+
+    payload = second.get_json()
+    slots = payload["slots"]
+    assert len(slots) == len(first.get_json()["slots"]) + 25
+    assert len(grown) == len(baseline)
+
+    added = next(slot for slot in slots if slot["id"] == "lot-a-slot-100")
+    assert added["zone_name"] == "East Wing"
+    assert added["latest_distance_cm"] == 81.0
+
+
+def _admin_headers(client) -> dict[str, str]:
+    login = client.post(
+        "/api/v1/auth/login",
+        json={"email": "admin@prism.local", "password": "Admin@12345"},
+    )
+    assert login.status_code == 200
+    return {"Authorization": f"Bearer {login.get_json()['access_token']}"}
+
+
+def test_admin_analytics_histogram_is_aggregated_in_sql(app):
+    now = datetime.utcnow()
+    with app.app_context():
+        for offset, slot_id in enumerate(["lot-a-slot-1", "lot-a-slot-2", "lot-b-slot-1"]):
+            for _ in range(offset + 1):
+                db.session.add(
+                    ParkingEvent(
+                        slot_id=slot_id,
+                        event_type="entry",
+                        timestamp=now.replace(hour=offset + 7, minute=5) - timedelta(days=1),
+                    )
+                )
+        db.session.commit()
+
+    client = app.test_client()
+    headers = _admin_headers(client)
+
+    with _count_queries(app) as statements:
+        response = client.get("/api/v1/admin/analytics?days=7", headers=headers)
+    assert response.status_code == 200
+
+    payload = response.get_json()
+    hourly = {row["hour"]: row["events"] for row in payload["hourly_event_distribution"]}
+    assert (hourly[7], hourly[8], hourly[9]) == (1, 2, 3)
+    assert payload["peak_hour"] == {"hour_utc": "09:00", "events": 3}
+    # Events are counted with GROUP BY rather than loaded row by row.
+    event_selects = [sql for sql in statements if "FROM parking_events" in sql]
+    assert event_selects and all("GROUP BY" in sql for sql in event_selects)
+
+    filtered = client.get("/api/v1/admin/analytics?days=7&lot_id=lot-a", headers=headers).get_json()
+    hourly = {row["hour"]: row["events"] for row in filtered["hourly_event_distribution"]}
+    assert (hourly[7], hourly[8], hourly[9]) == (1, 2, 0)
+    assert filtered["lot_id"] == "lot-a"
+    assert {row["lot_id"] for row in filtered["zone_utilization_comparison"]} == {"lot-a"}
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/api/v1/lots/lot-a/predict?day=monday&time=09:00",
+        "/api/v1/lots/lot-a/recommend?destination=Library&day=monday&time=09:00",
+        "/api/v1/admin/analytics?days=7",
+    ],
+)
+def test_zone_utilization_uses_constant_query_count(app, path: str):
+    client = app.test_client()
+    # Zones are inserted behind the API's back, so skip the predict/recommend response cache.
+    headers = {**_admin_headers(client), "Cache-Control": "no-cache"}
+
+    with _count_queries(app) as baseline:
+        first = client.get(path, headers=headers)
+    assert first.status_code == 200
+
+    with app.app_context():
+        for index in range(30):
+            db.session.add(
+                Zone(
+                    id=f"zone-a-extra-{index}",
+                    lot_id="lot-a",
+                    name=f"Extra {index:02d}",
+                    walk_times={"Library": 4},
+                    occupied_slots=index % 3,
+                    available_slots=3 - index % 3,
+                )
+            )
+        db.session.commit()
+
+    with _count_queries(app) as grown:
+        second = client.get(path, headers=headers)
+    assert second.status_code == 200
+    assert len(grown) == len(baseline)
+
+    if "analytics" in path:
+        zones = second.get_json()["zone_utilization_comparison"]
+        extra = next(zone for zone in zones if zone["zone_id"] == "zone-a-extra-1")
+        with app.app_context():
+            lot_name = db.session.get(ParkingLot, "lot-a").name
+        assert extra["lot_name"] == lot_name
+        assert extra["total_slots"] == 3
+        assert extra["utilization_pct"] == 33.3
+
+
+@pytest.mark.parametrize(
+    ("path", "index_name"),
+    [
+        ("/api/v1/events?limit=20", "idx_parking_events_time_id"),
+        ("/api/v1/events?lot_id=lot-a&limit=20", "idx_parking_events_lot_time_id"),
+        ("/api/v1/slots/lot-a-slot-1/events?limit=20", "idx_parking_events_slot_time_id"),
+        ("/api/v1/admin/analytics?days=7&lot_id=lot-a", "idx_parking_events_lot_time_id"),
+    ],
+)
+def test_event_queries_use_composite_indexes(app, path: str, index_name: str):
+    client = app.test_client()
+    headers = _admin_headers(client) if "admin" in path else None
+
+    plans = _event_query_plans(app, client, path, headers)
+
+    assert any(index_name in plan for plan in plans), plans
+    assert not any("SCAN parking_events" in plan and "INDEX" not in plan for plan in plans), plans
+
+
+def test_events_without_lot_id_derive_it_from_slot(app):
+    with app.app_context():
+        db.session.add(ParkingEvent(slot_id="lot-b-slot-2", event_type="entry"))
+        db.session.commit()
+        stored = ParkingEvent.query.filter_by(slot_id="lot-b-slot-2").one()
+        assert stored.lot_id == "lot-b"
+
+
+@pytest.mark.parametrize(
+    "path",
+    ["/api/v1/lots", "/api/v1/lots/summary", "/api/v1/lots/lot-a", "/api/v1/slots?lot_id=lot-a"],
+)
+def test_unchanged_reads_answer_304_without_loading_rows(app, path: str):
+    client = app.test_client()
+
+    with _count_queries(app) as full:
+        first = client.get(path)
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    etag = first.headers["ETag"]
+
+    with _count_queries(app) as revalidated:
+        second = client.get(path, headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.data == b""
+    assert second.headers["ETag"] == etag
+    assert len(revalidated) < len(full)
+
+
+def test_slot_state_changes_move_only_the_affected_etags(app):
+    client = app.test_client()
+    headers = _admin_headers(client)
+
+    before = {
+        path: client.get(path).headers["ETag"]
+        for path in ("/api/v1/lots", "/api/v1/slots", "/api/v1/lots/lot-a", "/api/v1/lots/lot-b")
+    }
+
+    update = client.put(
+        "/api/v1/slots/lot-b-slot-2/status",
+        json={"is_occupied": True, "distance_cm": 12.0},
+        headers=headers,
+    )
+    assert update.status_code == 200
+
+    for path in ("/api/v1/lots", "/api/v1/slots", "/api/v1/lots/lot-b"):
+        response = client.get(path, headers={"If-None-Match": before[path]})
+        assert response.status_code == 200, path
+        assert response.headers["ETag"] != before[path]
+
+    unaffected = client.get("/api/v1/lots/lot-a", headers={"If-None-Match": before["/api/v1/lots/lot-a"]})
+    assert unaffected.status_code == 304
+
+    with app.app_context():
+        lot_b = db.session.get(ParkingLot, "lot-b")
+        slot = db.session.get(ParkingSlot, "lot-b-slot-2")
+        assert slot.state_version == lot_b.state_version
+        assert lot_b.state_version > db.session.get(ParkingLot, "lot-a").state_version
+
+
+def test_telemetry_only_changes_revalidate_per_bucket(app, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("PRISM_TELEMETRY_ETAG_BUCKET_SECONDS", "30")
+    clock = {"now": 1_000_020.0}
+    monkeypatch.setattr("app.conditional.time.time", lambda: clock["now"])
+    client = app.test_client()
+    path = "/api/v1/lots/lot-a"
+    etag = client.get(path).headers["ETag"]
+
+    with app.app_context():
+        db.session.add(
+            SlotLatestReading(slot_id="lot-a-slot-1", distance_cm=77.0, status="vacant", timestamp=datetime.utcnow())
+        )
+        db.session.commit()
+
+    with _count_queries(app) as revalidated:
+        cached = client.get(path, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert not any("slot_latest_readings" in statement for statement in revalidated)
+
+    clock["now"] += 30
+    refreshed = client.get(path, headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["ETag"] != etag
+
+
+def test_slot_listing_delta_returns_only_changed_slots(app):
+    client = app.test_client()
+    headers = _admin_headers(client)
+
+    baseline = client.get("/api/v1/slots").get_json()
+    version = baseline["version"]
+    assert baseline["total"] > 2
+
+    empty = client.get(f"/api/v1/slots?changed_since={version}").get_json()
+    assert empty == {"slots": [], "total": 0, "version": version, "changed_since": str(version)}
+
+    started_at = datetime.utcnow()
+    client.put("/api/v1/slots/lot-a-slot-1/status", json={"is_occupied": True}, headers=headers)
+    client.put("/api/v1/slots/lot-b-slot-2/status", json={"is_reserved": True}, headers=headers)
+
+    delta = client.get(f"/api/v1/slots?changed_since={version}").get_json()
+    assert sorted(slot["id"] for slot in delta["slots"]) == ["lot-a-slot-1", "lot-b-slot-2"]
+    assert delta["version"] == version + 2
+
+    lot_delta = client.get(f"/api/v1/slots?lot_id=lot-a&changed_since={version}").get_json()
+    assert [slot["id"] for slot in lot_delta["slots"]] == ["lot-a-slot-1"]
+    assert lot_delta["version"] == version + 1
+
+    # A slot that stopped being available still reaches a status=available delta.
+    filtered_delta = client.get(f"/api/v1/slots?status=available&changed_since={version}").get_json()
+    assert sorted(slot["id"] for slot in filtered_delta["slots"]) == ["lot-a-slot-1", "lot-b-slot-2"]
+    assert next(slot for slot in filtered_delta["slots"] if slot["id"] == "lot-a-slot-1")["is_occupied"] is True
+
+    # Timestamps follow last_status_change, so only occupancy changes are reported.
+    by_time = client.get(f"/api/v1/slots?changed_since={started_at.isoformat()}Z").get_json()
+    assert [slot["id"] for slot in by_time["slots"]] == ["lot-a-slot-1"]
+
+    invalid = client.get("/api/v1/slots?changed_since=yesterday")
+    assert invalid.status_code == 400
+    assert invalid.get_json()["code"] == "validation_error"
@@ -0,0 +1,232 @@
+"""Tests for raw telemetry downsampling and retention."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models.parking import (
+    OccupancyLog,
+    OccupancyRollup,
+    SensorReading,
+    TelemetryMinuteAggregate,
+)
+from app.services.partitions import (
+    ensure_partitions,
+    PartitionScheduler,
+    is_partitioned,
+    parse_partition_name,
+    partition_layout,
+    partition_name,
+    partition_ranges,
+)
+from app.services.retention import RetentionScheduler, apply_retention
+from seed import seed_campus_data
+
+NOW = datetime(2026, 6, 1, 12, 0, 0)
+OLD_MINUTE = datetime(2026, 4, 1, 9, 15, 0)
+
+
+@pytest.fixture()
+def app(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    db_file = tmp_path / "telemetry_retention.db"
+
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db_file}")
+    monkeypatch.setenv("SECRET_KEY", "retention-secret")
+    monkeypatch.setenv("JWT_SECRET_KEY", "retention-jwt-secret")
+    monkeypatch.delenv("PRISM_RETENTION_INTERVAL_SECONDS", raising=False)
+
+    app = create_app()
+    app.config.update(TESTING=True)
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed_campus_data(admin_email="admin@prism.local", admin_password="Admin@12345")
+
+    return app
+
+
+def _add_sensor_readings(app, slot_id: str, entries: list[tuple[datetime, float, bool]]) -> None:
+    with app.app_context():
+        for timestamp, distance_cm, is_occupied in entries:
+            db.session.add(
+                SensorReading(
+                    slot_id=slot_id,
+                    distance_cm=distance_cm,
+                    is_occupied=is_occupied,
+                    timestamp=timestamp,
+                )
+            )
+        db.session.commit()
+
+
+def test_old_sensor_readings_are_downsampled_then_deleted(app):
+    _add_sensor_readings(
+        app,
+        "lot-a-slot-1",
+        [
+            (OLD_MINUTE + timedelta(seconds=5), 80.0, False),
+            (OLD_MINUTE + timedelta(seconds=25), 9.0, True),
+            (OLD_MINUTE + timedelta(seconds=55), 10.0, True),
+            (NOW - timedelta(days=1), 70.0, False),
+        ],
+    )
+
+    with app.app_context():
+        result = apply_retention(db.session, retention_days=30, now=NOW)
+
+        assert result.deleted == {"sensor_readings": 3, "occupancy_logs": 0}
+        assert SensorReading.query.count() == 1
+
+        aggregate = TelemetryMinuteAggregate.query.one()
+        assert aggregate.source == "sensor_readings"
+        assert aggregate.minute_start == OLD_MINUTE
+        assert aggregate.samples == 3
+        assert aggregate.occupied_samples == 2
+        assert aggregate.distance_sum / aggregate.distance_samples == pytest.approx(33.0)
+        assert (aggregate.distance_min, aggregate.distance_max) == (9.0, 80.0)
+
+
+def test_retention_deletes_in_bounded_batches_without_double_counting(app):
+    _add_sensor_readings(
+        app,
+        "lot-a-slot-2",
+        [(OLD_MINUTE + timedelta(seconds=index), 50.0 + index, False) for index in range(5)],
+    )
+
+    with app.app_context():
+        first = apply_retention(db.session, retention_days=30, batch_size=2, max_batches=2, now=NOW)
+        assert first.deleted["sensor_readings"] == 4
+        assert first.batches == 2
+        assert SensorReading.query.count() == 1
+
+        second = apply_retention(db.session, retention_days=30, batch_size=2, now=NOW)
+        assert second.deleted["sensor_readings"] == 1
+        assert SensorReading.query.count() == 0
+
+        aggregate = TelemetryMinuteAggregate.query.one()
+        assert aggregate.samples == 5
+        assert (aggregate.distance_min, aggregate.distance_max) == (50.0, 54.0)
+
+
+def test_each_source_gets_its_own_batch_budget(app):
+    _add_sensor_readings(
+        app,
+        "lot-a-slot-2",
+        [(OLD_MINUTE + timedelta(seconds=index), 50.0, False) for index in range(6)],
+    )
+    with app.app_context():
+        for minutes in range(4):
+            db.session.add(
+                OccupancyLog(
+                    slot_id="lot-b-slot-1",
+                    status="occupied" if minutes % 2 else "vacant",
+                    distance_cm=40.0,
+                    timestamp=OLD_MINUTE + timedelta(minutes=minutes),
+                )
+            )
+        db.session.commit()
+
+        statements: list[str] = []
+
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", _record)
+        try:
+            result = apply_retention(db.session, retention_days=30, batch_size=2, max_batches=1, now=NOW)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", _record)
+
+        # A sensor backlog no longer starves log pruning, and the newest-per-slot ids are
+        # looked up once per pass rather than once per batch.
+        assert result.deleted == {"sensor_readings": 2, "occupancy_logs": 2}
+        assert result.batches == 2
+        assert sum("GROUP BY occupancy_logs.slot_id" in statement for statement in statements) == 1
+
+
+def test_occupancy_logs_are_rolled_up_before_pruning(app):
+    with app.app_context():
+        for minutes, status in ((0, "vacant"), (30, "occupied"), (90, "vacant")):
+            db.session.add(
+                OccupancyLog(
+                    slot_id="lot-b-slot-2",
+                    status=status,
+                    distance_cm=40.0,
+                    timestamp=OLD_MINUTE + timedelta(minutes=minutes),
+                )
+            )
+        db.session.commit()
+
+        result = apply_retention(db.session, retention_days=30, now=NOW)
+
+        # The newest log per slot survives so later rollup refreshes keep their anchor.
+        assert result.deleted["occupancy_logs"] == 2
+        remaining = OccupancyLog.query.one()
+        assert remaining.status == "vacant"
+
+        daily = OccupancyRollup.query.filter_by(
+            granularity="day",
+            scope="slot",
+            scope_id="lot-b-slot-2",
+        ).one()
+        assert daily.samples == 3
+        assert daily.occupied_seconds == pytest.approx(3600.0)
+        assert (
+            TelemetryMinuteAggregate.query.filter_by(source="occupancy_logs").count() == 2
+        )
+
+
+def test_retention_cli_and_scheduler(app, monkeypatch: pytest.MonkeyPatch):
+    _add_sensor_readings(app, "lot-a-slot-3", [(datetime.utcnow() - timedelta(days=10), 60.0, False)])
+
+    result = app.test_cli_runner().invoke(args=["prism-retention", "--days", "5", "--batch-size", "10"])
+    assert result.exit_code == 0
+    assert "sensor_readings_deleted=1" in result.output
+
+    assert RetentionScheduler(app).enabled is False
+
+    monkeypatch.setenv("PRISM_RETENTION_DAYS", "1")
+    _add_sensor_readings(app, "lot-a-slot-3", [(datetime.utcnow() - timedelta(days=2), 61.0, False)])
+    scheduler = RetentionScheduler(app, interval_seconds=60)
+    assert scheduler.enabled is True
+    assert scheduler.run_once().deleted["sensor_readings"] == 1
+
+
+def test_partition_ranges_and_names_round_trip():
+    ranges = partition_ranges(datetime(2026, 11, 20), datetime(2027, 2, 3), "month")
+    assert ranges[0] == (datetime(2026, 11, 1), datetime(2026, 12, 1))
+    assert ranges[-1] == (datetime(2027, 2, 1), datetime(2027, 3, 1))
+    assert len(ranges) == 4
+
+    monthly = partition_name("occupancy_logs", datetime(2026, 12, 1), "month")
+    assert monthly == "occupancy_logs_p202612"
+    assert parse_partition_name(monthly) == ("occupancy_logs", datetime(2026, 12, 1), datetime(2027, 1, 1))
+
+    daily = partition_name("sensor_readings", datetime(2026, 2, 28), "day")
+    assert parse_partition_name(daily) == ("sensor_readings", datetime(2026, 2, 28), datetime(2026, 3, 1))
+    assert parse_partition_name("sensor_readings_default") is None
+
+    assert partition_layout([]) is None
+    assert partition_layout([parse_partition_name(monthly)]) == "month"
+    assert partition_layout([parse_partition_name(daily)]) == "day"
+
+
+def test_partitioning_is_a_no_op_on_sqlite(app):
+    with app.app_context():
+        assert is_partitioned(db.session, "sensor_readings") is False
+        assert ensure_partitions(db.session) == []
+        assert apply_retention(db.session, now=NOW).dropped_partitions == []
+
+    result = app.test_cli_runner().invoke(args=["prism-partitions"])
+    assert result.exit_code == 0
+    assert "not partitioned" in result.output
+
+    scheduler = PartitionScheduler(app)
+    assert scheduler.enabled is True
+    assert scheduler.run_once() == []
@@ -322,12 +322,37 @@ function notifySessionInvalid(status: number, url: string): void {
   );
 }
 
+// Last ETag and body per GET url; revalidated with If-None-Match so unchanged polls skip the payload.
+// Map order doubles as recency: hits are re-inserted and the oldest entry is evicted past the cap.
+const CONDITIONAL_CACHE_MAX_ENTRIES = 32;
+const conditionalCache = new Map<string, { etag: string; body: unknown }>();
+
+function isConditionallyCacheable(url: string): boolean {
+  // Delta polls use a new changed_since value each time, so caching them would only grow the map.
+  return !/[?&]changed_since=/.test(url);
+}
+
+function rememberConditional(key: string, entry: { etag: string; body: unknown }) {
+  conditionalCache.delete(key);
+  conditionalCache.set(key, entry);
+  while (conditionalCache.size > CONDITIONAL_CACHE_MAX_ENTRIES) {
+    const oldest = conditionalCache.keys().next().value;
+    if (oldest === undefined) break;
+    conditionalCache.delete(oldest);
+  }
+}
+
 async function fetchJson<T>(url: string, init?: RequestInit, options?: FetchJsonOptions): Promise<T> {
   const includeAuth = options?.includeAuth ?? true;
   const token = includeAuth ? getBearerToken() : null;
   const baseHeaders: HeadersInit = token ? { Authorization: `Bearer ${token}` } : {};
+  const revalidates =
+    (init?.method ?? "GET").toUpperCase() === "GET" && isConditionallyCacheable(url);
+  const cacheKey = `${token ?? ""} ${url}`;
+  const cached = revalidates ? conditionalCache.get(cacheKey) : undefined;
   const headers: HeadersInit = {
     ...baseHeaders,
+    ...(cached ? { "If-None-Match": cached.etag } : {}),
     ...(init?.headers || {}),
   };
   const res = await fetch(url, {
@@ -341,12 +366,22 @@ async function fetchJson<T>(url: string, init?: RequestInit, options?: FetchJson
     throw new Error("Unauthorized. Please login again.");
   }
 
+  if (res.status === 304 && cached) {
+    rememberConditional(cacheKey, cached);
+    return cached.body as T;
+  }
+
   if (!res.ok) {
     const message = await parseApiErrorMessage(res);
     throw new Error(message);
   }
 
-  return res.json() as Promise<T>;
+  const body = (await res.json()) as T;
+  const etag = res.headers.get("ETag");
+  if (revalidates && etag) {
+    rememberConditional(cacheKey, { etag, body });
+  }
+  return body;
 }
 
 export async function loginUser(payload: LoginPayload): Promise<{